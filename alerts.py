@@ -0,0 +1,224 @@
+"""
+Threshold alerts for the Taskbar Widget
+Rules in "alert_rules" flag conditions such as "CPU > 90% for 30 s" or
+"download < 0.1 MB/s for 5 min" by recoloring the metric's label and,
+optionally, raising a desktop notification:
+
+    {"metric": "cpu", "op": ">", "value": 90, "for": 30, "color": "#ff5555"}
+    {"metric": "down", "op": "<", "value": 0.1, "for": 300, "notify": true}
+
+Metrics: cpu and mem (%), up and down (MB/s). By default a rule fires when
+the condition held for every sample in the window (window min for > / >=,
+max for < / <=); "agg": "avg", "min" or "max" picks the aggregate instead.
+
+Rules with the same metric and window share one SlidingWindow, which keeps a
+running sum and monotonic min/max deques: each tick costs an amortized O(1)
+push per window and O(1) per rule, however long the windows are. The running
+sum is rebuilt exactly (math.fsum) once per window length of pushes, so float
+error cannot build up over a long session. Times are monotonic seconds (the
+widget passes time.monotonic(), a replay its recorded clock).
+"""
+
+import sys
+import math
+import shutil
+import logging
+import operator
+import subprocess
+from collections import deque
+
+logger = logging.getLogger("widget.alerts")
+
+OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+AGGREGATES = ("all", "avg", "min", "max")
+METRICS = ("cpu", "mem", "up", "down")
+LABELS = {"cpu": "cpu_label", "mem": "mem_label", "up": "net_up_label", "down": "net_down_label"}
+DEFAULT_COLOR = "#ff5555"
+GAP_RESET = 10.0          # Seconds without samples (sleep, hibernate) that restart the windows
+NOTIFY_COOLDOWN = 300.0   # Seconds before the same rule notifies again
+TOAST_APP_ID = r"{1AC14E77-02E7-4E5D-B744-2EB1AE5198B7}\WindowsPowerShell\v1.0\powershell.exe"
+
+
+class SlidingWindow:
+    """Samples of one metric over the last `seconds`, with O(1) sum, min and max"""
+
+    __slots__ = ("seconds", "samples", "total", "pushes", "mins", "maxs", "track_min", "track_max", "started")
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.samples = deque()   # (timestamp, value)
+        self.total = 0.0
+        self.pushes = 0          # Since the running total was last rebuilt
+        self.mins = deque()      # Increasing values: mins[0] is the window minimum
+        self.maxs = deque()      # Decreasing values: maxs[0] is the window maximum
+        self.track_min = False
+        self.track_max = False
+        self.started = None      # First sample of the current unbroken run
+
+    def push(self, t, value):
+        samples = self.samples
+        if samples and not 0 <= t - samples[-1][0] <= GAP_RESET:
+            self.clear()  # Long gap, or time went backwards (replay seek)
+        if self.started is None:
+            self.started = t
+        cutoff = t - self.seconds
+        while samples and samples[0][0] <= cutoff:
+            self.total -= samples.popleft()[1]
+        if self.track_min:
+            mins = self.mins
+            while mins and mins[0][0] <= cutoff:
+                mins.popleft()
+            while mins and mins[-1][1] >= value:
+                mins.pop()
+            mins.append((t, value))
+        if self.track_max:
+            maxs = self.maxs
+            while maxs and maxs[0][0] <= cutoff:
+                maxs.popleft()
+            while maxs and maxs[-1][1] <= value:
+                maxs.pop()
+            maxs.append((t, value))
+        samples.append((t, value))
+        self.total += value
+        self.pushes += 1
+        if self.pushes >= len(samples):
+            self.total = math.fsum(v for _, v in samples)
+            self.pushes = 0
+
+    def clear(self):
+        self.samples.clear()
+        self.mins.clear()
+        self.maxs.clear()
+        self.total = 0.0
+        self.pushes = 0
+        self.started = None
+
+    def full(self, now):
+        """True once the samples span the whole window"""
+        return self.started is not None and now - self.started >= self.seconds
+
+    def aggregate(self, agg):
+        if agg == "avg":
+            return self.total / len(self.samples)
+        return self.mins[0][1] if agg == "min" else self.maxs[0][1]
+
+
+class AlertRule:
+    """One parsed entry of "alert_rules"; raises ValueError for a bad entry"""
+
+    def __init__(self, spec):
+        self.metric = spec.get("metric")
+        if self.metric not in METRICS:
+            raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+        self.op = spec.get("op", ">")
+        if self.op not in OPS:
+            raise ValueError(f"op must be one of {' '.join(OPS)}")
+        self.compare = OPS[self.op]
+        self.threshold = float(spec["value"])
+        self.seconds = float(spec.get("for", 0))
+        if self.seconds < 0:
+            raise ValueError("'for' must not be negative")
+        agg = spec.get("agg", "all")
+        if agg not in AGGREGATES:
+            raise ValueError(f"agg must be one of {', '.join(AGGREGATES)}")
+        # "Held for the whole window": the least extreme sample must pass
+        self.agg = ("min" if self.op.startswith(">") else "max") if agg == "all" else agg
+        self.name = spec.get("name") or f"{self.metric} {self.op} {spec['value']} for {spec.get('for', 0)}s"
+        self.color = spec.get("color", DEFAULT_COLOR)
+        self.label = LABELS[self.metric]  # SystemMonitorWidget attribute to recolor
+        self.notify = bool(spec.get("notify", False))
+        self.window = None
+        self.active = False
+        self.value = None
+        self.notified = None
+
+    def describe(self):
+        unit = "%" if self.metric in ("cpu", "mem") else " MB/s"
+        return f"{self.metric} {self.agg} {self.value:.2f}{unit} over {self.seconds:g}s ({self.op} {self.threshold:g})"
+
+
+class AlertEngine:
+    """Evaluates every rule once per tick against shared sliding windows"""
+
+    def __init__(self, specs, notifier=None):
+        self.rules = []
+        for spec in specs or []:
+            try:
+                self.rules.append(AlertRule(spec))
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                logger.warning(f"Ignoring alert rule {spec!r}: {e}")
+        self.notifier = notifier if notifier is not None else send_notification
+        self.windows = {}   # metric -> {seconds: SlidingWindow}
+        for rule in self.rules:
+            window = self.windows.setdefault(rule.metric, {}).get(rule.seconds)
+            if window is None:
+                window = self.windows[rule.metric][rule.seconds] = SlidingWindow(rule.seconds)
+            window.track_min |= rule.agg == "min"
+            window.track_max |= rule.agg == "max"
+            rule.window = window
+        self.window_list = [(metric, w) for metric, by_seconds in self.windows.items() for w in by_seconds.values()]
+        self.label_colors = {}
+        logger.info(f"{len(self.rules)} alert rules over {len(self.window_list)} windows")
+
+    def update(self, t, values):
+        """Feed one sample per metric; returns the rules that switched on or off"""
+        for metric, window in self.window_list:
+            value = values.get(metric)
+            if value is not None:
+                window.push(t, value)
+        changed = []
+        for rule in self.rules:
+            window = rule.window
+            if window.samples and window.full(t):
+                rule.value = window.aggregate(rule.agg)
+                active = rule.compare(rule.value, rule.threshold)
+            else:
+                active = False
+            if active != rule.active:
+                rule.active = active
+                changed.append(rule)
+        if changed:
+            self._state_changed(t, changed)
+        return changed
+
+    def _state_changed(self, t, changed):
+        colors = {}
+        for rule in self.rules:
+            if rule.active and rule.label not in colors:
+                colors[rule.label] = rule.color  # First active rule in config order wins
+        self.label_colors = colors
+        for rule in changed:
+            if not rule.active:
+                logger.info(f"Alert cleared: {rule.name}")
+                continue
+            logger.info(f"Alert: {rule.name} ({rule.describe()})")
+            if rule.notify and (rule.notified is None or t - rule.notified >= NOTIFY_COOLDOWN):
+                rule.notified = t
+                self.notifier(f"Taskbar Widget: {rule.name}", rule.describe())
+
+    def color_for(self, label, default):
+        return self.label_colors.get(label, default)
+
+
+def send_notification(title, message):
+    """Desktop notification, best effort: a Windows toast via PowerShell, notify-send elsewhere"""
+    try:
+        if sys.platform == "win32":
+            def quote(text):
+                return "'" + text.replace("'", "''") + "'"
+            script = (
+                "[Windows.UI.Notifications.ToastNotificationManager, Windows.UI.Notifications, "
+                "ContentType = WindowsRuntime] | Out-Null; "
+                "$xml = [Windows.UI.Notifications.ToastNotificationManager]::GetTemplateContent("
+                "[Windows.UI.Notifications.ToastTemplateType]::ToastText02); "
+                "$text = $xml.GetElementsByTagName('text'); "
+                f"$text.Item(0).AppendChild($xml.CreateTextNode({quote(title)})) | Out-Null; "
+                f"$text.Item(1).AppendChild($xml.CreateTextNode({quote(message)})) | Out-Null; "
+                "[Windows.UI.Notifications.ToastNotificationManager]::CreateToastNotifier("
+                f"{quote(TOAST_APP_ID)}).Show([Windows.UI.Notifications.ToastNotification]::new($xml))")
+            subprocess.Popen(["powershell", "-NoProfile", "-NonInteractive", "-Command", script],
+                             creationflags=subprocess.CREATE_NO_WINDOW)
+        elif shutil.which("notify-send"):
+            subprocess.Popen(["notify-send", title, message])
+    except OSError as e:
+        logger.warning(f"Could not show alert notification: {e}")
@@ -0,0 +1,175 @@
+"""
+Album art cache for the Taskbar Widget
+Pre-resized 40x40 RGB art in one memory-mapped pack file of fixed-size slots,
+keyed by a hash of the source image and indexed by (title, artist), with LRU
+eviction once every slot is used. A small JSON index next to the pack keeps
+the slot map across restarts, so art shows as soon as a known track starts,
+before the WinRT thumbnail stream has been read.
+
+Each slot starts with the digest it holds, so a crash between writing pixels
+and saving the index can never show the wrong art.
+"""
+
+import os
+import json
+import mmap
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+logger = logging.getLogger("widget.media")
+
+ART_SIZE = (40, 40)
+DIGEST_BYTES = 16
+PIXEL_BYTES = ART_SIZE[0] * ART_SIZE[1] * 3
+SLOT_BYTES = DIGEST_BYTES + PIXEL_BYTES
+INDEX_VERSION = 1
+
+
+def art_digest(data):
+    """Content key of a source thumbnail (any buffer-protocol object)"""
+    return hashlib.blake2b(data, digest_size=DIGEST_BYTES).hexdigest()
+
+
+def track_key(title, artist):
+    return f"{title or ''}\x1f{artist or ''}"
+
+
+class ArtCache:
+    """Fixed-slot mmapped art store; directory=None keeps it in anonymous memory"""
+
+    def __init__(self, directory, capacity=256):
+        self.capacity = max(1, int(capacity))
+        self.directory = directory
+        self.slots = OrderedDict()  # digest -> slot, least recently used first
+        self.tracks = {}            # track_key -> digest
+        self.free = []
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.file = None
+        self.hits = 0
+        self.misses = 0
+
+        size = self.capacity * SLOT_BYTES
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.index_path = os.path.join(directory, "album_art.json")
+            pack_path = os.path.join(directory, "album_art.pack")
+            self.file = open(pack_path, "r+b" if os.path.exists(pack_path) else "w+b")
+            if os.path.getsize(pack_path) != size:
+                self.file.truncate(size)
+            self.map = mmap.mmap(self.file.fileno(), size)
+            self._load_index()
+        else:
+            self.index_path = None
+            self.map = mmap.mmap(-1, size)
+        used = set(self.slots.values())
+        self.free = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in used]
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Album art index unreadable, starting empty: {e}")
+            return
+        if index.get("version") != INDEX_VERSION or index.get("capacity") != self.capacity:
+            return  # slot layout changed: start over
+        for digest, slot in index.get("slots", []):
+            if 0 <= slot < self.capacity and self._slot_digest(slot) == digest:
+                self.slots[digest] = slot
+        self.tracks = {key: digest for key, digest in index.get("tracks", {}).items()
+                       if digest in self.slots}
+
+    def _slot_digest(self, slot):
+        offset = slot * SLOT_BYTES
+        return self.map[offset:offset + DIGEST_BYTES].hex()
+
+    def save(self):
+        """Persist the index (atomic replace) and flush written slots"""
+        with self.lock:
+            if not self.index_path or not self.dirty:
+                return
+            index = {"version": INDEX_VERSION, "capacity": self.capacity,
+                     "slots": list(self.slots.items()), "tracks": self.tracks}
+            self.dirty = False
+        try:
+            self.map.flush()
+            tmp = self.index_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            logger.warning(f"Album art index save failed: {e}")
+
+    def lookup(self, title, artist):
+        """Digest of the art last seen for this track, if still cached"""
+        digest = self.tracks.get(track_key(title, artist))
+        return digest if digest in self.slots else None
+
+    def get(self, digest):
+        """40x40 RGB image for a digest, or None"""
+        with self.lock:
+            slot = self.slots.get(digest)
+            if slot is None:
+                self.misses += 1
+                return None
+            self.slots.move_to_end(digest)
+            self.dirty = True
+            self.hits += 1
+            offset = slot * SLOT_BYTES + DIGEST_BYTES
+            pixels = self.map[offset:offset + PIXEL_BYTES]
+        return Image.frombytes("RGB", ART_SIZE, pixels)
+
+    def put(self, digest, image, title=None, artist=None):
+        """Store a 40x40 image under digest (evicting the LRU slot) and link the track"""
+        if image.mode != "RGB" or image.size != ART_SIZE:
+            image = image.convert("RGB").resize(ART_SIZE)
+        with self.lock:
+            if digest not in self.slots:
+                if self.free:
+                    slot = self.free.pop()
+                else:
+                    old, slot = self.slots.popitem(last=False)
+                    self.tracks = {k: d for k, d in self.tracks.items() if d != old}
+                offset = slot * SLOT_BYTES
+                self.map[offset:offset + SLOT_BYTES] = bytes.fromhex(digest) + image.tobytes()
+                self.slots[digest] = slot
+            else:
+                self.slots.move_to_end(digest)
+            if title or artist:
+                self._link(track_key(title, artist), digest)
+            self.dirty = True
+        self.save()
+
+    def link(self, title, artist, digest):
+        """Point a track at already-cached art"""
+        key = track_key(title, artist)
+        if self.tracks.get(key) == digest or digest not in self.slots:
+            return
+        with self.lock:
+            self._link(key, digest)
+            self.dirty = True
+        self.save()
+
+    def _link(self, key, digest):
+        self.tracks.pop(key, None)
+        self.tracks[key] = digest
+        # Many tracks can share one album's art; bound the map all the same
+        if len(self.tracks) > self.capacity * 8:
+            del self.tracks[next(iter(self.tracks))]
+
+    def close(self):
+        self.save()
+        self.map.close()
+        if self.file:
+            self.file.close()
+
+    def stats(self):
+        return {"entries": len(self.slots), "capacity": self.capacity, "tracks": len(self.tracks),
+                "hits": self.hits, "misses": self.misses}
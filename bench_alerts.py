@@ -0,0 +1,123 @@
+"""
+Alert engine benchmark
+Times AlertEngine.update per 1 Hz tick with hundreds of rules (random metric,
+operator, aggregate and window from 5 s to 30 min) against a baseline that
+keeps each rule's history and rescans it every tick (exact sums), and checks
+both agree on which rules are active at every tick. An average within a few
+ulps of its threshold may round either way and counts as agreeing.
+
+Usage: python bench_alerts.py [--rules 100 300 1000] [--ticks 300]
+"""
+
+import sys
+import math
+import time
+import random
+import argparse
+import statistics
+from collections import deque
+
+from alerts import AlertEngine, OPS, METRICS
+
+WINDOWS = (5, 10, 30, 60, 120, 300, 600, 1800)
+WARMUP = max(WINDOWS) + 60  # Ticks before timing, so every window is full
+TIE = 1e-9                  # Relative distance from a threshold within which rounding decides
+
+
+def make_rules(count, seed=1):
+    rng = random.Random(seed)
+    rules = []
+    for i in range(count):
+        metric = rng.choice(METRICS)
+        scale = 100 if metric in ("cpu", "mem") else 10
+        rules.append({"name": f"rule {i}", "metric": metric, "op": rng.choice(list(OPS)),
+                      "value": round(rng.uniform(0.2, 0.8) * scale, 2), "for": rng.choice(WINDOWS),
+                      "agg": rng.choice(("all", "all", "avg", "min", "max"))})
+    return rules
+
+
+def samples(count):
+    for i in range(count):
+        burst = 1.0 if (i // 240) % 3 == 0 else 0.0  # Four minutes busy, eight quiet
+        yield 1000.0 + i, {
+            "cpu": min(100.0, 20 + 70 * burst + 10 * math.sin(i / 7)),
+            "mem": 50 + 20 * math.sin(i / 900),
+            "up": abs(2 * math.sin(i / 60)) + 3 * burst,
+            "down": (i * 7919 % 1000) / 100 * (1 - burst),
+        }
+
+
+class RescanEngine:
+    """Baseline: each rule keeps its own history and recomputes its aggregate every tick"""
+
+    def __init__(self, engine):
+        self.rules = [(rule, deque()) for rule in engine.rules]
+        self.started = None
+
+    def update(self, t, values, evaluate=True):
+        if self.started is None:
+            self.started = t
+        states = []  # (active, aggregate or None before the window is full)
+        for rule, history in self.rules:
+            history.append((t, values[rule.metric]))
+            while history[0][0] <= t - rule.seconds:
+                history.popleft()
+            if not evaluate:
+                continue
+            if t - self.started < rule.seconds:
+                states.append((False, None))
+                continue
+            window = [v for _, v in history]
+            if rule.agg == "avg":
+                value = math.fsum(window) / len(window)
+            else:
+                value = min(window) if rule.agg == "min" else max(window)
+            states.append((rule.compare(value, rule.threshold), value))
+        return states
+
+
+def agree(engine, expected):
+    """Same active rules, except where the exact aggregate sits on the threshold"""
+    for rule, (active, value) in zip(engine.rules, expected):
+        if rule.active != active and (value is None or
+                                      abs(value - rule.threshold) > TIE * max(1.0, abs(rule.threshold))):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rules", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--ticks", type=int, default=300, help="timed ticks per engine")
+    args = parser.parse_args()
+
+    print(f"{WARMUP} warm-up ticks, then {args.ticks} timed ticks\n")
+    print(f"{'rules':>6} {'windows':>8} {'active':>7} {'sliding us/tick':>16} {'rescan us/tick':>15} {'speedup':>8}")
+    for count in args.rules:
+        engine = AlertEngine(make_rules(count), notifier=lambda title, message: None)
+        rescan = RescanEngine(engine)
+        stream = list(samples(WARMUP + args.ticks))
+        for t, values in stream[:WARMUP]:
+            engine.update(t, values)
+            rescan.update(t, values, evaluate=False)
+        sliding_times, rescan_times, active = [], [], 0
+        for t, values in stream[WARMUP:]:
+            t0 = time.perf_counter()
+            engine.update(t, values)
+            t1 = time.perf_counter()
+            expected = rescan.update(t, values)
+            t2 = time.perf_counter()
+            sliding_times.append(t1 - t0)
+            rescan_times.append(t2 - t1)
+            if not agree(engine, expected):
+                raise SystemExit(f"Engines disagree at t={t}")
+            active += sum(rule.active for rule in engine.rules)
+        sliding = statistics.median(sliding_times) * 1e6
+        baseline = statistics.median(rescan_times) * 1e6
+        print(f"{count:6d} {len(engine.window_list):8d} {active / args.ticks:7.0f} {sliding:16.1f} "
+              f"{baseline:15.1f} {baseline / sliding:7.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Bar rendering benchmark
+Builds the bar in both render modes ("widgets" Frame/Label tree and "canvas")
+and times construction, a visibility toggle (apply_visibility), a stats tick
+(four label updates) and the auto-hide music cycle, each followed by
+update_idletasks so Tk's geometry/redraw work is included.
+
+Needs an X display; without $DISPLAY it starts Xvfb (must be installed).
+
+Usage: python bench_canvas_bar.py [--iterations 500]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+
+def ensure_display():
+    """Start a private Xvfb if there is no display; returns the process or None"""
+    if os.environ.get("DISPLAY") or sys.platform == "win32":
+        return None
+    if not shutil.which("Xvfb"):
+        raise SystemExit("No $DISPLAY and Xvfb not found (apt install xvfb)")
+    display = ":97"
+    proc = subprocess.Popen(["Xvfb", display, "-screen", "0", "1920x1080x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1.0)
+    os.environ["DISPLAY"] = display
+    return proc
+
+
+def make_widget(mode, workdir):
+    """SystemMonitorWidget with only its bar built (no timers, media or EQ)"""
+    import tkinter as tk
+    import taskbar_widget as tw
+
+    config = tw.ConfigManager(os.path.join(workdir, f"{mode}.json"))
+    config.config.update(render_mode=mode, show_traffic=True, show_system=True, music_mode="always")
+    widget = tw.SystemMonitorWidget.__new__(tw.SystemMonitorWidget)
+    widget.config = config
+    widget.root = tk.Tk()
+    widget.bg_color, widget.fg_color, widget.accent_color = "#202020", "#ffffff", "#4cc2ff"
+    widget.font_style = ("Segoe UI", 8)
+    widget.font_bold = ("Segoe UI", 8, "bold")
+    widget.last_title = "Song"
+    widget.providers = []
+    start = time.perf_counter()
+    if mode == "canvas":
+        widget.build_canvas_bar()
+    else:
+        widget.build_widget_bar()
+    widget.apply_visibility()
+    widget.root.update()
+    return widget, (time.perf_counter() - start) * 1000
+
+
+def per_op_us(widget, iterations, op):
+    root = widget.root
+    start = time.perf_counter()
+    for i in range(iterations):
+        op(i)
+        root.update_idletasks()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run_mode(mode, iterations, workdir):
+    widget, build_ms = make_widget(mode, workdir)
+    config = widget.config
+
+    def toggle(i):
+        config.config["show_traffic"] = bool(i % 2)
+        widget.apply_visibility()
+
+    def tick(i):
+        widget.cpu_label.config(text=f"CPU: {i % 100}%")
+        widget.mem_label.config(text=f"MEM: {50 + i % 3}%")
+        widget.net_up_label.config(text=f"▲ {i % 7 / 10:.2f} MB/s")
+        widget.net_down_label.config(text="▼ 0.00 MB/s")  # idle link: usually unchanged
+
+    def auto_hide(i):
+        # update_media_ui's path: hide when nothing plays, re-show on the next track
+        if i % 2:
+            widget.music_frame.pack_forget()
+            widget.sep1.pack_forget()
+        else:
+            widget.apply_visibility()
+
+    results = {
+        "build_ms": build_ms,
+        "toggle_us": per_op_us(widget, iterations, toggle),
+        "tick_us": per_op_us(widget, iterations, tick),
+        "auto_hide_us": per_op_us(widget, iterations, auto_hide),
+        "tk_widgets": sum(1 for _ in _descendants(widget.root)),
+    }
+    widget.root.destroy()
+    return results
+
+
+def _descendants(widget):
+    for child in widget.winfo_children():
+        yield child
+        yield from _descendants(child)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    xvfb = ensure_display()
+    workdir = tempfile.mkdtemp(prefix="widget_bar_")
+    try:
+        rows = [(mode, run_mode(mode, args.iterations, workdir)) for mode in ("widgets", "canvas")]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if xvfb:
+            xvfb.terminate()
+
+    print(f"{args.iterations} iterations per case, update_idletasks after each\n")
+    print(f"{'mode':<9} {'build ms':>9} {'toggle us':>10} {'tick us':>9} {'auto-hide us':>13} {'Tk widgets':>11}")
+    for mode, r in rows:
+        print(f"{mode:<9} {r['build_ms']:9.1f} {r['toggle_us']:10.1f} {r['tick_us']:9.1f} "
+              f"{r['auto_hide_us']:13.1f} {r['tk_widgets']:11d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Per-core heatmap benchmark
+Frame cost from 4 to 256 cores: the vectorized LUT + pixel-map path used by
+CpuHeatmap vs. a per-core Python loop filling the same image. With a display
+(or Xvfb) it also times the PPM upload into the Tk PhotoImage.
+
+Usage: python bench_cpu_heatmap.py [--frames 2000]
+"""
+
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+
+from cpu_heatmap import CpuHeatmap, color_table, grid_shape, pixel_map
+
+WIDTH, HEIGHT = 48, 40
+
+
+def loop_frame(percents, lut, rows, cols, header):
+    """Baseline: paint each core's cell with Python slicing"""
+    cell_h, cell_w = HEIGHT // rows, WIDTH // cols
+    pixels = bytearray(bytes(lut[101]) * (WIDTH * HEIGHT))
+    for i, pct in enumerate(percents):
+        color = bytes(lut[int(round(min(100, max(0, pct))))]) * cell_w
+        y0, x0 = (i // cols) * cell_h, (i % cols) * cell_w
+        for y in range(y0, y0 + cell_h):
+            start = (y * WIDTH + x0) * 3
+            pixels[start:start + len(color)] = color
+    return header + bytes(pixels)
+
+
+def time_per_frame(func, samples, frames):
+    start = time.perf_counter()
+    for i in range(frames):
+        func(samples[i % len(samples)])
+    return (time.perf_counter() - start) / frames * 1e6
+
+
+def make_heatmap(cores, master):
+    if master is not None:
+        return CpuHeatmap(master, cores, WIDTH, HEIGHT)
+    heatmap = CpuHeatmap.__new__(CpuHeatmap)  # numpy part only, no Tk image
+    heatmap.cores, heatmap.width, heatmap.height = cores, WIDTH, HEIGHT
+    heatmap.lut = color_table("#202020")
+    heatmap.index = pixel_map(cores, WIDTH, HEIGHT)
+    heatmap.levels = np.full(cores + 1, 101, dtype=np.intp)
+    heatmap.header = f"P6 {WIDTH} {HEIGHT} 255\n".encode("ascii")
+    return heatmap
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+
+    master = None
+    try:
+        import tkinter as tk
+        master = tk.Tk()
+        master.withdraw()
+    except Exception as e:
+        print(f"No display ({e.__class__.__name__}); timing frame composition only\n")
+
+    rng = random.Random(1)
+    print(f"{WIDTH}x{HEIGHT} px image, {args.frames} frames per case\n")
+    header = f"{'cores':>6} {'grid':>7} {'vectorized us':>14} {'per-core loop us':>17}"
+    if master is not None:
+        header += f" {'+ Tk upload us':>15}"
+    print(header)
+    for cores in (4, 8, 16, 32, 64, 128, 256):
+        samples = [[rng.uniform(0, 100) for _ in range(cores)] for _ in range(64)]
+        heatmap = make_heatmap(cores, master)
+        rows, cols = grid_shape(cores, WIDTH, HEIGHT)
+        vec = time_per_frame(heatmap.frame, samples, args.frames)
+        loop = time_per_frame(lambda p: loop_frame(p, heatmap.lut, rows, cols, heatmap.header),
+                              samples, max(1, args.frames // 4))
+        line = f"{cores:6d} {rows:>3}x{cols:<3} {vec:14.1f} {loop:17.1f}"
+        if master is not None:
+            line += f" {time_per_frame(heatmap.update, samples, args.frames):15.1f}"
+        print(line)
+
+    if master is not None:
+        master.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Logging hot-path benchmark
+Measures the per-call cost seen by the calling thread for the old synchronous
+basicConfig file logging vs. the queue/rotation/dedup pipeline.
+
+Usage: python bench_logging.py [--calls 20000]
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+import widget_logging
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def per_call_us(logger, calls, unique):
+    start = time.perf_counter()
+    if unique:
+        for i in range(calls):
+            logger.info(f"Applied EQ settings: 10 bands, {i} filters")
+    else:
+        for _ in range(calls):
+            logger.warning("PowerShell timeout")
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="widget_log_")
+    logger = logging.getLogger("widget.media")
+    results = []
+    try:
+        for label, unique in (("repeated message", False), ("unique messages", True)):
+            # Before: synchronous FileHandler via basicConfig
+            reset_root()
+            path = os.path.join(workdir, f"before_{unique}.log")
+            logging.basicConfig(filename=path, level=logging.INFO,
+                                format='%(asctime)s - %(levelname)s - %(message)s')
+            before = per_call_us(logger, args.calls, unique)
+            reset_root()
+            before_size = os.path.getsize(path)
+
+            # After: queue handler + background writer + dedup
+            path = os.path.join(workdir, f"after_{unique}.log")
+            widget_logging.setup_logging(path, dedup_seconds=60)
+            after = per_call_us(logger, args.calls, unique)
+            drain = time.perf_counter()
+            widget_logging.stop_logging()
+            drain = (time.perf_counter() - drain) * 1000
+            reset_root()
+            after_size = os.path.getsize(path) if os.path.exists(path) else 0
+
+            results.append((label, before, after, before_size, after_size, drain))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.calls} calls per case (cost on the calling thread)\n")
+    print(f"{'case':<18} {'before us/call':>15} {'after us/call':>14} {'before KiB':>11} {'after KiB':>10} {'drain ms':>9}")
+    for label, before, after, before_size, after_size, drain in results:
+        print(f"{label:<18} {before:15.2f} {after:14.2f} {before_size / 1024:11.1f} "
+              f"{after_size / 1024:10.1f} {drain:9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
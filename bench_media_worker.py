@@ -0,0 +1,89 @@
+"""
+Media worker benchmark
+Compares per-request latency of spawning a script per poll (what the old
+PowerShell fallback did) with one persistent JSON-lines worker, using the
+Python stand-in worker so it runs anywhere. Also exercises hang recovery.
+
+Usage: python bench_media_worker.py [--requests 200] [--spawns 20]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from media_worker import ScriptWorker, SCRIPT_DIR
+
+STANDIN = [sys.executable, "-u", os.path.join(SCRIPT_DIR, "media_worker.py"), "--standin"]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda f: samples[min(len(samples) - 1, int(f * len(samples)))] * 1000
+    return pick(0.50), pick(0.95), max(samples) * 1000
+
+
+def spawn_per_call(count):
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        out = subprocess.run(STANDIN + ["--once"], capture_output=True, text=True,
+                             input=json.dumps({"id": i, "cmd": "get_media"}) + "\n", timeout=10)
+        json.loads(out.stdout)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def persistent(count):
+    worker = ScriptWorker(STANDIN)
+    samples = []
+    try:
+        worker.request("ping")  # startup is paid once, not per request
+        for _ in range(count):
+            start = time.perf_counter()
+            assert worker.request("get_media")["ok"]
+            samples.append(time.perf_counter() - start)
+    finally:
+        worker.stop()
+    return samples, worker.stats()
+
+
+def hang_recovery():
+    """A worker that never answers must be killed and replaced"""
+    worker = ScriptWorker([sys.executable, "-c", "import time; time.sleep(60)"],
+                          timeout=0.2, startup_timeout=0.2)
+    start = time.perf_counter()
+    assert worker.request("ping") is None
+    detect = (time.perf_counter() - start) * 1000
+    worker.command = STANDIN
+    worker.retry_at = 0  # skip backoff for the benchmark
+    response = worker.request("ping")
+    recovered = bool(response and response.get("pong"))
+    worker.stop()
+    return detect, recovered, worker.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--spawns", type=int, default=20)
+    args = parser.parse_args()
+
+    spawn = percentiles(spawn_per_call(args.spawns))
+    samples, stats = persistent(args.requests)
+    kept = percentiles(samples)
+    detect, recovered, hang_stats = hang_recovery()
+
+    print(f"{'mode':<22} {'requests':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    print(f"{'spawn per call':<22} {args.spawns:9d} {spawn[0]:9.2f} {spawn[1]:9.2f} {spawn[2]:9.2f}")
+    print(f"{'persistent worker':<22} {args.requests:9d} {kept[0]:9.2f} {kept[1]:9.2f} {kept[2]:9.2f}")
+    print(f"\nspeedup (p50): {spawn[0] / kept[0]:.0f}x   worker stats: {stats}")
+    print(f"hang detected after {detect:.0f} ms, recovered: {recovered}, "
+          f"restarts: {hang_stats['restarts']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
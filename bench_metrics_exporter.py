@@ -0,0 +1,173 @@
+"""
+Metrics exporter load test
+Hammers /metrics from several scraper processes for a few seconds each and
+reports throughput and latency for: the exporter with keep-alive, the
+exporter with a new connection per scrape, and a plain http.server handler
+that renders the text on every request. A simulated Tk thread in the server
+process ticks every 10 ms and reports how late its ticks run under load.
+
+Usage: python bench_metrics_exporter.py [--clients 4] [--seconds 3]
+"""
+
+import sys
+import time
+import socket
+import argparse
+import threading
+import multiprocessing as mp
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from metrics_exporter import MetricsExporter, render_prometheus, PROMETHEUS_TYPE
+
+REQUEST = b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n"
+
+
+def sample(i, cores=16):
+    return {"timestamp": time.time(), "cpu_percent": i % 100, "mem_percent": 42.0,
+            "up_bytes_per_second": 1234.5, "down_bytes_per_second": 56789.0,
+            "bytes_sent": 10 ** 9 + i, "bytes_recv": 10 ** 10 + i,
+            "percpu": [float((i + c) % 100) for c in range(cores)], "remote": []}
+
+
+def read_response(sock, buffer):
+    while b"\r\n\r\n" not in buffer:
+        chunk = sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("closed")
+        buffer += chunk
+    head, _, rest = buffer.partition(b"\r\n\r\n")
+    length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+    while len(rest) < length:
+        chunk = sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("short body")
+        rest += chunk
+    return rest[length:]
+
+
+def scraper(address, keep_alive, seconds, start_at, results):
+    latencies = []
+    while time.time() < start_at:
+        time.sleep(0.005)
+    end = time.perf_counter() + seconds
+    sock = None
+    buffer = b""
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        if sock is None:
+            sock = socket.create_connection(address)
+            buffer = b""
+        sock.sendall(REQUEST if keep_alive else REQUEST[:-2] + b"Connection: close\r\n\r\n")
+        buffer = read_response(sock, buffer)
+        if not keep_alive:
+            sock.close()
+            sock = None
+        latencies.append(time.perf_counter() - t0)
+    if sock is not None:
+        sock.close()
+    results.put(latencies)
+
+
+class Tick(threading.Thread):
+    """Stands in for the Tk loop: wakes every 10 ms and records how late it was"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.late = []
+        self.running = True
+
+    def run(self):
+        while self.running:
+            due = time.perf_counter() + 0.01
+            time.sleep(0.01)
+            self.late.append(time.perf_counter() - due)
+
+
+def load(address, keep_alive, args):
+    results = mp.Queue()
+    start_at = time.time() + 1.0
+    procs = [mp.Process(target=scraper, args=(address, keep_alive, args.seconds, start_at, results))
+             for _ in range(args.clients)]
+    for p in procs:
+        p.start()
+    tick = Tick()
+    time.sleep(max(0.0, start_at - time.time()))
+    tick.start()
+    latencies = []
+    for _ in procs:
+        latencies += results.get(timeout=args.seconds + 60)
+    tick.running = False
+    for p in procs:
+        p.join()
+    latencies.sort()
+    late = sorted(tick.late) or [0.0]
+    return (len(latencies) / args.seconds, latencies[len(latencies) // 2] * 1e6,
+            latencies[int(len(latencies) * 0.99)] * 1e6, late[int(len(late) * 0.99)] * 1000)
+
+
+class RenderPerRequest(BaseHTTPRequestHandler):
+    """Baseline: render on every scrape, one connection per request (HTTP/1.0)"""
+
+    counter = 0
+
+    def do_GET(self):
+        RenderPerRequest.counter += 1
+        body = render_prometheus(sample(RenderPerRequest.counter))
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    exporter = MetricsExporter("127.0.0.1:0")
+    if not exporter.start():
+        return 1
+    stop = threading.Event()
+
+    def publisher():
+        i = 0
+        while not stop.is_set():
+            s = sample(i)
+            exporter.publish(s["timestamp"], s["cpu_percent"], s["mem_percent"], s["up_bytes_per_second"],
+                             s["down_bytes_per_second"], s["bytes_sent"], s["bytes_recv"], s["percpu"])
+            i += 1
+            stop.wait(1.0)
+    threading.Thread(target=publisher, daemon=True).start()
+
+    t0 = time.perf_counter()
+    for i in range(10000):
+        exporter.publish(0.0, 1.0, 2.0, 3.0, 4.0, 5, 6, sample(i)["percpu"])
+    publish_us = (time.perf_counter() - t0) / 10000 * 1e6
+
+    baseline = ThreadingHTTPServer(("127.0.0.1", 0), RenderPerRequest)
+    threading.Thread(target=baseline.serve_forever, daemon=True).start()
+
+    print(f"{args.clients} scraper processes, {args.seconds:g}s per case; publish() on the Tk thread: "
+          f"{publish_us:.1f} us\n")
+    print(f"{'server':<34} {'req/s':>8} {'p50 us':>8} {'p99 us':>8} {'tick p99 late ms':>17}")
+    cases = (("exporter, keep-alive", exporter.bound, True),
+             ("exporter, connection per scrape", exporter.bound, False),
+             ("http.server, render per request", baseline.server_address, False))
+    for name, address, keep_alive in cases:
+        rate, p50, p99, late = load(address, keep_alive, args)
+        print(f"{name:<34} {rate:8.0f} {p50:8.0f} {p99:8.0f} {late:17.2f}")
+    print(f"\nexporter rendered {exporter.renders} times for {exporter.requests} requests")
+
+    stop.set()
+    baseline.shutdown()
+    exporter.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Metrics recorder benchmark
+Writes a synthetic month of 1 Hz samples through MetricsRecorder, then reports
+the storage per day (vs. the same samples as JSON lines), the per-sample
+write cost on the caller's thread with and without batching, and query /
+downsample times over the month with the memory-mapped reader vs. unpacking
+every record with struct.
+
+Usage: python bench_metrics_recorder.py [--days 30] [--dir DIR]
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import shutil
+import argparse
+import tempfile
+
+from metrics_recorder import MetricsRecorder, RECORD, HEADER, query, downsample, segments
+
+DAY = 86400
+
+
+def synthetic(start, count):
+    for i in range(count):
+        t = start + i
+        yield (t, 30 + 25 * math.sin(i / 600), 55 + (i % 3600) / 360, (i * 7919) % 2_000_000,
+               (i * 104729) % 20_000_000, (i // 1800) % 2 == 0)
+
+
+def timed(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+
+def struct_scan(directory, start, end):
+    """Baseline: read and unpack every record, keep the ones in range"""
+    rows = []
+    for path in segments(directory):
+        with open(path, "rb") as f:
+            data = f.read()[HEADER.size:]
+        rows += [r for r in RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size])
+                 if start <= r[0] < end]
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--dir", help="recording directory (default: a temporary one)")
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp(prefix="tbr_bench_")
+    start = (time.time() // DAY - args.days - 1) * DAY
+    try:
+        # Write cost per sample (one day), batched vs. a write per sample
+        for batch in (1, 60):
+            scratch = tempfile.mkdtemp(prefix="tbr_batch_")
+            recorder = MetricsRecorder(scratch, batch=batch)
+            samples = list(synthetic(start, DAY // 4))
+            t0 = time.perf_counter()
+            for sample in samples:
+                recorder.record(*sample)
+            recorder.close()
+            per_sample = (time.perf_counter() - t0) / len(samples) * 1e6
+            print(f"record(), batch {batch:>2}: {per_sample:6.2f} us/sample ({recorder.writes} writes)")
+            shutil.rmtree(scratch)
+
+        # A month of data
+        t0 = time.perf_counter()
+        recorder = MetricsRecorder(directory, batch=3600)
+        for sample in synthetic(start, args.days * DAY):
+            recorder.record(*sample)
+        recorder.close()
+        write_s = time.perf_counter() - t0
+        sizes = [os.path.getsize(p) for p in segments(directory)]
+        json_day = sum(len(json.dumps({"t": t, "cpu": round(c, 1), "mem": round(m, 1), "up": u, "down": d,
+                                        "playing": p})) + 1 for t, c, m, u, d, p in synthetic(start, DAY))
+        print(f"\n{args.days} days at 1 Hz: {len(sizes)} segments, {sum(sizes) / 2 ** 20:.1f} MiB, "
+              f"written in {write_s:.1f}s")
+        print(f"per day: {max(sizes) / 2 ** 20:.2f} MiB binary vs {json_day / 2 ** 20:.2f} MiB as JSON lines\n")
+
+        mid = start + args.days * DAY / 2
+        cases = (
+            ("1 hour range", mid, mid + 3600, None),
+            ("1 day range", mid, mid + DAY, None),
+            ("whole month", start, start + args.days * DAY, None),
+            ("month -> 1 h buckets", start, start + args.days * DAY, 3600),
+            ("month -> 1 min buckets", start, start + args.days * DAY, 60),
+        )
+        print(f"{'query':<24} {'rows':>9} {'mmap ms':>9} {'struct scan ms':>15}")
+        for name, lo, hi, step in cases:
+            def run():
+                records = query(directory, lo, hi)
+                return downsample(records, step)["start"] if step else records
+            ms, result = timed(run)
+            scan = ""
+            if step is None and name != "whole month":
+                scan_ms, rows = timed(lambda: struct_scan(directory, lo, hi), repeat=1)
+                assert len(rows) == len(result)
+                scan = f"{scan_ms:15.0f}"
+            print(f"{name:<24} {len(result):9d} {ms:9.2f} {scan}")
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
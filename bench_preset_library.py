@@ -0,0 +1,123 @@
+"""
+Preset library benchmark
+Generates synthetic AutoEQ-style headphone profiles and measures index build
+time, query latency and memory for directory and packed sources.
+
+Usage: python bench_preset_library.py [--count 5000]
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+from equalizer_manager import EqualizerManager, ISO_31_BANDS
+from preset_library import PresetLibrary
+
+BRANDS = ["Sennheiser", "Beyerdynamic", "Audio-Technica", "Sony", "AKG", "HiFiMAN",
+          "Focal", "Grado", "Shure", "Moondrop", "Etymotic", "Bose", "Apple", "Koss",
+          "Philips", "Fostex", "Dan Clark Audio", "Campfire", "Final", "Tin HiFi"]
+SOURCES = ["oratory1990", "crinacle", "Rtings", "Innerfidelity", "Headphone.com"]
+
+
+def generate_profiles(root, count, seed=1):
+    """Write `count` profile files (mix of GraphicEQ and ParametricEQ)"""
+    rng = random.Random(seed)
+    for i in range(count):
+        name = f"{rng.choice(BRANDS)} {rng.choice('ABCDEFHKMSTX')}{rng.choice('DHMX')} {100 + i}"
+        folder = os.path.join(root, rng.choice(SOURCES), name)
+        os.makedirs(folder, exist_ok=True)
+        if i % 2:
+            lines = [f"Preamp: {-rng.uniform(2, 8):.1f} dB"]
+            for n in range(10):
+                lines.append(f"Filter {n + 1}: ON PK Fc {rng.uniform(20, 16000):.0f} Hz "
+                             f"Gain {rng.uniform(-6, 6):.1f} dB Q {rng.uniform(0.5, 3):.2f}")
+            path = os.path.join(folder, f"{name} ParametricEQ.txt")
+        else:
+            parts = [f"{freq:g} {rng.uniform(-6, 6):.1f}" for freq in ISO_31_BANDS]
+            lines = ["GraphicEQ: " + "; ".join(parts)]
+            path = os.path.join(folder, f"{name} GraphicEQ.txt")
+        with open(path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def typed_queries(rng, names, count):
+    """Incremental prefixes, as produced by a user typing preset names"""
+    queries = []
+    for name in rng.sample(names, count):
+        for end in range(1, len(name) + 1):
+            queries.append(name[:end])
+    return queries
+
+
+def measure_index(label, source):
+    tracemalloc.start()
+    start = time.perf_counter()
+    library = PresetLibrary(EqualizerManager.PRESETS, EqualizerManager.BANDS, source)
+    library._ensure_index()
+    build_ms = (time.perf_counter() - start) * 1000
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} presets={len(library):>6}  build={build_ms:8.1f} ms  "
+          f"peak_mem={peak / 1024:8.0f} KiB  tokens={len(library.tokens)}")
+    return library
+
+
+def measure_queries(label, library, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        library.search(query)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"{label:<10} queries={len(queries):>6}  p50={p50:8.1f} us  p99={p99:8.1f} us  "
+          f"max={latencies[-1]:8.1f} us")
+
+
+def measure_loads(label, library, names):
+    start = time.perf_counter()
+    for name in names:
+        library.load(name)
+    per_load = (time.perf_counter() - start) / len(names) * 1e6
+    print(f"{label:<10} loads={len(names):>8}  {per_load:8.1f} us/profile")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=5000, help="number of profiles")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="eq_presets_")
+    try:
+        profiles_dir = os.path.join(workdir, "profiles")
+        pack_path = os.path.join(workdir, "presets.pack")
+
+        start = time.perf_counter()
+        generate_profiles(profiles_dir, args.count)
+        print(f"Generated {args.count} profiles in {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        PresetLibrary.pack(profiles_dir, pack_path)
+        print(f"Packed in {(time.perf_counter() - start) * 1000:.1f} ms "
+              f"({os.path.getsize(pack_path) / 1024:.0f} KiB)\n")
+
+        rng = random.Random(2)
+        for label, source in (("directory", profiles_dir), ("pack", pack_path)):
+            library = measure_index(label, source)
+            queries = typed_queries(rng, library.names, 200)
+            measure_queries(label, library, queries)
+            measure_loads(label, library, rng.sample(library.names, 500))
+            print()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
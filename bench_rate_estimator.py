@@ -0,0 +1,99 @@
+"""
+Network rate estimator benchmark
+Per-sample cost of RateEstimator.update (+ format_rate) at 4 Hz for 1 to 64
+interfaces and each smoothing mode, next to reading the counters themselves
+with psutil, as a share of the 250 ms sampling period. Then replays a
+synthetic 4 Hz stream in which an interface appears, disappears and has its
+counters reset, and shows the rate at and after each event next to the true
+rate and what the old total-delta code would have shown.
+
+Usage: python bench_rate_estimator.py [--samples 20000]
+"""
+
+import sys
+import time
+import argparse
+
+import psutil
+
+from rate_estimator import RateEstimator, SMOOTHING, format_rate
+
+PERIOD = 0.25
+TRUE_RATE = 1_000_000  # Bytes per second per direction, on eth0
+
+
+def counter_stream(nics, count):
+    """Fresh {nic: (sent, recv)} dicts, each interface moving TRUE_RATE / nics"""
+    step = TRUE_RATE * PERIOD / nics
+    names = [f"eth{i}" for i in range(nics)]
+    return [{name: (int(i * step), int(i * step * 3)) for name in names} for i in range(count)]
+
+
+def per_sample_us(smoothing, stream):
+    estimator = RateEstimator(smoothing, 1.0, peak_hold=5.0)
+    t0 = time.perf_counter()
+    for i, counters in enumerate(stream):
+        up, down = estimator.update(counters, i * PERIOD)
+        format_rate(up)
+        format_rate(down)
+    return (time.perf_counter() - t0) / len(stream) * 1e6
+
+
+def churn_scenario():
+    """(event, true down B/s, estimator, old total-delta code) at and right after each event"""
+    sent = recv = wifi = 0
+    estimator = RateEstimator("none")
+    last_total = None
+    rows = []
+    events = {80: "wlan0 appears (50 GB counters)", 160: "wlan0 disappears", 200: "eth0 counters reset"}
+    for i in range(240):  # One minute at 4 Hz
+        sent += int(TRUE_RATE * PERIOD)
+        recv += int(TRUE_RATE * PERIOD)
+        if i == 200:
+            sent = recv = int(TRUE_RATE * PERIOD)  # Driver reset
+        counters = {"eth0": (sent, recv)}
+        if 80 <= i < 160:
+            wifi += int(TRUE_RATE * PERIOD)
+            counters["wlan0"] = (50 * 2 ** 30 + wifi, 50 * 2 ** 30 + wifi)
+        true_rate = TRUE_RATE * len(counters)
+        total = sum(c[1] for c in counters.values())
+        new = estimator.update(counters, i * PERIOD)[1]
+        old = (total - last_total) / PERIOD if last_total is not None else 0.0
+        last_total = total
+        for at, name in events.items():
+            if i in (at, at + 1):
+                rows.append((name if i == at else "  next sample", true_rate, new, old))
+    return rows, estimator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=20000)
+    args = parser.parse_args()
+
+    psutil_runs = 200
+    t0 = time.perf_counter()
+    for _ in range(psutil_runs):
+        psutil.net_io_counters(pernic=True)
+    read_us = (time.perf_counter() - t0) / psutil_runs * 1e6
+    nics_here = len(psutil.net_io_counters(pernic=True))
+    print(f"psutil.net_io_counters(pernic=True): {read_us:.1f} us ({nics_here} interfaces here)\n")
+
+    print(f"{'interfaces':>10} " + " ".join(f"{mode + ' us':>10}" for mode in SMOOTHING) + f" {'% of 250 ms':>12}")
+    for nics in (1, 4, 16, 64):
+        stream = counter_stream(nics, args.samples)
+        costs = [per_sample_us(mode, stream) for mode in SMOOTHING]
+        share = (max(costs) + read_us) / (PERIOD * 1e6)
+        print(f"{nics:10d} " + " ".join(f"{cost:10.2f}" for cost in costs) + f" {share:12.4%}")
+
+    events, estimator = churn_scenario()
+    print(f"\n{'4 Hz stream, download':<40} {'true':>10} {'estimator':>11} {'old delta':>11}")
+    for phase, true_rate, new, old in events:
+        print(f"{phase:<40} {format_rate(true_rate):>10} {format_rate(new):>11} "
+              f"{format_rate(old) if old >= 0 else '-' + format_rate(-old):>11}")
+    print(f"\nresets {estimator.resets}, interface changes {estimator.churn}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
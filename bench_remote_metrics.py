@@ -0,0 +1,160 @@
+"""
+Remote metrics benchmark
+Starts N agents on localhost (one process each) and times one widget polling
+all of them: the persistent, concurrent RemotePoller vs. connecting to each
+host in turn per poll. Also measures pipelined vs. one-at-a-time requests on
+one connection, and how long a hung agent holds up a poll round.
+
+Usage: python bench_remote_metrics.py [--agents 50] [--rounds 200]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+import multiprocessing as mp
+
+import psutil
+
+import remote_metrics
+from remote_metrics import RemoteHost, RemotePoller, MetricsAgent, OP_SNAPSHOT, HELLO, REQUEST, RESPONSE
+from shared_metrics import MetricsSource
+
+
+def agent_process(ports):
+    async def main():
+        server = await MetricsAgent(MetricsSource(use_daemon=False)).serve("127.0.0.1", 0)
+        ports.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+    asyncio.run(main())
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def connect_per_poll(ports):
+    """Baseline: open, greet, ask, close, one host after another"""
+    for port in ports:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await reader.readexactly(HELLO.size)
+        writer.write(REQUEST.pack(OP_SNAPSHOT, 1))
+        _, _, length = RESPONSE.unpack(await reader.readexactly(RESPONSE.size))
+        await reader.readexactly(length)
+        writer.close()
+
+
+async def time_rounds(poll, rounds):
+    times = []
+    cpu0 = time.process_time()
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        await poll()
+        times.append((time.perf_counter() - t0) * 1000)
+    return times, (time.process_time() - cpu0) / rounds * 1000
+
+
+async def pipelining(port, depth, rounds):
+    host = RemoteHost("p", "127.0.0.1", port, timeout=5.0)
+    await host.connect()
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for _ in range(depth):
+            await host.request(OP_SNAPSHOT)
+    serial = (time.perf_counter() - t0) / (rounds * depth) * 1e6
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(host.request(OP_SNAPSHOT) for _ in range(depth)))
+    pipelined = (time.perf_counter() - t0) / (rounds * depth) * 1e6
+    host.close()
+    return serial, pipelined
+
+
+async def hung_round(ports, timeout):
+    """One agent accepts but never answers: how long does a poll round take?"""
+    release = asyncio.Event()
+
+    async def silent(reader, writer):
+        writer.write(HELLO.pack(remote_metrics.MAGIC, remote_metrics.VERSION))
+        await release.wait()
+        writer.close()
+    server = await asyncio.start_server(silent, "127.0.0.1", 0)
+    hung_port = server.sockets[0].getsockname()[1]
+    hosts = [RemoteHost(f"h{i}", "127.0.0.1", p, timeout=timeout) for i, p in enumerate(ports)]
+    hosts.append(RemoteHost("hung", "127.0.0.1", hung_port, timeout=timeout))
+    poller = RemotePoller(hosts)
+    t0 = time.perf_counter()
+    results = await poller.poll_once()  # connects everywhere; the hung host times out
+    first = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    await poller.poll_once()  # hung host is now backing off
+    second = (time.perf_counter() - t0) * 1000
+    for host in hosts:
+        host.close()
+    release.set()
+    server.close()
+    await server.wait_closed()
+    return first, second, sum(r.online for r in results)
+
+
+async def run(ports, args):
+    hosts = [RemoteHost(f"h{i}", "127.0.0.1", p, timeout=args.timeout) for i, p in enumerate(ports)]
+    poller = RemotePoller(hosts)
+    await poller.poll_once()  # open connections, prime rates
+
+    agents = [psutil.Process(p.pid) for p in mp.active_children()]
+    agent_cpu0 = sum(sum(a.cpu_times()[:2]) for a in agents)
+    persistent, persistent_cpu = await time_rounds(poller.poll_once, args.rounds)
+    agent_cpu = (sum(sum(a.cpu_times()[:2]) for a in agents) - agent_cpu0) / args.rounds * 1000
+    host_latency = [h.value.latency_ms for h in hosts]
+    online = sum(h.value.online for h in hosts)
+    for host in hosts:
+        host.close()
+
+    baseline, baseline_cpu = await time_rounds(lambda: connect_per_poll(ports), max(1, args.rounds // 4))
+
+    print(f"{len(ports)} agents on localhost, {args.rounds} poll rounds\n")
+    print(f"{'client':<28} {'p50 ms':>8} {'p95 ms':>8} {'client cpu ms':>14}")
+    print(f"{'persistent + concurrent':<28} {percentile(persistent, .5):8.2f} "
+          f"{percentile(persistent, .95):8.2f} {persistent_cpu:14.2f}")
+    print(f"{'connect per poll, serial':<28} {percentile(baseline, .5):8.2f} "
+          f"{percentile(baseline, .95):8.2f} {baseline_cpu:14.2f}")
+    print(f"\nper-host latency inside a round: median {statistics.median(host_latency):.2f} ms, "
+          f"{online}/{len(hosts)} online")
+    print(f"agents' CPU per round (all {len(agents)}): {agent_cpu:.2f} ms")
+    print(f"at one round per second: widget {persistent_cpu / 10:.2f}% CPU, agents {agent_cpu / 10:.2f}% total")
+
+    serial, pipelined = await pipelining(ports[0], 32, max(1, args.rounds // 4))
+    print(f"\none connection, 32 requests: {serial:.1f} us/request one at a time, "
+          f"{pipelined:.1f} us/request pipelined")
+
+    first, second, ok = await hung_round(ports, args.timeout)
+    print(f"one hung agent (timeout {args.timeout:g}s): round {first:.0f} ms ({ok}/{len(ports) + 1} online), "
+          f"next round {second:.1f} ms while it backs off")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    args = parser.parse_args()
+
+    ports_queue = mp.Queue()
+    procs = [mp.Process(target=agent_process, args=(ports_queue,), daemon=True) for _ in range(args.agents)]
+    for p in procs:
+        p.start()
+    ports = [ports_queue.get(timeout=60) for _ in procs]
+    try:
+        asyncio.run(run(ports, args))
+    finally:
+        for p in procs:
+            p.terminate()
+            p.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
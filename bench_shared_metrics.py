@@ -0,0 +1,93 @@
+"""
+Shared metrics benchmark
+Total CPU time spent sampling by N simulated widget viewers, each ticking at
+--tick seconds for --seconds: every viewer sampling psutil itself vs. one
+shared_metrics daemon plus N read-only viewers. Interpreter startup is not
+counted; each process reports the CPU time of its sampling loop only.
+
+Usage: python bench_shared_metrics.py [--viewers 50] [--seconds 5] [--tick 0.1]
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing as mp
+
+import shared_metrics
+
+SEGMENT = f"tbwm_bench_{os.getpid()}"
+
+
+def viewer(use_daemon, tick, seconds, start_at, results):
+    source = shared_metrics.MetricsSource(SEGMENT, use_daemon=use_daemon, max_age=tick * 5)
+    while time.time() < start_at:
+        time.sleep(0.01)
+    cpu0 = time.process_time()
+    shared = 0
+    ticks = 0
+    end = start_at + seconds
+    while time.time() < end:
+        source.sample()
+        shared += source.shared
+        ticks += 1
+        time.sleep(tick)
+    results.put((time.process_time() - cpu0, ticks, shared))
+
+
+def daemon(tick, seconds, start_at, results):
+    publisher = shared_metrics.MetricsPublisher(SEGMENT)
+    sampler = shared_metrics.LocalSampler()
+    while time.time() < start_at:  # keep the snapshot fresh while viewers start
+        publisher.publish(sampler.sample(percpu=True))
+        time.sleep(tick)
+    cpu0 = time.process_time()
+    end = start_at + seconds + tick
+    while time.time() < end:
+        publisher.publish(sampler.sample(percpu=True))
+        time.sleep(tick)
+    results.put(("daemon", time.process_time() - cpu0))
+    publisher.close()
+
+
+def run(mode, args):
+    results = mp.Queue()
+    start_at = time.time() + 2.0 + args.viewers * 0.05  # let every process import first
+    procs = []
+    if mode == "daemon":
+        procs.append(mp.Process(target=daemon, args=(args.tick, args.seconds, start_at, results)))
+    procs += [mp.Process(target=viewer, args=(mode == "daemon", args.tick, args.seconds, start_at, results))
+              for _ in range(args.viewers)]
+    for p in procs:
+        p.start()
+    collected = [results.get(timeout=args.seconds + 60) for _ in procs]
+    for p in procs:
+        p.join()
+    daemon_cpu = sum(r[1] for r in collected if r[0] == "daemon")
+    viewers = [r for r in collected if r[0] != "daemon"]
+    viewer_cpu = sum(r[0] for r in viewers)
+    ticks = sum(r[1] for r in viewers)
+    shared = sum(r[2] for r in viewers)
+    return daemon_cpu, viewer_cpu, ticks, shared
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--viewers", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--tick", type=float, default=0.1)
+    args = parser.parse_args()
+
+    print(f"{args.viewers} viewers, {args.seconds:g}s at one sample per {args.tick:g}s\n")
+    print(f"{'mode':<10} {'daemon cpu s':>13} {'viewers cpu s':>14} {'total cpu %':>12} "
+          f"{'us/sample':>10} {'shared':>7}")
+    for mode in ("local", "daemon"):
+        daemon_cpu, viewer_cpu, ticks, shared = run(mode, args)
+        total = daemon_cpu + viewer_cpu
+        print(f"{mode:<10} {daemon_cpu:13.3f} {viewer_cpu:14.3f} {total / args.seconds * 100:12.1f} "
+              f"{viewer_cpu / max(1, ticks) * 1e6:10.1f} {shared / max(1, ticks):7.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
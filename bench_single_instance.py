@@ -0,0 +1,113 @@
+"""
+Single-instance handoff benchmark
+Runs a stand-in "running widget" (the real InstanceLock + ControlServer in a
+child process) and measures how long a second launch takes from process
+spawn until the running instance has its actions:
+
+  taskbar_widget.py --show          early handoff, before Tk/PIL/psutil load
+  late handoff (baseline)           same, after importing the widget's modules
+  in-process forward()              lock-file read + one localhost round trip
+
+Usage: python bench_single_instance.py [--launches 10]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+import multiprocessing as mp
+
+from single_instance import InstanceLock, ControlServer, forward
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+LATE_HANDOFF = ("import tkinter, psutil, numpy, asyncio, json, subprocess; from PIL import Image, ImageTk; "
+                "import single_instance, sys; single_instance.early_handoff(sys.argv[1:])")
+
+
+def instance(directory, received, ready, publish_delay):
+    os.environ["TASKBAR_INSTANCE_DIR"] = directory
+    lock = InstanceLock()
+    if not lock.acquire():
+        raise SystemExit("lock already held")
+    server = ControlServer(lambda actions: received.put((time.time(), actions)))
+    ready.set()
+    time.sleep(publish_delay)
+    lock.publish(server.port, server.token)
+    while True:
+        time.sleep(1)
+
+
+def start_instance(directory, publish_delay=0.0):
+    received, ready = mp.Queue(), mp.Event()
+    proc = mp.Process(target=instance, args=(directory, received, ready, publish_delay), daemon=True)
+    proc.start()
+    ready.wait(10)
+    return proc, received
+
+
+def launch(command, env, received):
+    """Seconds from spawn to the instance receiving the actions, and to the launcher's exit"""
+    start = time.time()
+    proc = subprocess.Popen(command, env=env, cwd=SCRIPT_DIR)
+    arrived, _ = received.get(timeout=30)
+    proc.wait()
+    exited = time.time()
+    if proc.returncode != 0:
+        raise SystemExit(f"{command} exited with {proc.returncode}")
+    return arrived - start, exited - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--launches", type=int, default=10)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="widget_instance_")
+    env = dict(os.environ, TASKBAR_INSTANCE_DIR=directory)
+    proc, received = start_instance(directory)
+    time.sleep(0.2)
+
+    cases = (("taskbar_widget.py --show (early)", [sys.executable, "taskbar_widget.py", "--show"]),
+             ("late handoff (after imports)", [sys.executable, "-c", LATE_HANDOFF, "--show"]))
+    print(f"{args.launches} launches per case\n")
+    print(f"{'second launch':<34} {'to handoff ms':>14} {'to exit ms':>11}")
+    for name, command in cases:
+        launch(command, env, received)  # warm the OS file cache
+        runs = [launch(command, env, received) for _ in range(args.launches)]
+        print(f"{name:<34} {statistics.median(r[0] for r in runs) * 1000:14.1f} "
+              f"{statistics.median(r[1] for r in runs) * 1000:11.1f}")
+
+    os.environ["TASKBAR_INSTANCE_DIR"] = directory
+    lock = InstanceLock()
+    times = []
+    for _ in range(200):
+        t0 = time.perf_counter()
+        assert forward(lock, [["show"]])
+        received.get(timeout=5)
+        times.append(time.perf_counter() - t0)
+    print(f"{'in-process forward()':<34} {statistics.median(times) * 1000:14.2f}")
+    proc.terminate()
+    proc.join()
+
+    # A launch racing an instance that is still starting up
+    delay = 0.5
+    proc, received = start_instance(directory, publish_delay=delay)
+    start = time.time()
+    forward(InstanceLock(), [["show"]])
+    arrived, _ = received.get(timeout=30)
+    print(f"\nlaunch during startup: handed off {(arrived - start - delay) * 1000:.0f} ms after the "
+          f"instance published its port")
+    proc.terminate()
+    proc.join()
+
+    probe = InstanceLock()
+    print(f"lock free again after the instance died: {probe.acquire()}")
+    probe.release()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+"""
+Widget performance suite
+Builds a real SystemMonitorWidget against stand-ins (synthetic metrics instead
+of psutil, a scripted media manager, a temporary Equalizer APO config, no
+media keys) and times the per-tick paths: update_stats, Visualizer.animate,
+update_media_ui with thumbnails, apply_visibility, ConfigManager.set and
+EqualizerManager.apply_settings / get_current_settings.
+
+Renderers: "xvfb" uses real Tk (starting Xvfb when there is no $DISPLAY) and
+flushes idle redraws after each call; "null" swaps Tk for inert objects, so
+only the widget's own Python cost is measured. "auto" picks xvfb when a
+display or Xvfb is available.
+
+Writes a JSON report; with --baseline it exits 1 when any case's best run is
+more than --threshold slower than the stored baseline (same renderer only).
+CPU-bound cases are timed relative to a fixed calibration workload run next
+to them, so machine-speed drift between runs cancels out; disk-bound cases
+(config and EQ file writes) are compared raw against --io-threshold.
+
+Usage: python bench_suite.py [--renderer auto] [--report bench_report.json]
+                             [--baseline bench_baseline.json] [--save-baseline]
+                             [--threshold 0.25] [--io-threshold 0.5] [--quick]
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import types
+import random
+import shutil
+import platform
+import argparse
+import itertools
+import statistics
+import tempfile
+
+# Media keys: never press real keys while benchmarking (pyautogui also needs a display to import)
+sys.modules["pyautogui"] = types.SimpleNamespace(press=lambda key: None)
+
+import taskbar_widget as tw  # noqa: E402
+from metric_providers import MetricProvider  # noqa: E402
+from shared_metrics import Snapshot  # noqa: E402
+
+REPEATS = 9
+NOISE_FLOOR_US = 2.0  # Ignore regressions smaller than this in absolute terms
+IO_CASES = ("config_set", "eq_apply_settings", "eq_get_current_settings")  # Disk-bound: own threshold
+
+# --- Null renderer --------------------------------------------------------
+
+
+class NullWidget:
+    """Accepts every Tk call; remembers options, pack state and canvas coords"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, master=None, cnf=None, **options):
+        self.master = master
+        self.options = dict(cnf or {}, **options)
+        self.mapped = False
+        self.children = []
+        self.items = {}
+        if isinstance(master, NullWidget):
+            master.children.append(self)
+
+    def configure(self, cnf=None, **options):
+        if cnf:
+            options.update(cnf)
+        self.options.update(options)
+
+    config = configure
+
+    def cget(self, key):
+        return self.options.get(key)
+
+    def pack(self, **options):
+        self.mapped = True
+
+    def pack_forget(self):
+        self.mapped = False
+
+    def winfo_ismapped(self):
+        return self.mapped
+
+    def winfo_children(self):
+        return list(self.children)
+
+    def winfo_screenwidth(self):
+        return 1920
+
+    def winfo_screenheight(self):
+        return 1080
+
+    def after(self, ms, func=None, *args):
+        return f"after#{next(self._ids)}"
+
+    def _create(self, *coords, **options):
+        item = next(self._ids)
+        self.items[item] = list(coords)
+        return item
+
+    create_rectangle = create_text = create_image = create_line = _create
+
+    def coords(self, item, *coords):
+        if coords:
+            self.items[item] = list(coords[0]) if len(coords) == 1 else list(coords)
+        return self.items.get(item, [0, 0, 0, 0])
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name.startswith("winfo_"):
+            return lambda *args, **kw: 0
+        return lambda *args, **kw: None
+
+
+class NullVar:
+    def __init__(self, master=None, value=None, name=None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class NullPhoto:
+    def __init__(self, image=None, **options):
+        self.image = image
+
+    def width(self):
+        return self.image.size[0] if self.image is not None else 0
+
+    def height(self):
+        return self.image.size[1] if self.image is not None else 0
+
+    def paste(self, image):
+        self.image = image
+
+
+null_tk = types.SimpleNamespace(Tk=NullWidget, Frame=NullWidget, Label=NullWidget, Canvas=NullWidget,
+                                Menu=NullWidget, Toplevel=NullWidget, BooleanVar=NullVar, StringVar=NullVar,
+                                TclError=Exception)
+
+# --- Stand-ins --------------------------------------------------------------
+
+
+class FakeMetrics:
+    """Deterministic snapshots in place of psutil / the shared metrics daemon"""
+
+    def __init__(self, *args, **kwargs):
+        self.i = 0
+        self.shared = False
+
+    def sample(self, percpu=False):
+        self.i += 1
+        i = self.i
+        cores = tuple(float((i * 7 + c * 13) % 100) for c in range(16)) if percpu else ()
+        return Snapshot(1000.0 + i, float(i % 100), 40.0 + i % 20, 10 ** 9 + i * 125_000,
+                        10 ** 10 + i * 2_500_000, cores)
+
+
+class FakeProvider(MetricProvider):
+    name = "fake"
+    label = "Fake"
+    interval = 0.0  # Due every tick
+    cost_ms = 1.0
+
+    def __init__(self):
+        self.i = 0
+
+    def sample(self):
+        self.i += 1
+        return self.i
+
+    def format(self, value):
+        return f"R {value % 100} MB/s", f"W {value % 7} MB/s"
+
+
+class FakeMediaManager:
+    def __init__(self, callback, playback_callback, pinned_app="", art_cache=None):
+        self.callback = callback
+        self.playback_callback = playback_callback
+        self.pinned_app = pinned_app
+        self.art_cache = art_cache
+        self.app_ids = ["Spotify.exe", "chrome.exe"]
+
+    def start(self):
+        pass
+
+    def stop(self):
+        if self.art_cache:
+            self.art_cache.close()
+
+
+def make_widget(renderer, workdir, mode="widgets"):
+    """SystemMonitorWidget built through its real __init__ against the stand-ins"""
+    apo = os.path.join(workdir, "EqualizerAPO")
+    os.makedirs(os.path.join(apo, "config"), exist_ok=True)
+    config = tw.ConfigManager(os.path.join(workdir, "widget_config.json"))
+    config.config.update(render_mode=mode, show_traffic=True, show_system=True, music_mode="auto",
+                         show_fake=True, art_cache_dir=os.path.join(workdir, "art"),
+                         use_metrics_daemon=False, instrumentation=False, trace_enabled=False,
+                         apo_discovery={"install_path": apo,
+                                        "config_path": os.path.join(apo, "config", "config.txt"),
+                                        "devices": []})
+    tw.MetricsSource = FakeMetrics
+    tw.MediaManager = FakeMediaManager
+    tw.available_providers = lambda: [FakeProvider()]
+    if renderer == "null":
+        tw.tk = null_tk
+        tw.ImageTk = types.SimpleNamespace(PhotoImage=NullPhoto)
+    widget = tw.SystemMonitorWidget(config)
+    for attr in ("metrics", "visualizer", "eq_manager", "media_manager"):
+        if getattr(widget, attr, None) is None:
+            raise SystemExit(f"Widget did not initialise ({attr} missing); see widget_debug.log")
+    widget.root.after = lambda *args, **kw: None  # No self-rescheduling while timing
+    return widget
+
+
+def thumbnails():
+    from PIL import Image
+    return [Image.new("RGB", tw.ART_SIZE, color) for color in ((200, 40, 40), (40, 200, 40))]
+
+
+def cases(widget, quick):
+    scale = 10 if quick else 1
+    config = widget.config
+    eq = widget.eq_manager
+    arts = thumbnails()
+    tracks = [("Song A", "Artist A", arts[0]), ("Song A", "Artist A", tw.THUMB_UNCHANGED),
+              ("Song B", "Artist B", arts[1]), ("", "", None)]
+    gains = [[(i * 3 + b) % 25 - 12 for b in range(10)] for i in range(8)]
+    presets = ["Default", "Bass", "Treble", "Rock", "Pop"]
+
+    def animate(i):
+        config.config["viz_preset"] = presets[i % 5]
+        widget.visualizer.animate(True)
+
+    def toggle(i):
+        config.config["show_traffic"] = bool(i % 2)
+        widget.apply_visibility()
+
+    return [
+        ("update_stats", 2000 // scale, lambda i: widget.update_stats()),
+        ("visualizer_animate", 5000 // scale, animate),
+        ("update_media_ui", 2000 // scale, lambda i: widget.update_media_ui(*tracks[i % 4])),
+        ("apply_visibility", 2000 // scale, toggle),
+        ("config_set", 300 // scale, lambda i: config.set("viz_preset", presets[i % 5])),
+        ("eq_apply_settings", 300 // scale, lambda i: eq.apply_settings(gains[i % 8])),
+        ("eq_get_current_settings", 1000 // scale, lambda i: eq.get_current_settings()),
+    ]
+
+
+def calibrate(repeats=5):
+    """Microseconds for a fixed pure-Python workload (best of `repeats`), measuring machine speed"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        table = {}
+        for i in range(20000):
+            table[f"k{i % 500}"] = table.get(f"k{i % 500}", 0) + i * 3 // 7
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def time_case(op, iterations, flush):
+    """Per-call microseconds for each of REPEATS runs (after one warm-up run)"""
+    runs = []
+    for repeat in range(REPEATS + 1):
+        random.seed(repeat)
+        gc.collect()
+        start = time.perf_counter()
+        for i in range(iterations):
+            op(i)
+            if flush:
+                flush()
+        elapsed = (time.perf_counter() - start) / iterations * 1e6
+        if repeat:
+            runs.append(elapsed)
+    return runs
+
+
+def run_suite(renderer, quick):
+    xvfb = None
+    if renderer == "xvfb":
+        from bench_canvas_bar import ensure_display
+        xvfb = ensure_display()
+    workdir = tempfile.mkdtemp(prefix="widget_suite_")
+    results = {}
+    try:
+        modes = ("widgets",) if renderer == "null" else ("widgets", "canvas")
+        for mode in modes:
+            widget = make_widget(renderer, workdir, mode)
+            flush = widget.root.update_idletasks if renderer == "xvfb" else None
+            for name, iterations, op in cases(widget, quick):
+                key = name if mode == "widgets" else f"{name}[canvas]"
+                if mode == "canvas" and name.startswith(("config", "eq")):
+                    continue  # Independent of the render mode
+                calibration = calibrate()
+                runs = time_case(op, iterations, flush)
+                calibration = min(calibration, calibrate())
+                results[key] = {"iterations": iterations, "median_us": round(statistics.median(runs), 3),
+                                "min_us": round(min(runs), 3), "max_us": round(max(runs), 3),
+                                "calibration_us": round(calibration, 3),
+                                "score": round(min(runs) / calibration * 1000, 4)}
+                print(f"{key:<32} {results[key]['median_us']:10.1f} us  (min {results[key]['min_us']:.1f}, "
+                      f"max {results[key]['max_us']:.1f})")
+            widget.media_manager.stop()
+            if renderer == "xvfb":
+                widget.root.destroy()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if xvfb:
+            xvfb.terminate()
+    return results
+
+
+def compare(report, baseline, threshold, io_threshold):
+    """Names of cases that regressed beyond their threshold
+
+    CPU-bound cases compare the best run relative to the calibration workload
+    measured around them, which cancels machine-speed drift between runs;
+    disk-bound cases (IO_CASES) compare the raw best run against io_threshold.
+    """
+    regressions = []
+    for name, result in report["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            continue
+        io = name.split("[")[0] in IO_CASES
+        key = "min_us" if io or "score" not in base else "score"
+        limit = base[key] * (1 + (io_threshold if io else threshold))
+        change = result[key] / base[key] - 1 if base[key] else 0.0
+        regressed = result[key] > limit and result["min_us"] - base["min_us"] > NOISE_FLOOR_US
+        print(f"{name:<32} {base['min_us']:10.1f} -> {result['min_us']:10.1f} us  {change:+7.1%} "
+              f"({'raw' if key == 'min_us' else 'calibrated'}){'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--renderer", choices=("auto", "xvfb", "null"), default="auto")
+    parser.add_argument("--report", default="bench_report.json")
+    parser.add_argument("--baseline", default="bench_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--io-threshold", type=float, default=0.5, help="allowed slowdown of disk-bound cases")
+    parser.add_argument("--quick", action="store_true", help="a tenth of the iterations")
+    args = parser.parse_args()
+
+    renderer = args.renderer
+    if renderer == "auto":
+        renderer = "xvfb" if os.environ.get("DISPLAY") or shutil.which("Xvfb") or sys.platform == "win32" else "null"
+
+    print(f"Renderer: {renderer}, {REPEATS} runs per case (per-call median, best run)\n")
+    report = {
+        "renderer": renderer,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "quick": args.quick,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cases": run_suite(renderer, args.quick),
+    }
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.report}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.report, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("renderer") != renderer or baseline.get("quick") != args.quick:
+        print(f"Baseline {args.baseline} was recorded with renderer={baseline.get('renderer')}, "
+              f"quick={baseline.get('quick')}; not comparing")
+        return 2
+    print(f"\nAgainst {args.baseline} (best runs; threshold {args.threshold:.0%}, "
+          f"disk-bound {args.io_threshold:.0%}):")
+    regressions = compare(report, baseline, args.threshold, args.io_threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Thumbnail transfer benchmark
+Compares the old copy chain (WinRT Buffer -> DataReader.read_bytes into a
+bytearray -> bytes -> BytesIO -> PIL) with the memoryview path, using a fake
+buffer source that behaves like winrt's Buffer/DataReader. Reports time and
+peak traced memory per transfer, for the transfer alone, with decode+resize,
+and with JPEG draft-mode (reduced scale) decoding.
+
+Usage: python bench_thumbnail_transfer.py [--size 600] [--runs 200]
+"""
+
+import io
+import sys
+import time
+import argparse
+import tracemalloc
+
+from PIL import Image
+
+from thumbnail_transfer import buffer_view, open_image, decode_thumbnail
+
+
+class FakeBuffer(bytearray):
+    """Stand-in for winrt Buffer: a buffer-protocol object with a length"""
+
+    @property
+    def length(self):
+        return len(self)
+
+
+class FakeDataReader:
+    """Stand-in for winrt DataReader.read_bytes (copies into the caller's array)"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def read_bytes(self, out):
+        out[:] = self.buffer
+
+
+def make_jpeg(size):
+    image = Image.effect_mandelbrot((size, size), (-2, -1.5, 1, 1.5), 100).convert("RGB")
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+def old_transfer(buffer):
+    reader = FakeDataReader(buffer)
+    byte_arr = bytearray(len(buffer))
+    reader.read_bytes(byte_arr)
+    data = bytes(byte_arr)
+    return Image.open(io.BytesIO(data))
+
+
+def new_transfer(buffer):
+    return open_image(buffer_view(buffer))
+
+
+def draft_transfer(buffer):
+    return decode_thumbnail(buffer_view(buffer))
+
+
+def measure(func, buffer, runs, decode):
+    def once():
+        image = func(buffer)
+        if decode and image.size != (40, 40):
+            image = image.resize((40, 40), Image.Resampling.LANCZOS)
+        return image  # otherwise header parse only
+
+    once()
+    start = time.perf_counter()
+    for _ in range(runs):
+        once()
+    elapsed = (time.perf_counter() - start) / runs * 1e6
+
+    tracemalloc.start()
+    once()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=600, help="thumbnail edge in pixels")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    buffer = FakeBuffer(make_jpeg(args.size))
+    print(f"{args.size}x{args.size} JPEG, {len(buffer) / 1024:.1f} KiB, {args.runs} runs\n")
+    print(f"{'case':<28} {'us/transfer':>12} {'peak KiB':>10}")
+    for decode in (False, True):
+        for label, func in (("copy chain", old_transfer), ("memoryview", new_transfer)):
+            us, peak = measure(func, buffer, args.runs, decode)
+            case = f"{label} {'+ decode/resize' if decode else '(open only)'}"
+            print(f"{case:<28} {us:12.1f} {peak / 1024:10.1f}")
+    us, peak = measure(draft_transfer, buffer, args.runs, True)
+    print(f"{'memoryview + draft decode':<28} {us:12.1f} {peak / 1024:10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Canvas Bar - the whole widget bar drawn on a single tk.Canvas
+Alternative to the nested Frame/Label tree (config "render_mode": "canvas").
+Layout is computed once from font metrics; showing or hiding a section only
+moves and hides canvas items, and text updates that do not change the text
+are dropped before they reach Tk.
+
+Sections are exposed through small proxy objects with the subset of the Label /
+Frame API the widget uses (config, bind, pack, pack_forget, winfo_ismapped),
+so SystemMonitorWidget code works unchanged in either mode.
+"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+
+PAD = 5
+ART = 40
+SEP_WIDTH = 11
+
+
+class ItemProxy:
+    """Label-like handle for one canvas text item (plus optional image item)"""
+
+    def __init__(self, bar, section, text_item, image_item=None, backdrop=None):
+        self.bar = bar
+        self.section = section
+        self.text_item = text_item
+        self.image_item = image_item
+        self.backdrop = backdrop
+        self.text = None
+        self.image = None  # Keeps the PhotoImage referenced, as with Labels
+
+    def config(self, text=None, image=None, fg=None, **_ignored):
+        canvas = self.bar.canvas
+        if text is not None and text != self.text:
+            self.text = text
+            canvas.itemconfigure(self.text_item, text=text)
+        if fg is not None:
+            canvas.itemconfigure(self.text_item, fill=fg)
+        if image is not None and self.image_item is not None:
+            canvas.itemconfigure(self.image_item, image=image)
+            if self.backdrop is not None and self.bar.visible[self.section]:
+                canvas.itemconfigure(self.backdrop, state="hidden" if image else "normal")
+
+    configure = config
+
+    def cget(self, key):
+        if key == "fg":
+            return self.bar.canvas.itemcget(self.text_item, "fill")
+        if key == "text":
+            return self.text
+        raise KeyError(key)
+
+    def bind(self, sequence, func):
+        self.bar.canvas.tag_bind(self.text_item, sequence, func)
+        if self.image_item is not None:
+            self.bar.canvas.tag_bind(self.image_item, sequence, func)
+
+    def winfo_ismapped(self):
+        return self.bar.visible[self.section]
+
+
+class SectionProxy:
+    """Frame-like handle for a whole section"""
+
+    def __init__(self, bar, section):
+        self.bar = bar
+        self.section = section
+
+    def pack(self, **_ignored):
+        self.bar.set_section(self.section, True)
+
+    def pack_forget(self):
+        self.bar.set_section(self.section, False)
+
+    def winfo_ismapped(self):
+        return self.bar.visible[self.section]
+
+    def bind(self, sequence, func):
+        self.bar.canvas.tag_bind(self.section, sequence, func)
+
+
+class CanvasBar:
+    """Music | net | sys | cores | close, laid out on one canvas"""
+
+    ORDER = ("music", "sep1", "net", "sep2", "sys", "cores", "close")
+
+    def __init__(self, parent, bg, fg, font, font_bold):
+        self.bg = bg
+        self.height = ART + 2 * PAD
+        self.canvas = tk.Canvas(parent, height=self.height, bg=bg, highlightthickness=0, bd=0)
+        self.canvas.pack(fill="both", expand=True)
+
+        font_obj = self.font_obj = tkfont.Font(root=parent, font=font)
+        self.font = font
+        bold_obj = tkfont.Font(root=parent, font=font_bold)
+        button_font = ("Segoe UI", 12)
+        mid = self.height // 2
+        c = self.canvas
+
+        # Every section is drawn at x=0 and later moved into place; widths are fixed
+        self.order = list(self.ORDER)
+        self.extra_seps = {}  # Separator before each added section
+        self.widths = {}
+        self.x = dict.fromkeys(self.ORDER, 0)
+        self.visible = dict.fromkeys(self.ORDER, True)
+        self.states = {}
+
+        # Music: art (or note glyph), title, controls; the visualizer is added later
+        c.create_rectangle(PAD, PAD, PAD + ART, PAD + ART, fill="#333333", outline="",
+                                    tags=("music",))
+        note = c.create_text(PAD + ART // 2, mid, text="♫", font=("Segoe UI", 14), fill=fg,
+                             tags=("music",))
+        art = c.create_image(PAD, PAD, anchor="nw", tags=("music",))
+        text_x = PAD + ART + 7
+        # Titles are truncated to 25 characters by update_media_ui
+        title_w = bold_obj.measure("0" * 24)
+        title = c.create_text(text_x, PAD + 9, text="No Music", anchor="w", font=font_bold,
+                              fill=fg, tags=("music",))
+        buttons = []
+        for i, glyph in enumerate(("⏮", "⏯", "⏭")):
+            buttons.append(c.create_text(text_x + 6 + i * 22, PAD + 29, text=glyph,
+                                         font=button_font, fill=fg, tags=("music", "button")))
+        self.viz_origin = (text_x + 72, PAD + 22)
+        self.widths["music"] = max(text_x + title_w, self.viz_origin[0] + 40) + PAD
+
+        self.art = ItemProxy(self, "music", note, art, backdrop=note)
+        self.title = ItemProxy(self, "music", title)
+        self.prev, self.play, self.next = (ItemProxy(self, "music", b) for b in buttons)
+
+        # Separators
+        for name in ("sep1", "sep2"):
+            self._separator(name)
+
+        # Network and system: two rows each, sized for the widest expected text
+        net_w = font_obj.measure("▼ 000.00 MB/s")
+        up = c.create_text(PAD, PAD + 10, text="▲ 0.0 MB/s", anchor="w", font=font,
+                           fill="#4caf50", tags=("net",))
+        down = c.create_text(PAD, PAD + 30, text="▼ 0.0 MB/s", anchor="w", font=font,
+                             fill="#2196f3", tags=("net",))
+        self.widths["net"] = net_w + 2 * PAD
+        self.net_up = ItemProxy(self, "net", up)
+        self.net_down = ItemProxy(self, "net", down)
+
+        sys_w = font_obj.measure("MEM: 100.0%")
+        cpu = c.create_text(PAD, PAD + 10, text="CPU: 0%", anchor="w", font=font, fill=fg,
+                            tags=("sys",))
+        mem = c.create_text(PAD, PAD + 30, text="MEM: 0%", anchor="w", font=font, fill=fg,
+                            tags=("sys",))
+        self.widths["sys"] = sys_w + 2 * PAD
+        self.cpu = ItemProxy(self, "sys", cpu)
+        self.mem = ItemProxy(self, "sys", mem)
+
+        # Per-core heatmap (hidden unless show_percore)
+        cores = c.create_image(PAD, PAD, anchor="nw", tags=("cores",))
+        self.widths["cores"] = 48 + 2 * PAD
+        self.cores = ItemProxy(self, "cores", cores, cores)
+        self.visible["cores"] = False
+
+        close = c.create_text(PAD + 4, mid, text="×", font=("Segoe UI", 10, "bold"),
+                              fill="#ff5555", tags=("close", "button"))
+        self.widths["close"] = 2 * PAD + 8
+        self.close = ItemProxy(self, "close", close)
+
+        c.tag_bind("button", "<Enter>", lambda e: c.configure(cursor="hand2"))
+        c.tag_bind("button", "<Leave>", lambda e: c.configure(cursor=""))
+
+        self.sections = {name: SectionProxy(self, name) for name in self.ORDER}
+        self.layout()
+
+    def _separator(self, name):
+        self.canvas.create_line(SEP_WIDTH // 2, PAD + 2, SEP_WIDTH // 2, self.height - PAD - 2,
+                                fill="#444444", tags=(name,))
+        self.widths[name] = SEP_WIDTH
+        self.x[name] = 0
+
+    def add_text_section(self, name, width_text, colors, lines):
+        """Two-line text section (separator first) before the close button; returns its proxies"""
+        sep = f"sep_{name}"
+        self._separator(sep)
+        items = [self.canvas.create_text(PAD, PAD + y, text=text, anchor="w", font=self.font,
+                                         fill=color, tags=(name,))
+                 for y, text, color in zip((10, 30), lines, colors)]
+        self.widths[name] = self.font_obj.measure(width_text) + 2 * PAD
+        self.x[name] = 0
+        self.order[-1:-1] = [sep, name]
+        self.extra_seps[sep] = name
+        self.visible[sep] = self.visible[name] = False
+        self.sections[name] = SectionProxy(self, name)
+        self.layout()
+        return tuple(ItemProxy(self, name, item) for item in items)
+
+    def set_section(self, name, visible):
+        if name.startswith("sep") or self.visible[name] == visible:
+            return  # separators follow their neighbours
+        self.visible[name] = visible
+        self.layout()
+
+    def set_visible(self, **sections):
+        """Apply visibility of several sections at once; one layout pass"""
+        if all(self.visible[name] == bool(visible) for name, visible in sections.items()):
+            return
+        for name, visible in sections.items():
+            self.visible[name] = bool(visible)
+        self.layout()
+
+    def layout(self):
+        """Move visible sections into place and hide the rest"""
+        v = self.visible
+        v["sep1"] = v["music"] and (v["net"] or v["sys"])
+        v["sep2"] = v["net"] and v["sys"]
+        shown_before = v["music"] or v["net"] or v["sys"] or v["cores"]
+        for sep, name in self.extra_seps.items():
+            v[sep] = v[name] and shown_before
+            shown_before = shown_before or v[name]
+        x = 0
+        for name in self.order:
+            if v[name]:
+                if self.x[name] != x:
+                    self.canvas.move(name, x - self.x[name], 0)
+                    self.x[name] = x
+                x += self.widths[name]
+            self.refresh_state(name)
+        self.canvas.configure(width=x)
+
+    def refresh_state(self, name):
+        """Hidden sections stay hidden even when their items are reconfigured"""
+        state = "normal" if self.visible[name] else "hidden"
+        if self.states.get(name) != state:
+            self.states[name] = state
+            self.canvas.itemconfigure(name, state=state)
+            if state == "normal" and name == "music":
+                # Restore the art backdrop rule after a blanket show
+                showing_image = bool(self.canvas.itemcget(self.art.image_item, "image"))
+                self.canvas.itemconfigure(self.art.backdrop, state="hidden" if showing_image else "normal")
@@ -1,69 +1,144 @@
 # Equalizer APO Setup Check
-# This script verifies that Equalizer APO is properly configured
+# Non-interactive diagnostics: verifies that Equalizer APO is properly configured
+# and times each check. Use --json for machine-readable output.
+#
+# Usage: python check_equalizer_apo.py [--json] [--config widget_config.json]
 
 import os
+import sys
+import json
+import time
+import argparse
 from pathlib import Path
 
-print("=" * 60)
-print("Equalizer APO Configuration Checker")
-print("=" * 60)
-
-# Check installation
-apo_path = Path("C:\\Program Files\\EqualizerAPO")
-if not apo_path.exists():
-    print("❌ Equalizer APO is NOT installed")
-    print("\nPlease install from: https://sourceforge.net/projects/equalizerapo/")
-    input("\nPress Enter to exit...")
-    exit(1)
-
-print(f"✓ Equalizer APO found at: {apo_path}")
-
-# Check config directory
-config_dir = apo_path / "config"
-if not config_dir.exists():
-    print("❌ Config directory not found")
-    input("\nPress Enter to exit...")
-    exit(1)
-
-print(f"✓ Config directory exists")
-
-# Check config file
-config_file = config_dir / "config.txt"
-if config_file.exists():
-    print(f"✓ Config file exists: {config_file}")
-    print("\nCurrent config content:")
-    print("-" * 60)
-    with open(config_file, 'r') as f:
-        print(f.read())
-    print("-" * 60)
-else:
-    print("⚠ Config file doesn't exist yet (will be created)")
-
-# Check for device configuration
-device_txt = apo_path / "device.txt"
-if device_txt.exists():
-    print(f"\n✓ Device configuration found")
-    with open(device_txt, 'r') as f:
-        devices = f.read().strip().split('\n')
-        print(f"   Configured devices: {len(devices)}")
-        for dev in devices[:3]:  # Show first 3
-            print(f"   - {dev}")
-else:
-    print("\n⚠ WARNING: No devices configured!")
-    print("   Please run Configurator.exe from Equalizer APO folder")
-    print("   and select your audio playback device")
-
-print("\n" + "=" * 60)
-print("IMPORTANT NOTES:")
-print("=" * 60)
-print("1. Equalizer APO only works on devices you've selected")
-print("2. After installing APO, you MUST restart your computer")
-print("3. Changes to config.txt are auto-loaded (may take 1-2 seconds)")
-print("4. Make sure NO other apps are using exclusive mode on your audio device")
-print("5. If sound doesn't change, try:")
-print("   - Restart audio playback")
-print("   - Check Windows Sound settings")
-print("   - Run Configurator.exe to verify device selection")
-print("=" * 60)
-
-input("\nPress Enter to exit...")
+from equalizer_manager import EqualizerManager, EqProfile
+
+OK, WARN, FAIL = "ok", "warn", "fail"
+
+NOTES = [
+    "Equalizer APO only works on devices you've selected",
+    "After installing APO, you MUST restart your computer",
+    "Changes to config.txt are auto-loaded (may take 1-2 seconds)",
+    "Make sure NO other apps are using exclusive mode on your audio device",
+    "If sound doesn't change: restart playback, check Windows Sound settings, "
+    "run Configurator.exe to verify device selection",
+]
+
+
+class Diagnostics:
+    """Runs named checks, recording status, detail and duration of each"""
+
+    def __init__(self):
+        self.results = []
+
+    def run(self, name, check):
+        start = time.perf_counter()
+        try:
+            status, detail = check()
+        except Exception as e:
+            status, detail = FAIL, f"{type(e).__name__}: {e}"
+        self.results.append({
+            "name": name,
+            "status": status,
+            "detail": detail,
+            "ms": round((time.perf_counter() - start) * 1000, 3),
+        })
+        return status
+
+    @property
+    def failed(self):
+        return any(r["status"] == FAIL for r in self.results)
+
+
+def run_checks(widget_config=None):
+    diag = Diagnostics()
+    found = {}
+
+    def check_install():
+        for path in EqualizerManager.candidate_paths():
+            if path.exists() and (path / "config").exists():
+                found["apo_path"] = path
+                return OK, str(path)
+        return FAIL, "Equalizer APO is NOT installed (https://sourceforge.net/projects/equalizerapo/)"
+
+    if diag.run("install", check_install) == FAIL:
+        return diag
+
+    apo_path = found["apo_path"]
+    config_file = apo_path / "config" / "config.txt"
+
+    def check_config_file():
+        if not config_file.exists():
+            return WARN, "config.txt doesn't exist yet (will be created)"
+        with open(config_file, 'r') as f:
+            profile = EqProfile.from_config_text(f.read())
+        return OK, (f"{config_file} ({config_file.stat().st_size} bytes, "
+                    f"{len(profile)} graphic bands, {profile.filter_count} filters)")
+
+    def check_devices():
+        devices = EqualizerManager.read_devices(apo_path)
+        if not devices:
+            return WARN, "No devices configured: run Configurator.exe and select your playback device"
+        return OK, f"{len(devices)} configured: " + "; ".join(devices[:3])
+
+    def check_editor():
+        editor = apo_path / "Editor.exe"
+        if editor.exists():
+            return OK, str(editor)
+        return WARN, "Editor.exe not found (reload falls back to touching config.txt)"
+
+    def check_writable():
+        if os.access(config_file.parent, os.W_OK):
+            return OK, "config directory is writable"
+        return FAIL, "config directory is not writable (run the widget with access to it)"
+
+    def check_cache():
+        if not widget_config or not os.path.exists(widget_config):
+            return WARN, "no widget config to check"
+        with open(widget_config, 'r') as f:
+            cached = json.load(f).get("apo_discovery")
+        if not cached:
+            return WARN, "no cached discovery (widget will discover in the background)"
+        if Path(cached.get("config_path", "")) != config_file:
+            return WARN, f"cached path is stale: {cached.get('config_path')}"
+        return OK, "cached discovery matches"
+
+    diag.run("config_file", check_config_file)
+    diag.run("devices", check_devices)
+    diag.run("editor", check_editor)
+    diag.run("writable", check_writable)
+    diag.run("discovery_cache", check_cache)
+    return diag
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Equalizer APO configuration checker")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--config", default="widget_config.json",
+                        help="widget config whose cached discovery is checked")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    diag = run_checks(args.config)
+    total_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    if args.json:
+        print(json.dumps({"ok": not diag.failed, "total_ms": total_ms,
+                          "checks": diag.results}, indent=2))
+    else:
+        marks = {OK: "✓", WARN: "⚠", FAIL: "❌"}
+        print("Equalizer APO Configuration Checker")
+        print("=" * 60)
+        for r in diag.results:
+            print(f"{marks[r['status']]} {r['name']:<16} {r['ms']:>8.2f} ms  {r['detail']}")
+        print("=" * 60)
+        print(f"Total: {total_ms:.2f} ms")
+        print("\nIMPORTANT NOTES:")
+        for i, note in enumerate(NOTES, 1):
+            print(f"{i}. {note}")
+
+    return 1 if diag.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
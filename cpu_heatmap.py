@@ -0,0 +1,78 @@
+"""
+Per-core CPU heatmap for the Taskbar Widget
+Draws psutil.cpu_percent(percpu=True) as a grid of colored cells in a single
+PhotoImage. The pixel -> core map and the 0-100% color table are built once,
+so each frame is one numpy gather plus one PPM upload to Tk: the cost depends
+on the image size, not the number of cores.
+"""
+
+import math
+
+import numpy as np
+
+STOPS = ((0, (38, 70, 48)), (40, (76, 175, 80)), (70, (255, 193, 7)), (100, (244, 67, 54)))
+
+
+def color_table(bg):
+    """101 load colors (interpolated between STOPS) plus the background at index 101"""
+    points = [p for p, _ in STOPS]
+    lut = np.empty((102, 3), dtype=np.uint8)
+    pct = np.arange(101)
+    for channel in range(3):
+        lut[:101, channel] = np.round(np.interp(pct, points, [c[channel] for _, c in STOPS]))
+    lut[101] = [int(bg[i:i + 2], 16) for i in (1, 3, 5)]
+    return lut
+
+
+def grid_shape(cores, width, height):
+    """Rows/columns giving the squarest cells that fit all cores"""
+    rows = max(1, min(height, round(math.sqrt(cores * height / width))))
+    cols = math.ceil(cores / rows)
+    while cols > width and rows < height:
+        rows += 1
+        cols = math.ceil(cores / rows)
+    return rows, cols
+
+
+def pixel_map(cores, width, height):
+    """(height, width) array of core indices; `cores` marks gaps and unused cells"""
+    rows, cols = grid_shape(cores, width, height)
+    cell_h = max(1, height // rows)
+    cell_w = max(1, width // cols)
+    ys = np.arange(height) // cell_h
+    xs = np.arange(width) // cell_w
+    index = ys[:, None] * cols + xs[None, :]
+    unused = (ys[:, None] >= rows) | (xs[None, :] >= cols) | (index >= cores)
+    # 1px gutters once cells are big enough to spare them
+    if cell_h >= 4:
+        unused |= (np.arange(height) % cell_h == cell_h - 1)[:, None]
+    if cell_w >= 4:
+        unused |= (np.arange(width) % cell_w == cell_w - 1)[None, :]
+    index[unused] = cores
+    return index.astype(np.intp)
+
+
+class CpuHeatmap:
+    """Fixed-size heatmap image; call update(percents) once per stats tick"""
+
+    def __init__(self, master, cores, width=48, height=40, bg="#202020"):
+        import tkinter as tk
+        self.cores = cores
+        self.width = width
+        self.height = height
+        self.lut = color_table(bg)
+        self.index = pixel_map(cores, width, height)
+        self.levels = np.full(cores + 1, 101, dtype=np.intp)  # last slot: background
+        self.header = f"P6 {width} {height} 255\n".encode("ascii")
+        self.photo = tk.PhotoImage(master=master, width=width, height=height)
+
+    def frame(self, percents):
+        """PPM bytes for one set of per-core percentages"""
+        count = min(len(percents), self.cores)
+        np.rint(np.clip(np.asarray(percents[:count], dtype=np.float32), 0, 100),
+                out=self.levels[:count], casting="unsafe")
+        pixels = self.lut[self.levels[self.index]]
+        return self.header + pixels.tobytes()
+
+    def update(self, percents):
+        self.photo.configure(data=self.frame(percents), format="ppm")
@@ -0,0 +1,104 @@
+"""
+Diagnostics Dialog - per-callback latency and process resource usage
+"""
+
+import tkinter as tk
+from tkinter import messagebox, filedialog
+import logging
+
+logger = logging.getLogger("widget")
+
+
+class DiagnosticsDialog:
+    """Live view of the instrumentation registry with JSON export"""
+
+    REFRESH_MS = 1000
+
+    def __init__(self, parent, instruments, config_manager):
+        self.instruments = instruments
+        self.config = config_manager
+
+        bg = "#1e1e1e"
+        fg = "#ffffff"
+        accent = "#4cc2ff"
+
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Diagnostics")
+        self.dialog.configure(bg=bg)
+        self.dialog.transient(parent)
+
+        tk.Label(self.dialog, text="📊 Widget Diagnostics",
+                 font=("Segoe UI", 14, "bold"), bg=bg, fg=fg).pack(pady=10)
+
+        self.enabled_var = tk.BooleanVar(value=instruments.enabled)
+        tk.Checkbutton(self.dialog, text="Record callback timings", variable=self.enabled_var,
+                       command=self.toggle_enabled, bg=bg, fg=fg, selectcolor="#333333",
+                       activebackground=bg, activeforeground=fg,
+                       font=("Segoe UI", 10)).pack(anchor="w", padx=20)
+
+        self.text = tk.Text(self.dialog, width=92, height=16, bg="#2e2e2e", fg=fg,
+                            font=("Consolas", 9), relief="flat", padx=10, pady=10)
+        self.text.pack(padx=20, pady=10, fill="both", expand=True)
+
+        btn_frame = tk.Frame(self.dialog, bg=bg)
+        btn_frame.pack(pady=(0, 15))
+
+        tk.Button(btn_frame, text="Reset", command=self.reset,
+                  bg="#555555", fg=fg, relief="flat", padx=20, pady=8,
+                  font=("Segoe UI", 10), cursor="hand2").pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Export JSON...", command=self.export,
+                  bg=accent, fg="#000000", relief="flat", padx=20, pady=8,
+                  font=("Segoe UI", 10, "bold"), cursor="hand2").pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Close", command=self.dialog.destroy,
+                  bg="#555555", fg=fg, relief="flat", padx=20, pady=8,
+                  font=("Segoe UI", 10), cursor="hand2").pack(side="left", padx=5)
+
+        self.refresh()
+
+    def toggle_enabled(self):
+        self.instruments.enabled = self.enabled_var.get()
+        self.config.set("instrumentation", self.instruments.enabled)
+
+    def reset(self):
+        self.instruments.reset()
+        self.refresh(reschedule=False)
+
+    def export(self):
+        path = filedialog.asksaveasfilename(parent=self.dialog, defaultextension=".json",
+                                            initialfile="widget_diagnostics.json",
+                                            filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            self.instruments.export_json(path)
+            logger.info(f"Diagnostics exported to {path}")
+        except Exception as e:
+            messagebox.showerror("Export failed", str(e), parent=self.dialog)
+
+    def render(self, snapshot):
+        lines = []
+        proc = snapshot["process"]
+        if proc:
+            lines.append(f"Process: CPU {proc['cpu_percent']:.1f}%   RSS {proc['rss_mb']:.1f} MB   "
+                         f"threads {proc['threads']}")
+        lines.append(f"Recording: {'on' if snapshot['enabled'] else 'off'} (since {snapshot['since']})")
+        lines.append("")
+        lines.append(f"{'callback':<36}{'calls':>8}{'mean ms':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+        lines.append("-" * 90)
+        for name, s in snapshot["callbacks"].items():
+            lines.append(f"{name:<36}{s['calls']:>8}{s['mean_ms']:>10.3f}{s['p50_ms']:>9.3f}"
+                         f"{s['p95_ms']:>9.3f}{s['p99_ms']:>9.3f}{s['max_ms']:>9.3f}")
+        for name, counters in snapshot.get("counters", {}).items():
+            lines.append("")
+            lines.append(f"{name}: " + "   ".join(f"{key} {value}" for key, value in counters.items()))
+        return "\n".join(lines)
+
+    def refresh(self, reschedule=True):
+        if not self.dialog.winfo_exists():
+            return
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", self.render(self.instruments.snapshot()))
+        self.text.config(state="disabled")
+        if reschedule:
+            self.dialog.after(self.REFRESH_MS, self.refresh)
@@ -0,0 +1,278 @@
+"""
+Offline EQ Renderer
+Applies an EqProfile (GraphicEQ bands, parametric biquad filters, preamp) to WAV
+files without Equalizer APO, so presets can be previewed and verified anywhere.
+
+The response engine computes the profile's magnitude response (dB) the way APO
+does: GraphicEQ points interpolated on a log-frequency axis, plus the RBJ biquad
+responses of the Filter lines. The renderer turns that response into a
+linear-phase FIR kernel and streams the WAV through it in fixed-size chunks
+with FFT overlap-add, so memory stays bounded regardless of file length.
+
+Usage: python eq_renderer.py input.wav output.wav --preset "Rock"
+       python eq_renderer.py input.wav output.wav --config config.txt
+"""
+
+import sys
+import math
+import wave
+import logging
+import argparse
+
+import numpy as np
+
+from equalizer_manager import EqualizerManager, EqProfile
+
+logger = logging.getLogger("equalizer.renderer")
+
+# Default FIR length; 8192 taps at 48 kHz resolves ~6 Hz, enough for 20 Hz bands
+KERNEL_SIZE = 8192
+CHUNK_FRAMES = 32768
+
+
+def biquad_coefficients(ftype, fc, gain, q, fs):
+    """RBJ cookbook biquad (b0, b1, b2, a0, a1, a2) for an APO filter type"""
+    q = q if q > 0 else 1 / math.sqrt(2)
+    fc = min(max(fc, 1.0), fs / 2 * 0.999)
+    a = 10 ** (gain / 40)
+    w0 = 2 * math.pi * fc / fs
+    cos_w0, sin_w0 = math.cos(w0), math.sin(w0)
+    alpha = sin_w0 / (2 * q)
+
+    if ftype == "PK":
+        return (1 + alpha * a, -2 * cos_w0, 1 - alpha * a,
+                1 + alpha / a, -2 * cos_w0, 1 - alpha / a)
+    if ftype in ("LS", "LSC"):
+        sq = 2 * math.sqrt(a) * alpha
+        return (a * ((a + 1) - (a - 1) * cos_w0 + sq), 2 * a * ((a - 1) - (a + 1) * cos_w0),
+                a * ((a + 1) - (a - 1) * cos_w0 - sq), (a + 1) + (a - 1) * cos_w0 + sq,
+                -2 * ((a - 1) + (a + 1) * cos_w0), (a + 1) + (a - 1) * cos_w0 - sq)
+    if ftype in ("HS", "HSC"):
+        sq = 2 * math.sqrt(a) * alpha
+        return (a * ((a + 1) + (a - 1) * cos_w0 + sq), -2 * a * ((a - 1) + (a + 1) * cos_w0),
+                a * ((a + 1) + (a - 1) * cos_w0 - sq), (a + 1) - (a - 1) * cos_w0 + sq,
+                2 * ((a - 1) - (a + 1) * cos_w0), (a + 1) - (a - 1) * cos_w0 - sq)
+    if ftype in ("LP", "LPQ"):
+        return ((1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2, 1 + alpha, -2 * cos_w0, 1 - alpha)
+    if ftype in ("HP", "HPQ"):
+        return ((1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2, 1 + alpha, -2 * cos_w0, 1 - alpha)
+    if ftype == "BP":
+        return (alpha, 0.0, -alpha, 1 + alpha, -2 * cos_w0, 1 - alpha)
+    if ftype == "NO":
+        return (1.0, -2 * cos_w0, 1.0, 1 + alpha, -2 * cos_w0, 1 - alpha)
+    if ftype == "AP":
+        return (1 - alpha, -2 * cos_w0, 1 + alpha, 1 + alpha, -2 * cos_w0, 1 - alpha)
+    raise ValueError(f"Unsupported filter type: {ftype}")
+
+
+def biquad_response_db(coeffs, freqs, fs):
+    """Magnitude response (dB) of one biquad at `freqs`"""
+    b0, b1, b2, a0, a1, a2 = coeffs
+    z1 = np.exp(-1j * 2 * np.pi * np.asarray(freqs, dtype=np.float64) / fs)
+    z2 = z1 * z1
+    h = (b0 + b1 * z1 + b2 * z2) / (a0 + a1 * z1 + a2 * z2)
+    return 20 * np.log10(np.maximum(np.abs(h), 1e-12))
+
+
+def profile_response(profile, freqs, fs):
+    """Magnitude response (dB) of a whole profile at `freqs` (the response engine)"""
+    freqs = np.asarray(freqs, dtype=np.float64)
+    response = np.zeros_like(freqs)
+
+    if len(profile):
+        band_freqs = np.frombuffer(profile.freqs, dtype=np.float32).astype(np.float64)
+        band_gains = np.frombuffer(profile.gains, dtype=np.float32).astype(np.float64)
+        order = np.argsort(band_freqs)
+        log_f = np.log(np.maximum(freqs, 1e-3))
+        response += np.interp(log_f, np.log(band_freqs[order]), band_gains[order])
+
+    for i, ftype in enumerate(profile.filter_types):
+        if not profile.filter_enabled[i]:
+            continue
+        try:
+            coeffs = biquad_coefficients(ftype, profile.filter_freqs[i], profile.filter_gains[i],
+                                         profile.filter_qs[i], fs)
+        except ValueError as e:
+            logger.warning(f"Skipping filter: {e}")
+            continue
+        response += biquad_response_db(coeffs, freqs, fs)
+
+    if profile.preamp:
+        response += profile.preamp
+    return response
+
+
+def design_kernel(profile, fs, size=KERNEL_SIZE):
+    """Linear-phase FIR kernel (length `size`, delay size//2) matching the profile response"""
+    bins = np.fft.rfftfreq(size, 1 / fs)
+    magnitude = 10 ** (profile_response(profile, bins, fs) / 20)
+    impulse = np.fft.irfft(magnitude, size)
+    kernel = np.roll(impulse, size // 2) * np.hanning(size)
+    return kernel
+
+
+class StreamingEQ:
+    """Chunked FFT overlap-add filter; state carries across process() calls"""
+
+    def __init__(self, profile, fs, channels, chunk_frames=CHUNK_FRAMES, kernel_size=KERNEL_SIZE):
+        self.fs = fs
+        self.channels = channels
+        self.chunk_frames = chunk_frames
+        self.kernel = design_kernel(profile, fs, kernel_size)
+        self.fft_size = 1 << (chunk_frames + kernel_size - 1 - 1).bit_length()
+        self.kernel_fft = np.fft.rfft(self.kernel, self.fft_size)[:, None]
+        self.tail = np.zeros((kernel_size - 1, channels), dtype=np.float64)
+        # Linear-phase delay still to be dropped from the start of the output
+        self.skip = kernel_size // 2
+
+    def process(self, block):
+        """Filter a (frames, channels) float block; returns the same number of frames (after warm-up)"""
+        frames = len(block)
+        if frames == 0:
+            return block
+        spectrum = np.fft.rfft(block, self.fft_size, axis=0)
+        out = np.fft.irfft(spectrum * self.kernel_fft, self.fft_size, axis=0)
+
+        tail_len = len(self.tail)
+        out[:tail_len] += self.tail
+        result = out[:frames]
+        self.tail = out[frames:frames + tail_len].copy()
+        return self._drop_delay(result)
+
+    def flush(self):
+        """Emit the remaining filter tail (call once after the last block)"""
+        tail, self.tail = self.tail[:self.kernel.size // 2], np.zeros_like(self.tail)
+        return self._drop_delay(tail)
+
+    def _drop_delay(self, out):
+        if self.skip:
+            drop = min(self.skip, len(out))
+            self.skip -= drop
+            out = out[drop:]
+        return out
+
+
+def _decode(raw, width, channels):
+    """WAV frames (bytes) -> float64 array (frames, channels) in [-1, 1)"""
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float64) - 128) / 128
+    elif width == 2:
+        data = np.frombuffer(raw, dtype="<i2") / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        data = np.where(ints & 0x800000, ints - 0x1000000, ints) / 8388608.0
+    elif width == 4:
+        data = np.frombuffer(raw, dtype="<i4") / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {width}")
+    return data.reshape(-1, channels)
+
+
+def _encode(data, width):
+    """float64 array -> WAV frame bytes; returns (bytes, clipped sample count)"""
+    clipped = int(np.count_nonzero(np.abs(data) >= 1.0))
+    if width == 1:
+        return (np.clip(data * 128 + 128, 0, 255)).astype(np.uint8).tobytes(), clipped
+    if width == 2:
+        return np.clip(np.round(data * 32768), -32768, 32767).astype("<i2").tobytes(), clipped
+    if width == 3:
+        ints = np.clip(np.round(data * 8388608), -8388608, 8388607).astype(np.int32).reshape(-1)
+        b = np.empty((ints.size, 3), dtype=np.uint8)
+        b[:, 0] = ints & 0xFF
+        b[:, 1] = (ints >> 8) & 0xFF
+        b[:, 2] = (ints >> 16) & 0xFF
+        return b.tobytes(), clipped
+    return np.clip(np.round(data * 2147483648), -2147483648, 2147483647).astype("<i4").tobytes(), clipped
+
+
+def render_wav(in_path, out_path, profile, chunk_frames=CHUNK_FRAMES, progress=None):
+    """Render `in_path` through `profile` into `out_path`; returns stats dict"""
+    with wave.open(in_path, 'rb') as src:
+        channels = src.getnchannels()
+        width = src.getsampwidth()
+        fs = src.getframerate()
+        total = src.getnframes()
+        eq = StreamingEQ(profile, fs, channels, chunk_frames)
+
+        with wave.open(out_path, 'wb') as dst:
+            dst.setnchannels(channels)
+            dst.setsampwidth(width)
+            dst.setframerate(fs)
+
+            done = 0
+            clipped = 0
+            while True:
+                raw = src.readframes(chunk_frames)
+                if not raw:
+                    break
+                block = _decode(raw, width, channels)
+                done += len(block)
+                data, n = _encode(eq.process(block), width)
+                clipped += n
+                dst.writeframes(data)
+                if progress:
+                    progress(done / total if total else 1.0)
+
+            data, n = _encode(eq.flush(), width)
+            dst.writeframes(data)
+            clipped += n
+
+    if clipped:
+        logger.warning(f"Rendered {out_path} with {clipped} clipped samples (lower Preamp)")
+    return {"frames": total, "channels": channels, "sample_rate": fs, "clipped": clipped}
+
+
+def validate(profile, fs=48000, chunk_frames=4096, points=200):
+    """Max |dB| difference between the streaming engine and profile_response (30 Hz - 16 kHz)"""
+    eq = StreamingEQ(profile, fs, 1, chunk_frames)
+    length = 1 << 16
+    impulse = np.zeros((length, 1))
+    # Centred so the linear-phase pre-ringing isn't cut by the delay compensation
+    impulse[length // 2, 0] = 1.0
+    # Feed the impulse in chunks to exercise the overlap-add state
+    out = [eq.process(impulse[i:i + chunk_frames]) for i in range(0, length, chunk_frames)]
+    out.append(eq.flush())
+    measured = np.concatenate(out)[:length, 0]
+
+    freqs = np.geomspace(30, min(16000, fs / 2 * 0.9), points)
+    spectrum = np.fft.rfft(measured)
+    bins = np.fft.rfftfreq(length, 1 / fs)
+    measured_db = np.interp(freqs, bins, 20 * np.log10(np.maximum(np.abs(spectrum), 1e-12)))
+    return float(np.max(np.abs(measured_db - profile_response(profile, freqs, fs))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a WAV file through an EQ preset")
+    parser.add_argument("input", help="input WAV file")
+    parser.add_argument("output", help="output WAV file")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--preset", help="built-in or library preset name")
+    source.add_argument("--config", help="Equalizer APO config.txt to apply")
+    parser.add_argument("--library", help="preset library directory or packed file")
+    parser.add_argument("--chunk", type=int, default=CHUNK_FRAMES, help="frames per chunk")
+    parser.add_argument("--validate", action="store_true",
+                        help="report max deviation from the response engine")
+    args = parser.parse_args(argv)
+
+    if args.config:
+        with open(args.config, 'r') as f:
+            profile = EqProfile.from_config_text(f.read())
+    else:
+        from preset_library import PresetLibrary
+        library = PresetLibrary(EqualizerManager.PRESETS, EqualizerManager.BANDS, args.library)
+        profile = library.load(args.preset)
+        if profile is None:
+            print(f"Unknown preset: {args.preset}")
+            return 1
+
+    stats = render_wav(args.input, args.output, profile, args.chunk)
+    print(f"Rendered {stats['frames']} frames x {stats['channels']} ch @ {stats['sample_rate']} Hz"
+          f" -> {args.output} ({stats['clipped']} clipped samples)")
+    if args.validate:
+        print(f"Max deviation from response engine: {validate(profile, stats['sample_rate']):.3f} dB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
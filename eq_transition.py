@@ -0,0 +1,129 @@
+"""
+EQ Transition Engine
+Crossfades band gains from the current vector to a target over a fixed duration,
+emitting intermediate states through the EQ apply path at a capped write rate.
+apply_fn(gains, final) is told which write is the last one, so expensive work
+(reloading Equalizer APO) can wait for it.
+"""
+
+import math
+import time
+import logging
+
+logger = logging.getLogger("equalizer.transition")
+
+
+class EqTransition:
+    """Interpolates EQ gains on the Tk event loop; a new target cancels the running one"""
+
+    def __init__(self, widget, apply_fn, duration_ms=300, max_write_hz=20):
+        self.widget = widget
+        self.apply_fn = apply_fn
+        self.duration_ms = duration_ms
+        self.max_write_hz = max_write_hz
+
+        self.start_gains = []
+        self.target_gains = []
+        self.current = []
+        self.step = 0
+        self.steps = 0
+        self.interval_ms = 0
+        self.timer = None
+        self.last_write = 0.0
+
+        # Instrumentation
+        self.transitions = 0
+        self.cancelled = 0
+        self.total_writes = 0
+        self.writes = 0          # writes in the current / last transition
+        self.started_at = 0.0
+        self.last_duration_ms = 0.0
+
+    @property
+    def active(self):
+        return self.timer is not None
+
+    @property
+    def min_interval_ms(self):
+        return 1000 / self.max_write_hz if self.max_write_hz > 0 else 0
+
+    def start(self, current_gains, target_gains):
+        """Begin moving from current_gains (or the in-flight state) to target_gains"""
+        if self.active:
+            # Continue from where the running fade is, not from its start
+            current_gains = self.current
+            self.cancel()
+
+        self.start_gains = [float(g) for g in current_gains]
+        self.target_gains = [float(g) for g in target_gains]
+        self.current = list(self.start_gains)
+        self.transitions += 1
+        self.writes = 0
+        self.step = 0
+        self.started_at = time.perf_counter()
+
+        # Fixed write rate, capped at max_write_hz; at least the final write
+        min_interval = self.min_interval_ms
+        self.steps = max(1, int(self.duration_ms / min_interval) if min_interval else 1)
+        self.interval_ms = self.duration_ms / self.steps
+
+        # Respect the cap across back-to-back transitions as well
+        since_last = (time.perf_counter() - self.last_write) * 1000
+        first_delay = max(0, min_interval - since_last)
+        self.timer = self.widget.after(int(first_delay), self._tick)
+
+    def finish(self):
+        """Stop the running transition by writing its target now (e.g. when the dialog closes)"""
+        if self.timer is None:
+            return
+        self.widget.after_cancel(self.timer)
+        self.timer = None
+        self.current = list(self.target_gains)
+        self._write(final=True)
+        self._finish("finished early")
+
+    def cancel(self):
+        """Stop the running transition, leaving gains at the last written state"""
+        if self.timer is not None:
+            self.widget.after_cancel(self.timer)
+            self.timer = None
+            self.cancelled += 1
+            self._finish("cancelled")
+
+    def _tick(self):
+        self.timer = None
+        self.step += 1
+        t = self.step / self.steps
+        # Smoothstep easing avoids abrupt starts/stops at the ends of the fade
+        eased = t * t * (3 - 2 * t)
+        self.current = [a + (b - a) * eased for a, b in zip(self.start_gains, self.target_gains)]
+        self._write(final=self.step >= self.steps)
+
+        if self.step < self.steps:
+            self.timer = self.widget.after(max(1, math.ceil(self.interval_ms)), self._tick)
+        else:
+            self._finish("done")
+
+    def _write(self, final):
+        self.last_write = time.perf_counter()
+        self.writes += 1
+        self.total_writes += 1
+        try:
+            self.apply_fn(self.current, final)
+        except Exception as e:
+            logger.error(f"EQ transition apply error: {e}")
+
+    def _finish(self, state):
+        self.last_duration_ms = (time.perf_counter() - self.started_at) * 1000
+        logger.info(f"EQ transition {state}: {self.writes} writes in {self.last_duration_ms:.0f} ms")
+
+    def stats(self):
+        """Counters for diagnostics"""
+        return {
+            "transitions": self.transitions,
+            "cancelled": self.cancelled,
+            "total_writes": self.total_writes,
+            "last_writes": self.writes,
+            "last_duration_ms": round(self.last_duration_ms, 1),
+            "writes_per_transition": round(self.total_writes / self.transitions, 2) if self.transitions else 0,
+        }
@@ -3,51 +3,91 @@ Simplified Equalizer GUI Dialog - More Reliable Version
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+import os
+import sys
 import logging
+import tempfile
+import threading
+
+from eq_transition import EqTransition
+
+logger = logging.getLogger("equalizer.dialog")
+
+
+
+def format_freq(freq):
+    """Short frequency label for a band (e.g. 62Hz, 1kHz, 12.5kHz)"""
+    return f"{freq:g}Hz" if freq < 1000 else f"{freq / 1000:g}kHz"
+
 
 class EqualizerDialog:
-    """10-band graphic equalizer dialog - simplified version"""
+    """N-band graphic equalizer dialog - simplified version"""
+    
+    # Above this many bands, sliders are virtualized: a fixed pool of columns
+    # is built once and re-bound to bands as the user scrolls
+    MAX_VISIBLE_BANDS = 10
+    SLIDER_RESOLUTION = 0.5
+    # Preset names shown in the dropdown while filtering
+    MAX_PRESET_RESULTS = 200
     
     def __init__(self, parent, eq_manager, config_manager):
         self.eq_manager = eq_manager
         self.config = config_manager
         self.parent = parent
         
-        logging.info("=== Creating Equalizer Dialog ===")
+        logger.info("=== Creating Equalizer Dialog ===")
         
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Audio Equalizer")
-        self.dialog.geometry("750x500")
+        self.dialog.geometry("750x560")
         self.dialog.configure(bg="#1e1e1e")
         
         # Make it modal
         self.dialog.transient(parent)
         
-        logging.info(f"Dialog created, checking Equalizer APO...")
-        logging.info(f"APO Available: {self.eq_manager.is_available()}")
+        logger.info(f"Dialog created, checking Equalizer APO...")
+        self.searching = None
+        self.setup()
+    
+    def setup(self):
+        """Build the EQ UI, or the install message; waits (without blocking) for first-launch discovery"""
+        if not self.dialog.winfo_exists():
+            return  # Closed while still searching
+        available = self.eq_manager.is_available()
+        if available is None:
+            if self.searching is None:
+                self.searching = tk.Label(self.dialog, text="Looking for Equalizer APO...",
+                                          font=("Segoe UI", 12), bg="#1e1e1e", fg="#ffffff")
+                self.searching.pack(pady=60)
+            self.dialog.after(100, self.setup)
+            return
+        if self.searching is not None:
+            self.searching.destroy()
+            self.searching = None
+        logger.info(f"APO Available: {available}")
         
         # Check if Equalizer APO is available
-        if not self.eq_manager.is_available():
-            logging.warning("Equalizer APO not found")
+        if not available:
+            logger.warning("Equalizer APO not found")
             self.show_install_message()
             return
         
-        logging.info("Building UI...")
+        logger.info("Building UI...")
         try:
             self.build_ui()
-            logging.info("UI built successfully")
+            logger.info("UI built successfully")
         except Exception as e:
-            logging.error(f"Error building UI: {e}")
+            logger.error(f"Error building UI: {e}")
             import traceback
-            logging.error(traceback.format_exc())
+            logger.error(traceback.format_exc())
             messagebox.showerror("Error", f"Failed to create equalizer dialog:\n{e}")
             self.dialog.destroy()
             return
         
         # Center the dialog
         self.center_dialog()
-        logging.info("Dialog ready")
+        logger.info("Dialog ready")
     
     def build_ui(self):
         """Build the equalizer UI"""
@@ -55,8 +95,22 @@ class EqualizerDialog:
         fg = "#ffffff"
         accent = "#4cc2ff"
         
+        # Current profile; self.gains is the array the sliders edit
+        self.profile = self.eq_manager.get_current_profile()
+        self.freqs = list(self.profile.freqs)
+        self.gains = self.profile.gains
+        self.offset = 0
+        
+        # Preset changes crossfade through the apply path at a capped write rate
+        self.transition = EqTransition(self.dialog, self.apply_transition_step,
+                                       self.config.get("eq_transition_ms"),
+                                       self.config.get("eq_max_write_hz"))
+        self.closing = False
+        self.dialog.bind("<Destroy>", self.on_destroy, add="+")
+        logger.info(f"Current profile: {len(self.freqs)} bands, {self.profile.filter_count} filters")
+        
         # Title
-        tk.Label(self.dialog, text="🎚️ 10-Band Graphic Equalizer", 
+        tk.Label(self.dialog, text=f"🎚️ {len(self.freqs)}-Band Graphic Equalizer", 
                 font=("Segoe UI", 16, "bold"), bg=bg, fg=fg).pack(pady=15)
         
         # Preset selector
@@ -68,11 +122,14 @@ class EqualizerDialog:
         
         self.preset_var = tk.StringVar(value=self.config.get("eq_preset") or "Flat")
         
-        preset_combo = ttk.Combobox(preset_frame, textvariable=self.preset_var, 
-                                   values=list(self.eq_manager.PRESETS.keys()),
-                                   state="readonly", width=20, font=("Segoe UI", 10))
-        preset_combo.pack(side="left", padx=5)
-        preset_combo.bind("<<ComboboxSelected>>", self.load_preset)
+        # Editable: typing filters the preset library through its search index
+        self.preset_combo = ttk.Combobox(preset_frame, textvariable=self.preset_var, 
+                                   values=self.eq_manager.library.search("", self.MAX_PRESET_RESULTS),
+                                   width=32, font=("Segoe UI", 10))
+        self.preset_combo.pack(side="left", padx=5)
+        self.preset_combo.bind("<<ComboboxSelected>>", self.load_preset)
+        self.preset_combo.bind("<KeyRelease>", self.filter_presets)
+        self.preset_combo.bind("<Return>", self.load_preset)
         
         # Sliders area with canvas and scrollbar (in case of overflow)
         canvas_frame = tk.Frame(self.dialog, bg="#2e2e2e", bd=2, relief="groove")
@@ -82,48 +139,52 @@ class EqualizerDialog:
         sliders_container = tk.Frame(canvas_frame, bg=bg)
         sliders_container.pack(padx=15, pady=15)
         
+        # One column per visible slot; with many bands only a window of
+        # MAX_VISIBLE_BANDS columns exists and is re-bound on scroll
         self.sliders = []
         self.value_labels = []
-        
-        # Get current settings
-        current_gains = self.eq_manager.get_current_settings() or [0] * 10
-        logging.info(f"Current gains: {current_gains}")
+        self.freq_labels = []
         
         # Create sliders using pack (more reliable than grid)
         slider_row = tk.Frame(sliders_container, bg=bg)
         slider_row.pack()
         
-        for i, (freq, gain) in enumerate(zip(self.eq_manager.BANDS, current_gains)):
+        for col in range(min(len(self.freqs), self.MAX_VISIBLE_BANDS)):
             # Each slider in its own frame
             slider_frame = tk.Frame(slider_row, bg=bg)
             slider_frame.pack(side="left", padx=10)
             
             # Value display
-            val_label = tk.Label(slider_frame, text=f"{gain:+.1f}dB", 
-                                font=("Segoe UI", 10, "bold"), bg=bg, fg=accent,
-                                width=7)
+            val_label = tk.Label(slider_frame, font=("Segoe UI", 10, "bold"), 
+                                bg=bg, fg=accent, width=7)
             val_label.pack()
             self.value_labels.append(val_label)
             
             # Slider
-            slider = tk.Scale(slider_frame, from_=12, to=-12, resolution=0.5,
+            slider = tk.Scale(slider_frame, from_=12, to=-12, resolution=self.SLIDER_RESOLUTION,
                             orient="vertical", length=220, width=30,
                             bg=bg, fg=accent, 
                             troughcolor="#333333",
                             activebackground=accent,
                             highlightthickness=0, bd=0, 
                             showvalue=0,
-                            command=lambda val, idx=i: self.on_slider_change(idx, val))
-            slider.set(gain)
+                            command=lambda val, idx=col: self.on_slider_change(idx, val))
             slider.pack(pady=5)
             self.sliders.append(slider)
             
             # Frequency label
-            freq_text = f"{freq}Hz" if freq < 1000 else f"{freq//1000}kHz"
-            tk.Label(slider_frame, text=freq_text, font=("Segoe UI", 9), 
-                    bg=bg, fg=fg).pack()
+            freq_label = tk.Label(slider_frame, font=("Segoe UI", 9), bg=bg, fg=fg)
+            freq_label.pack()
+            self.freq_labels.append(freq_label)
+        
+        self.band_scroll = None
+        if len(self.freqs) > self.MAX_VISIBLE_BANDS:
+            self.band_scroll = tk.Scrollbar(sliders_container, orient="horizontal",
+                                            command=self.on_band_scroll)
+            self.band_scroll.pack(fill="x", pady=(10, 0))
         
-        logging.info(f"Created {len(self.sliders)} sliders")
+        self.show_bands(0)
+        logger.info(f"Created {len(self.sliders)} sliders for {len(self.freqs)} bands")
         
         # Info label
         info_frame = tk.Frame(self.dialog, bg=bg)
@@ -132,6 +193,9 @@ class EqualizerDialog:
         info_text = "💡 Tip: Changes apply in real-time. Equalizer APO must be installed and a device configured."
         tk.Label(info_frame, text=info_text, font=("Segoe UI", 9), 
                 bg=bg, fg="#888888", wraplength=700).pack()
+        if self.profile.filter_count:
+            tk.Label(info_frame, text=f"+ {self.profile.filter_count} parametric filters from config.txt are kept",
+                    font=("Segoe UI", 9), bg=bg, fg="#888888").pack()
         
         # Buttons
         btn_frame = tk.Frame(self.dialog, bg=bg)
@@ -152,6 +216,29 @@ class EqualizerDialog:
         tk.Button(btn_frame, text="❓ Setup Help", command=self.show_help,
                  bg="#ff9800", fg="#000000", relief="flat", padx=15, pady=10,
                  font=("Segoe UI", 10), cursor="hand2").pack(side="left", padx=5)
+        
+        # A/B preview of the current settings on a WAV file (offline renderer)
+        preview_frame = tk.Frame(self.dialog, bg=bg)
+        preview_frame.pack(pady=(0, 10))
+        
+        tk.Button(preview_frame, text="🎧 Preview WAV...", command=self.preview_wav,
+                 bg="#555555", fg=fg, relief="flat", padx=15, pady=6,
+                 font=("Segoe UI", 9), cursor="hand2").pack(side="left", padx=5)
+        self.play_a_btn = tk.Button(preview_frame, text="A: Original", state="disabled",
+                 command=lambda: self.play_preview(self.preview_source),
+                 bg="#555555", fg=fg, relief="flat", padx=10, pady=6,
+                 font=("Segoe UI", 9), cursor="hand2")
+        self.play_a_btn.pack(side="left", padx=5)
+        self.play_b_btn = tk.Button(preview_frame, text="B: With EQ", state="disabled",
+                 command=lambda: self.play_preview(self.preview_output),
+                 bg="#555555", fg=fg, relief="flat", padx=10, pady=6,
+                 font=("Segoe UI", 9), cursor="hand2")
+        self.play_b_btn.pack(side="left", padx=5)
+        self.preview_status = tk.Label(preview_frame, text="", font=("Segoe UI", 9),
+                                       bg=bg, fg="#888888")
+        self.preview_status.pack(side="left", padx=5)
+        self.preview_source = None
+        self.preview_output = None
     
     def center_dialog(self):
         """Center dialog on screen"""
@@ -180,43 +267,111 @@ class EqualizerDialog:
         
         self.center_dialog()
     
-    def on_slider_change(self, index, value):
+    def show_bands(self, offset):
+        """Bind the slider columns to bands offset..offset+len(sliders)"""
+        self.offset = max(0, min(offset, len(self.freqs) - len(self.sliders)))
+        for col, slider in enumerate(self.sliders):
+            idx = self.offset + col
+            gain = self.gains[idx]
+            self.freq_labels[col].config(text=format_freq(self.freqs[idx]))
+            self.value_labels[col].config(text=f"{gain:+.1f}dB")
+            slider.set(gain)
+        if self.band_scroll:
+            total = len(self.freqs)
+            self.band_scroll.set(self.offset / total, (self.offset + len(self.sliders)) / total)
+    
+    def on_band_scroll(self, action, amount, unit=None):
+        """Scrollbar callback for virtualized sliders"""
+        if action == "moveto":
+            offset = round(float(amount) * len(self.freqs))
+        else:
+            step = len(self.sliders) if unit == "pages" else 1
+            offset = self.offset + int(amount) * step
+        if offset != self.offset:
+            self.show_bands(offset)
+    
+    def on_slider_change(self, column, value):
         """Handle slider movement - apply in real-time"""
+        index = self.offset + column
         val = float(value)
-        self.value_labels[index].config(text=f"{val:+.1f}dB")
+        self.value_labels[column].config(text=f"{val:+.1f}dB")
         
-        # Apply changes in real-time
+        # Slider.set() from show_bands/set_gains echoes back here; ignore
+        # values that only differ from the stored gain by slider rounding
+        if abs(val - self.gains[index]) <= self.SLIDER_RESOLUTION / 2 + 1e-6:
+            return
+        # User took over a slider: stop any running preset crossfade
+        self.transition.cancel()
+        self.gains[index] = val
+        self.schedule_apply()
+    
+    def schedule_apply(self):
+        """Apply changes in real-time, debounced"""
         if hasattr(self, 'real_time_timer'):
             self.dialog.after_cancel(self.real_time_timer)
         
         # Debounce: apply after 100ms of no changes
         self.real_time_timer = self.dialog.after(100, self.apply_settings_silent)
     
+    def set_gains(self, gains):
+        """Crossfade all band gains to `gains` (sliders follow each step)"""
+        if hasattr(self, 'real_time_timer'):
+            self.dialog.after_cancel(self.real_time_timer)
+        self.transition.start(list(self.gains), gains)
+    
+    def apply_transition_step(self, gains, final):
+        """One crossfade state: update sliders and write to APO, reloading APO only on the last"""
+        for i, gain in enumerate(gains):
+            self.gains[i] = gain
+        if not self.closing:
+            self.show_bands(self.offset)
+        self.eq_manager.apply_profile(self.profile, reload=final)
+    
+    def on_destroy(self, event):
+        if event.widget is self.dialog:
+            # Closing mid-fade: write the target, not an in-between curve
+            self.closing = True
+            self.transition.finish()
+    
+    def filter_presets(self, event=None):
+        """Narrow the dropdown to presets matching the typed text"""
+        if event is not None and event.keysym in ("Return", "Up", "Down", "Escape"):
+            return
+        matches = self.eq_manager.library.search(self.preset_var.get(), self.MAX_PRESET_RESULTS)
+        self.preset_combo.config(values=matches)
+    
     def load_preset(self, event=None):
-        """Load preset values"""
+        """Load preset values (parsed from the library only when selected)"""
         preset = self.preset_var.get()
-        if preset in self.eq_manager.PRESETS:
-            gains = self.eq_manager.PRESETS[preset]
-            for slider, gain in zip(self.sliders, gains):
-                slider.set(gain)
+        loaded = self.eq_manager.library.load(preset)
+        if loaded is None:
+            return
+        
+        # Graphic part is mapped onto this dialog's bands; parametric
+        # filters and preamp come from the preset as-is
+        gains = list(loaded.gains)
+        if list(loaded.freqs) != self.freqs:
+            gains = loaded.resampled(self.freqs)
+        self.profile.filter_types = list(loaded.filter_types)
+        for attr in ("filter_enabled", "filter_freqs", "filter_gains", "filter_qs"):
+            setattr(self.profile, attr, getattr(loaded, attr)[:])
+        self.profile.preamp = loaded.preamp
+        self.set_gains(gains)
     
     def reset_flat(self):
         """Reset all to 0dB"""
-        for slider in self.sliders:
-            slider.set(0)
+        self.set_gains([0] * len(self.freqs))
         self.preset_var.set("Flat")
     
     def apply_settings_silent(self):
         """Apply EQ settings without visual feedback (for real-time updates)"""
-        gains = [slider.get() for slider in self.sliders]
-        self.eq_manager.apply_settings(gains)
+        self.eq_manager.apply_profile(self.profile)
     
     def apply_settings(self):
         """Apply EQ settings with visual feedback"""
-        gains = [slider.get() for slider in self.sliders]
-        logging.info(f"Applying gains: {gains}")
+        logger.info(f"Applying gains: {list(self.gains)}")
         
-        if self.eq_manager.apply_settings(gains):
+        if self.eq_manager.apply_profile(self.profile):
             self.config.set("eq_preset", self.preset_var.get())
             
             # Visual feedback
@@ -224,11 +379,56 @@ class EqualizerDialog:
                 label.config(fg="#00ff00")
                 self.dialog.after(300, lambda l=label: l.config(fg="#4cc2ff"))
             
-            logging.info("EQ applied successfully")
+            logger.info("EQ applied successfully")
         else:
             messagebox.showerror("Error", 
                 "Failed to apply equalizer settings.\n\nMake sure Equalizer APO is properly installed and configured.")
     
+    def preview_wav(self):
+        """Render the current settings onto a WAV file for A/B listening"""
+        try:
+            import eq_renderer
+        except ImportError as e:
+            messagebox.showerror("Preview", f"Preview needs numpy:\n{e}")
+            return
+        
+        path = filedialog.askopenfilename(parent=self.dialog, title="Choose a WAV file",
+                                          filetypes=[("WAV audio", "*.wav")])
+        if not path:
+            return
+        
+        output = os.path.join(tempfile.gettempdir(), "taskbar_widget_eq_preview.wav")
+        self.play_b_btn.config(state="disabled")
+        self.preview_status.config(text="Rendering...")
+        
+        def render():
+            try:
+                eq_renderer.render_wav(path, output, self.profile)
+                self.dialog.after(0, lambda: self.preview_ready(path, output))
+            except Exception as e:
+                logger.error(f"Preview render error: {e}")
+                msg = f"Render failed: {e}"  # `e` is unbound once the except block ends
+                self.dialog.after(0, lambda: self.preview_status.config(text=msg))
+        
+        threading.Thread(target=render, daemon=True).start()
+    
+    def preview_ready(self, source, output):
+        self.preview_source = source
+        self.preview_output = output
+        self.play_a_btn.config(state="normal")
+        self.play_b_btn.config(state="normal")
+        self.preview_status.config(text=os.path.basename(source))
+    
+    def play_preview(self, path):
+        """Play a preview file (Windows) or show where it was written"""
+        if not path:
+            return
+        if sys.platform == "win32":
+            import winsound
+            winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+        else:
+            messagebox.showinfo("Preview", f"Preview written to:\n{path}")
+    
     def show_help(self):
         """Show setup help dialog"""
         help_text = """
@@ -4,10 +4,151 @@ Integrates with Equalizer APO for real system-wide audio equalization
 """
 
 import os
+import re
+import math
+import bisect
 import logging
+import threading
 import subprocess
+from array import array
 from pathlib import Path
 
+from tracing import tracer
+
+logger = logging.getLogger("equalizer")
+
+
+# ISO 1/3-octave centre frequencies used by 31-band graphic equalizers
+ISO_31_BANDS = [20, 25, 31.5, 40, 50, 63, 80, 100, 125, 160, 200, 250, 315, 400, 500,
+                630, 800, 1000, 1250, 1600, 2000, 2500, 3150, 4000, 5000, 6300, 8000,
+                10000, 12500, 16000, 20000]
+
+# Filter types whose Equalizer APO syntax carries no gain
+NO_GAIN_FILTERS = {"LP", "HP", "LPQ", "HPQ", "BP", "NO", "AP"}
+
+FILTER_RE = re.compile(r"^Filter\s*\d*\s*:\s*(ON|OFF)\s+([A-Z]+)(.*)$", re.IGNORECASE)
+FC_RE = re.compile(r"\bFc\s+(-?[\d.]+)", re.IGNORECASE)
+GAIN_RE = re.compile(r"\bGain\s+(-?[\d.]+)", re.IGNORECASE)
+Q_RE = re.compile(r"\bQ\s+(-?[\d.]+)", re.IGNORECASE)
+PREAMP_RE = re.compile(r"^Preamp\s*:\s*(-?[\d.]+)", re.IGNORECASE)
+
+
+def band_frequencies(count):
+    """Return centre frequencies for a graphic EQ with `count` bands"""
+    if count == len(EqualizerManager.BANDS):
+        return list(EqualizerManager.BANDS)
+    if count == len(ISO_31_BANDS):
+        return list(ISO_31_BANDS)
+    if count == 1:
+        return [1000]
+    # Log-spaced across the audible range
+    step = math.log(20000 / 20) / (count - 1)
+    return [round(20 * math.exp(i * step), 1) for i in range(count)]
+
+
+class EqProfile:
+    """EQ profile: N graphic bands plus parametric filters, stored as flat arrays"""
+
+    __slots__ = ("freqs", "gains", "filter_types", "filter_enabled",
+                 "filter_freqs", "filter_gains", "filter_qs", "preamp")
+
+    def __init__(self, freqs=(), gains=(), preamp=None):
+        self.freqs = array('f', freqs)
+        self.gains = array('f', gains)
+        self.filter_types = []
+        self.filter_enabled = array('b')
+        self.filter_freqs = array('f')
+        self.filter_gains = array('f')
+        self.filter_qs = array('f')
+        self.preamp = preamp
+
+    def __len__(self):
+        return len(self.freqs)
+
+    @property
+    def filter_count(self):
+        return len(self.filter_types)
+
+    def add_filter(self, ftype, fc, gain=0.0, q=0.0, enabled=True):
+        """Append a parametric filter (PK, LSC, HSC, LP, HP, ...)"""
+        self.filter_types.append(ftype.upper())
+        self.filter_enabled.append(1 if enabled else 0)
+        self.filter_freqs.append(fc)
+        self.filter_gains.append(gain)
+        self.filter_qs.append(q)
+
+    @classmethod
+    def from_config_text(cls, text):
+        """Parse GraphicEQ, Filter and Preamp lines from Equalizer APO config text"""
+        profile = cls()
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith("GraphicEQ:"):
+                freqs, gains = array('f'), array('f')
+                for part in line[len("GraphicEQ:"):].split(';'):
+                    if part.strip():
+                        freq, gain = part.split()
+                        freqs.append(float(freq))
+                        gains.append(float(gain))
+                profile.freqs, profile.gains = freqs, gains
+                continue
+            match = FILTER_RE.match(line)
+            if match:
+                state, ftype, rest = match.groups()
+                fc = FC_RE.search(rest)
+                if not fc:
+                    continue
+                gain = GAIN_RE.search(rest)
+                q = Q_RE.search(rest)
+                profile.add_filter(ftype, float(fc.group(1)),
+                                   float(gain.group(1)) if gain else 0.0,
+                                   float(q.group(1)) if q else 0.0,
+                                   state.upper() == "ON")
+                continue
+            match = PREAMP_RE.match(line)
+            if match:
+                profile.preamp = float(match.group(1))
+        return profile
+
+    def graphic_line(self):
+        """Equalizer APO GraphicEQ line for the graphic bands"""
+        eq_parts = [f"{freq:g} {gain:g}" for freq, gain in zip(self.freqs, self.gains)]
+        return "GraphicEQ: " + "; ".join(eq_parts)
+
+    def filter_lines(self):
+        """Equalizer APO Filter lines for the parametric filters"""
+        lines = []
+        for i, ftype in enumerate(self.filter_types):
+            line = f"Filter: {'ON' if self.filter_enabled[i] else 'OFF'} {ftype} Fc {self.filter_freqs[i]:g} Hz"
+            if ftype not in NO_GAIN_FILTERS:
+                line += f" Gain {self.filter_gains[i]:g} dB"
+            if self.filter_qs[i] > 0:
+                line += f" Q {self.filter_qs[i]:g}"
+            lines.append(line)
+        return lines
+
+    def resampled(self, freqs):
+        """Graphic gains interpolated (on a log-frequency axis) onto `freqs`"""
+        if not len(self.freqs):
+            return [0.0] * len(freqs)
+        order = sorted(range(len(self.freqs)), key=self.freqs.__getitem__)
+        src_x = [math.log(self.freqs[i]) for i in order]
+        src_y = [self.gains[i] for i in order]
+        gains = []
+        for freq in freqs:
+            x = math.log(freq)
+            pos = bisect.bisect_left(src_x, x)
+            if pos <= 0:
+                gains.append(src_y[0])
+            elif pos >= len(src_x):
+                gains.append(src_y[-1])
+            else:
+                x0, x1 = src_x[pos - 1], src_x[pos]
+                t = (x - x0) / (x1 - x0) if x1 > x0 else 0.0
+                gains.append(src_y[pos - 1] + (src_y[pos] - src_y[pos - 1]) * t)
+        return gains
+
+
 class EqualizerManager:
     """Manages Equalizer APO configuration for system-wide audio EQ"""
     
@@ -28,98 +169,184 @@ class EqualizerManager:
         "Bass & Treble": [6, 4, 2, 0, -2, -2, 0, 2, 4, 6]
     }
     
-    def __init__(self):
-        self.apo_path = self.find_equalizer_apo()
+    def __init__(self, preset_source=None, config=None):
+        self.config = config
+        self.apo_path = None
         self.config_path = None
-        if self.apo_path:
-            self.config_path = self.apo_path / "config" / "config.txt"
-            
-    def find_equalizer_apo(self):
-        """Locate Equalizer APO installation"""
-        possible_paths = [
+        self.devices = []
+        self._discovery = None
+        
+        # Cached discovery is validated with one stat; full probing only
+        # runs on a cache miss, in the background when a config is available
+        cached = config.get("apo_discovery") if config else None
+        if cached and self.use_cached_discovery(cached):
+            logger.info(f"Using cached Equalizer APO location: {self.apo_path}")
+        elif config is not None:
+            self._discovery = threading.Thread(target=self.run_discovery, daemon=True)
+            self._discovery.start()
+        else:
+            self.apply_discovery(self.discover())
+        
+        # Built-in presets plus an optional directory / packed file of profiles
+        from preset_library import PresetLibrary
+        self.library = PresetLibrary(self.PRESETS, self.BANDS, preset_source)
+    
+    @staticmethod
+    def candidate_paths():
+        """Install locations probed by full discovery"""
+        return [
             Path(os.environ.get("ProgramFiles", "C:\\Program Files")) / "EqualizerAPO",
             Path(os.environ.get("ProgramFiles(x86)", "C:\\Program Files (x86)")) / "EqualizerAPO",
             Path("C:\\Program Files\\EqualizerAPO"),
         ]
-        
-        for path in possible_paths:
+    
+    @staticmethod
+    def read_devices(apo_path):
+        """Configured devices listed in device.txt (empty if none)"""
+        try:
+            with open(Path(apo_path) / "device.txt", 'r') as f:
+                return [line.strip() for line in f if line.strip()]
+        except OSError:
+            return []
+    
+    def discover(self):
+        """Full discovery: probe install paths and read device.txt; None if not installed"""
+        apo_path = self.find_equalizer_apo()
+        if not apo_path:
+            return None
+        return {
+            "install_path": str(apo_path),
+            "config_path": str(apo_path / "config" / "config.txt"),
+            "devices": self.read_devices(apo_path),
+        }
+    
+    def use_cached_discovery(self, cached):
+        """Adopt a cached discovery result if its config directory still exists"""
+        try:
+            config_path = Path(cached["config_path"])
+            if not config_path.parent.is_dir():
+                return False
+        except (KeyError, TypeError):
+            return False
+        self.apply_discovery(cached)
+        return True
+    
+    def apply_discovery(self, result):
+        if result:
+            self.apo_path = Path(result["install_path"])
+            self.config_path = Path(result["config_path"])
+            self.devices = list(result.get("devices", []))
+        else:
+            self.apo_path = None
+            self.config_path = None
+            self.devices = []
+    
+    def run_discovery(self):
+        """Background discovery on a cache miss; stores positive results in the widget config"""
+        result = self.discover()
+        self.apply_discovery(result)
+        if result and self.config is not None:
+            # Only positive results are cached: a later install must still be found
+            self.config.set("apo_discovery", result)
+            
+    def find_equalizer_apo(self):
+        """Locate Equalizer APO installation"""
+        for path in self.candidate_paths():
             if path.exists() and (path / "config").exists():
-                logging.info(f"Found Equalizer APO at: {path}")
+                logger.info(f"Found Equalizer APO at: {path}")
                 return path
         
-        logging.warning("Equalizer APO not found")
+        logger.warning("Equalizer APO not found")
         return None
     
+    def discovering(self):
+        """True while first-launch background discovery is still probing"""
+        return self._discovery is not None and self._discovery.is_alive()
+
     def is_available(self):
-        """Check if Equalizer APO is installed and accessible"""
+        """Check if Equalizer APO is installed and accessible; None while still discovering"""
+        if self.discovering():
+            return None  # Unknown yet; never block the Tk thread on the probe
         return self.apo_path is not None
     
     def get_current_settings(self):
-        """Read current EQ settings from config file"""
+        """Read current graphic EQ gains from config file (any band count)"""
+        return list(self.get_current_profile().gains)
+
+    def get_current_profile(self):
+        """Read current EQ profile (graphic bands and parametric filters) from config file"""
+        flat = EqProfile(self.BANDS, [0] * len(self.BANDS))
         if not self.is_available():
-            logging.warning("APO not available in get_current_settings")
-            return [0] * 10
+            logger.warning("APO not available in get_current_profile")
+            return flat
             
         try:
             # Create config file if it doesn't exist
             if not self.config_path.exists():
-                logging.info("Config file doesn't exist, creating with flat EQ")
+                logger.info("Config file doesn't exist, creating with flat EQ")
                 self.config_path.parent.mkdir(parents=True, exist_ok=True)
                 with open(self.config_path, 'w') as f:
                     f.write("# Generated by Taskbar Widget\n")
-                    f.write("GraphicEQ: 31 0; 62 0; 125 0; 250 0; 500 0; 1000 0; 2000 0; 4000 0; 8000 0; 16000 0\n")
-                return [0] * 10
+                    f.write(flat.graphic_line() + "\n")
+                return flat
             
             with open(self.config_path, 'r') as f:
-                content = f.read()
-                
-            # Parse GraphicEQ line
-            if "GraphicEQ:" in content:
-                eq_line = [line for line in content.split('\n') if line.startswith("GraphicEQ:")][0]
-                # Extract gains from format: GraphicEQ: 31 -6; 62 -4; ...
-                gains = []
-                parts = eq_line.replace("GraphicEQ:", "").strip().split(';')
-                for part in parts:
-                    if part.strip():
-                        freq, gain = part.strip().split()
-                        gains.append(float(gain))
-                
-                # Ensure we have exactly 10 bands
-                if len(gains) == 10:
-                    return gains
-                else:
-                    logging.warning(f"Expected 10 bands, got {len(gains)}")
-                    return [0] * 10
+                profile = EqProfile.from_config_text(f.read())
+            
+            if not len(profile) and not profile.filter_count:
+                return flat
+            if not len(profile):
+                # Parametric-only config: keep the filters, show flat default bands
+                profile.freqs = array('f', self.BANDS)
+                profile.gains = array('f', [0] * len(self.BANDS))
+            return profile
         except Exception as e:
-            logging.error(f"Error reading EQ settings: {e}")
+            logger.error(f"Error reading EQ settings: {e}")
             import traceback
-            logging.error(traceback.format_exc())
+            logger.error(traceback.format_exc())
         
-        return [0] * 10  # Default flat
+        return flat  # Default flat
     
     def apply_preset(self, preset_name):
-        """Apply a preset EQ configuration"""
-        if preset_name not in self.PRESETS:
-            logging.error(f"Unknown preset: {preset_name}")
-            return False
+        """Apply a preset EQ configuration (built-in or from the preset library)"""
+        if preset_name in self.PRESETS:
+            # A full profile: clears Filter/Preamp lines left by a parametric preset
+            return self.apply_profile(EqProfile(self.BANDS, self.PRESETS[preset_name]))
             
-        gains = self.PRESETS[preset_name]
-        return self.apply_settings(gains)
+        profile = self.library.load(preset_name)
+        if profile is None:
+            logger.error(f"Unknown preset: {preset_name}")
+            return False
+        return self.apply_profile(profile)
     
-    def apply_settings(self, gains):
-        """Apply custom EQ settings (list of 10 gains in dB)"""
+    def apply_settings(self, gains, freqs=None):
+        """Apply custom graphic EQ settings (gains in dB, any band count)"""
+        if freqs is None:
+            freqs = band_frequencies(len(gains)) if gains else []
+        return self.apply_profile(EqProfile(freqs, gains), graphic_only=True)
+    
+    def apply_profile(self, profile, graphic_only=False, reload=True):
+        """Write a profile to the APO config; replaces Filter/Preamp lines unless graphic_only
+
+        reload=False skips the explicit APO reload (a possibly synchronous Editor.exe
+        run) for intermediate crossfade writes; APO still picks up the file change.
+        """
         if not self.is_available():
-            logging.warning("Equalizer APO not available")
+            logger.warning("Equalizer APO not available")
             return False
             
-        if len(gains) != 10:
-            logging.error(f"Expected 10 bands, got {len(gains)}")
+        if len(profile.gains) != len(profile.freqs) or not (len(profile) or profile.filter_count):
+            logger.error(f"Invalid EQ profile: {len(profile.freqs)} bands, {len(profile.gains)} gains")
             return False
             
         try:
-            # Generate GraphicEQ line
-            eq_parts = [f"{freq} {gain}" for freq, gain in zip(self.BANDS, gains)]
-            eq_line = "GraphicEQ: " + "; ".join(eq_parts)
+            eq_lines = []
+            if len(profile):
+                eq_lines.append(profile.graphic_line() + "\n")
+            if not graphic_only:
+                if profile.preamp is not None:
+                    eq_lines.insert(0, f"Preamp: {profile.preamp:g} dB\n")
+                eq_lines.extend(line + "\n" for line in profile.filter_lines())
             
             # Read existing config
             if self.config_path.exists():
@@ -128,31 +355,39 @@ class EqualizerManager:
             else:
                 lines = []
             
-            # Replace or add GraphicEQ line
+            # Replace managed lines in place, keep everything else
             new_lines = []
-            found = False
+            inserted = False
             for line in lines:
-                if line.startswith("GraphicEQ:"):
-                    new_lines.append(eq_line + "\n")
-                    found = True
+                stripped = line.strip()
+                managed = stripped.startswith("GraphicEQ:")
+                if not graphic_only:
+                    managed = managed or FILTER_RE.match(stripped) or PREAMP_RE.match(stripped)
+                if managed:
+                    if not inserted:
+                        new_lines.extend(eq_lines)
+                        inserted = True
                 else:
                     new_lines.append(line)
             
-            if not found:
-                new_lines.append(eq_line + "\n")
+            if not inserted:
+                new_lines.extend(eq_lines)
             
             # Write back
-            with open(self.config_path, 'w') as f:
-                f.writelines(new_lines)
+            with tracer.span("apo.write", "eq"):
+                with open(self.config_path, 'w') as f:
+                    f.writelines(new_lines)
             
-            logging.info(f"Applied EQ settings: {gains}")
+            logger.debug(f"Applied EQ settings: {len(profile)} bands, {profile.filter_count} filters")
             
             # Reload Equalizer APO config (if configurator exists)
-            self.reload_config()
+            if reload:
+                with tracer.span("apo.reload", "eq"):
+                    self.reload_config()
             return True
             
         except Exception as e:
-            logging.error(f"Error applying EQ settings: {e}")
+            logger.error(f"Error applying EQ settings: {e}")
             return False
     
     def reload_config(self):
@@ -166,26 +401,26 @@ class EqualizerManager:
                              capture_output=True,
                              creationflags=subprocess.CREATE_NO_WINDOW,
                              timeout=2)
-                logging.info("Config reloaded via Editor.exe")
+                logger.debug("Config reloaded via Editor.exe")
                 return
         except Exception as e:
-            logging.debug(f"Editor.exe reload failed: {e}")
+            logger.debug(f"Editor.exe reload failed: {e}")
         
         try:
             # Method 2: Touch a marker file that APO watches
             marker_file = self.apo_path / "config" / "config.txt.reload"
             marker_file.touch()
-            logging.info("Created reload marker file")
+            logger.debug("Created reload marker file")
         except Exception as e:
-            logging.debug(f"Marker file creation failed: {e}")
+            logger.debug(f"Marker file creation failed: {e}")
         
         try:
             # Method 3: Modify file timestamp to trigger reload
             import time
             os.utime(self.config_path, None)
-            logging.info("Updated config file timestamp")
+            logger.debug("Updated config file timestamp")
         except Exception as e:
-            logging.debug(f"Timestamp update failed: {e}")
+            logger.debug(f"Timestamp update failed: {e}")
     
     def install_instructions(self):
         """Return installation instructions for Equalizer APO"""
@@ -0,0 +1,66 @@
+# Long-lived media info worker for the Taskbar Widget (winrt-less fallback)
+# Reads one JSON request per line on stdin, writes one JSON response per line:
+#   {"id": 1, "cmd": "get_media"} -> {"id": 1, "ok": true, "title": "...", "artist": "...", "thumbnail": "C:\...\x.jpg", "playing": true}
+#   {"id": 2, "cmd": "ping"}      -> {"id": 2, "ok": true, "pong": true}
+#   {"cmd": "exit"}               -> process exits
+
+Add-Type -AssemblyName System.Runtime.WindowsRuntime
+$null = [Windows.Foundation.Metadata.ApiInformation, Windows.Foundation.Metadata, ContentType = WindowsRuntime]
+$null = [Windows.Media.Control.GlobalSystemMediaTransportControlsSessionManager, Windows.Media.Control, ContentType = WindowsRuntime]
+
+$manager = [Windows.Media.Control.GlobalSystemMediaTransportControlsSessionManager]::RequestAsync().GetAwaiter().GetResult()
+$thumbPath = Join-Path ([System.IO.Path]::GetTempPath()) "taskbar_widget_thumb.jpg"
+$lastTrack = ""
+
+function Get-MediaInfo {
+    $session = $manager.GetCurrentSession()
+    if (-not $session) {
+        return @{ ok = $true; title = ""; artist = ""; thumbnail = ""; playing = $false }
+    }
+
+    $info = $session.TryGetMediaPropertiesAsync().GetAwaiter().GetResult()
+    $playback = $session.GetPlaybackInfo()
+    $playing = ($playback -and [int]$playback.PlaybackStatus -eq 4)
+
+    # Only rewrite the thumbnail file when the track changes
+    $track = "$($info.Title)|$($info.Artist)"
+    if ($info.Thumbnail -and $track -ne $script:lastTrack) {
+        try {
+            $stream = $info.Thumbnail.OpenReadAsync().GetAwaiter().GetResult()
+            $fileStream = [System.IO.File]::Create($thumbPath)
+            $stream.AsStreamForRead().CopyTo($fileStream)
+            $fileStream.Close()
+            $stream.Dispose()
+            $script:lastTrack = $track
+        }
+        catch {}
+    }
+    $thumb = ""
+    if ($info.Thumbnail -and $track -eq $script:lastTrack) { $thumb = $thumbPath }
+
+    return @{ ok = $true; title = $info.Title; artist = $info.Artist; thumbnail = $thumb; playing = $playing }
+}
+
+while ($true) {
+    $line = [Console]::In.ReadLine()
+    if ($null -eq $line) { break }
+    if (-not $line.Trim()) { continue }
+
+    $response = @{ ok = $false }
+    try {
+        $request = $line | ConvertFrom-Json
+        switch ($request.cmd) {
+            "ping"      { $response = @{ ok = $true; pong = $true } }
+            "get_media" { $response = Get-MediaInfo }
+            "exit"      { exit 0 }
+            default     { $response = @{ ok = $false; error = "unknown command" } }
+        }
+        $response.id = $request.id
+    }
+    catch {
+        $response = @{ ok = $false; error = "$_" }
+    }
+
+    [Console]::Out.WriteLine(($response | ConvertTo-Json -Compress))
+    [Console]::Out.Flush()
+}
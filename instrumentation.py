@@ -0,0 +1,139 @@
+"""
+Hot-path instrumentation for the Taskbar Widget
+Wraps callbacks (update_stats, Visualizer.animate, media polls, EQ writes) with
+a timer that records call counts and log2-bucketed latency histograms. When
+disabled, a wrapped call costs one attribute check.
+"""
+
+import json
+import time
+import functools
+
+import psutil
+
+
+class LatencyHistogram:
+    """Call count, total/max and power-of-two microsecond buckets for one callback"""
+
+    BUCKETS = 32  # bucket i holds latencies in [2^(i-1), 2^i) us; ~35 minutes at the top
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * self.BUCKETS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound (seconds) of the bucket containing the given fraction of calls"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        mean = self.total / self.count if self.count else 0.0
+        return {
+            "calls": self.count,
+            "mean_ms": round(mean * 1000, 3),
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "buckets_us": {f"<{1 << i}": n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Instrumentation:
+    """Registry of named latency histograms plus process CPU/RSS sampling"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counter_sources = {}  # name -> callable returning a dict of counters
+        self.started = time.time()
+        self.process = psutil.Process()
+
+    def histogram(self, name):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = LatencyHistogram()
+        return hist
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self.histogram(name).add(seconds)
+
+    def wrap(self, name, func):
+        """Timed wrapper around func; records only while enabled"""
+        hist = self.histogram(name)
+        perf = time.perf_counter
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            start = perf()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hist.add(perf() - start)
+        return timed
+
+    def instrument(self, obj, attr, name=None):
+        """Replace obj.attr (usually a bound method) with a timed wrapper"""
+        func = getattr(obj, attr)
+        setattr(obj, attr, self.wrap(name or f"{type(obj).__name__}.{attr}", func))
+
+    def add_counters(self, name, source):
+        """Include source()'s counters (kept by their owner, always on) in snapshots"""
+        self.counter_sources[name] = source
+
+    def reset(self):
+        # In place: wrappers hold references to their histogram
+        for hist in self.histograms.values():
+            hist.__init__()
+        self.started = time.time()
+
+    def process_stats(self):
+        """CPU% since the previous call and RSS of this process"""
+        if not self.process:
+            return {}
+        try:
+            return {
+                "cpu_percent": self.process.cpu_percent(interval=None),
+                "rss_mb": round(self.process.memory_info().rss / (1024 * 1024), 1),
+                "threads": self.process.num_threads(),
+            }
+        except Exception:
+            return {}
+
+    def snapshot(self):
+        return {
+            "enabled": self.enabled,
+            "since": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "process": self.process_stats(),
+            "callbacks": {name: hist.summary() for name, hist in sorted(self.histograms.items())},
+            "counters": {name: source() for name, source in self.counter_sources.items()},
+        }
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+# Shared by the widget, media thread and equalizer
+instruments = Instrumentation()
@@ -0,0 +1,177 @@
+"""
+Media session tracking for the Taskbar Widget
+Enumerates every Global System Media Transport Controls session instead of
+only the one Windows calls "current", fetches their properties concurrently
+(each under its own timeout) and caches per-app state so a session is only
+re-fetched when its cheap signature (playback status, timeline update time)
+changes or its cache entry expires.
+"""
+
+import time
+import asyncio
+import logging
+
+from thumbnail_transfer import buffer_view
+
+logger = logging.getLogger("widget.media")
+
+PLAYING = 4  # GlobalSystemMediaTransportControlsSessionPlaybackStatus.PLAYING
+
+
+class SessionState:
+    """Last fetched properties of one media session, keyed by source app"""
+
+    __slots__ = ("app_id", "title", "artist", "is_playing", "signature",
+                 "fetched_at", "thumbnail_ref", "thumbnail")
+
+    def __init__(self, app_id, title, artist, is_playing, signature, thumbnail_ref=None):
+        self.app_id = app_id
+        self.title = title
+        self.artist = artist
+        self.is_playing = is_playing
+        self.signature = signature
+        self.fetched_at = time.monotonic()
+        self.thumbnail_ref = thumbnail_ref
+        self.thumbnail = None  # image buffer, read lazily for the selected session only
+
+    def track(self):
+        return (self.title, self.artist)
+
+
+class WinrtSessionProvider:
+    """Session source backed by winrt GlobalSystemMediaTransportControlsSessionManager"""
+
+    def __init__(self):
+        from winrt.windows.media.control import GlobalSystemMediaTransportControlsSessionManager
+        self.manager_type = GlobalSystemMediaTransportControlsSessionManager
+        self.manager = None
+
+    async def sessions(self):
+        if self.manager is None:
+            self.manager = await self.manager_type.request_async()
+        return list(self.manager.get_sessions())
+
+    def current_app_id(self):
+        session = self.manager.get_current_session() if self.manager else None
+        return session.source_app_user_model_id if session else None
+
+    @staticmethod
+    def app_id(session):
+        return session.source_app_user_model_id
+
+    @staticmethod
+    def signature(session):
+        """Cheap synchronous change detector: no async property fetch"""
+        playback = session.get_playback_info()
+        timeline = session.get_timeline_properties()
+        return (playback.playback_status if playback else None,
+                timeline.last_updated_time if timeline else None)
+
+    async def fetch(self, session):
+        info = await session.try_get_media_properties_async()
+        playback = session.get_playback_info()
+        is_playing = bool(playback) and playback.playback_status == PLAYING
+        return info.title, info.artist, is_playing, info.thumbnail
+
+    async def read_thumbnail(self, ref):
+        """memoryview over the WinRT Buffer the stream was read into (no copies)"""
+        from winrt.windows.storage.streams import Buffer, InputStreamOptions
+        stream = await ref.open_read_async()
+        size = stream.size
+        if size <= 0:
+            return None
+        buffer = Buffer(size)
+        await stream.read_async(buffer, size, InputStreamOptions.NONE)
+        return buffer_view(buffer)
+
+
+class SessionTracker:
+    """Concurrent, cached polling of all sessions plus source selection"""
+
+    def __init__(self, provider, timeout=1.0, ttl=10.0):
+        self.provider = provider
+        self.timeout = timeout
+        self.ttl = ttl
+        self.states = {}  # app_id -> SessionState
+        self.fetches = 0
+        self.timeouts = 0
+
+    async def _fetch(self, app_id, session, signature):
+        title, artist, is_playing, thumb_ref = await asyncio.wait_for(
+            self.provider.fetch(session), self.timeout)
+        return SessionState(app_id, title, artist, is_playing, signature, thumb_ref)
+
+    async def poll(self, pinned=None, load_thumbnail=True):
+        """Refresh changed sessions concurrently; returns the selected SessionState or None"""
+        sessions = await self.provider.sessions()
+        now = time.monotonic()
+        seen = set()
+        stale = []
+        for session in sessions:
+            app_id = self.provider.app_id(session)
+            seen.add(app_id)
+            try:
+                signature = self.provider.signature(session)
+            except Exception:
+                signature = None
+            cached = self.states.get(app_id)
+            if (cached is None or signature is None or cached.signature != signature
+                    or now - cached.fetched_at > self.ttl):
+                stale.append((app_id, session, signature))
+
+        if stale:
+            self.fetches += len(stale)
+            results = await asyncio.gather(*(self._fetch(*item) for item in stale),
+                                           return_exceptions=True)
+            for (app_id, _, _), result in zip(stale, results):
+                if isinstance(result, SessionState):
+                    previous = self.states.get(app_id)
+                    if previous and previous.thumbnail is not None and previous.track() == result.track():
+                        # Same track (e.g. play/pause): reuse the art, skip the stream
+                        result.thumbnail = previous.thumbnail
+                        result.thumbnail_ref = None
+                    self.states[app_id] = result
+                elif isinstance(result, asyncio.TimeoutError):
+                    # Keep the previous state; one slow app must not blank the widget
+                    self.timeouts += 1
+                    logger.debug(f"Media session {app_id} timed out")
+                else:
+                    logger.debug(f"Media session {app_id} fetch failed: {result}")
+
+        for app_id in list(self.states):
+            if app_id not in seen:
+                del self.states[app_id]
+
+        selected = self.select(pinned)
+        if selected and load_thumbnail:
+            await self.load_thumbnail(selected)
+        return selected
+
+    async def load_thumbnail(self, state):
+        """Read the state's thumbnail stream, once per fetched state"""
+        if state.thumbnail is not None or state.thumbnail_ref is None:
+            return
+        try:
+            state.thumbnail = await asyncio.wait_for(
+                self.provider.read_thumbnail(state.thumbnail_ref), self.timeout)
+        except Exception as e:
+            logger.error(f"Thumbnail error: {e}")
+        state.thumbnail_ref = None
+
+    def select(self, pinned=None):
+        """Pinned app if present, else a playing session (preferring the current one), else current"""
+        if pinned and pinned in self.states:
+            return self.states[pinned]
+        current = self.provider.current_app_id()
+        playing = [s for s in self.states.values() if s.is_playing]
+        if playing:
+            for state in playing:
+                if state.app_id == current:
+                    return state
+            return playing[0]
+        if current in self.states:
+            return self.states[current]
+        return next(iter(self.states.values()), None)
+
+    def app_ids(self):
+        return sorted(self.states)
@@ -0,0 +1,210 @@
+"""
+Persistent script worker for the media info fallback
+Keeps one PowerShell process (get_media_worker.ps1) alive and talks to it with
+line-delimited JSON over stdin/stdout, instead of paying PowerShell startup on
+every poll. Hung or dead workers are killed and restarted with backoff.
+
+`python media_worker.py --standin` runs a Python stand-in speaking the same
+protocol, for testing and benchmarking on machines without PowerShell/WinRT.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+import subprocess
+
+logger = logging.getLogger("widget.media")
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def powershell_command():
+    """Command line for the PowerShell worker script"""
+    return ["powershell", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass",
+            "-File", os.path.join(SCRIPT_DIR, "get_media_worker.ps1")]
+
+
+class ScriptWorker:
+    """One long-lived worker process with a JSON-lines request/response protocol"""
+
+    def __init__(self, command, timeout=3.0, startup_timeout=10.0, max_backoff=60.0):
+        self.command = command
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.max_backoff = max_backoff
+
+        self.process = None
+        self.responses = queue.Queue()
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.retry_at = 0.0
+        self.needs_warmup = False
+
+        # Stats
+        self.requests = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.total_latency = 0.0
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Spawn the worker process and its stdout reader thread"""
+        flags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+        self.process = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, text=True, encoding="utf-8", bufsize=1,
+            creationflags=flags)
+        self.responses = queue.Queue()
+        self.needs_warmup = True
+        threading.Thread(target=self._read_loop, args=(self.process, self.responses),
+                         daemon=True, name="ScriptWorkerReader").start()
+
+    @staticmethod
+    def _read_loop(process, responses):
+        try:
+            for line in process.stdout:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    responses.put(json.loads(line))
+                except ValueError:
+                    logger.debug(f"Worker sent non-JSON line: {line[:80]}")
+        except (OSError, ValueError):
+            pass  # Pipe closed by _reap
+        responses.put(None)  # EOF
+
+    @staticmethod
+    def _reap(process):
+        """Kill a worker and release its pipes and process handle (no zombie on POSIX)"""
+        try:
+            process.kill()
+        except OSError:
+            pass
+        for pipe in (process.stdin, process.stdout):
+            try:
+                pipe.close()
+            except (OSError, ValueError):
+                pass  # Broken pipe flushing stdin, or already closed
+        try:
+            process.wait(timeout=2)
+        except (subprocess.TimeoutExpired, OSError):
+            pass
+
+    def stop(self):
+        if not self.process:
+            return
+        try:
+            if self.alive():
+                self.process.stdin.write(json.dumps({"cmd": "exit"}) + "\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=1)
+        except Exception:
+            pass
+        self._reap(self.process)
+        self.process = None
+
+    def restart(self, reason):
+        """Kill the worker; the next request respawns it (after backoff)"""
+        self.failures += 1
+        backoff = min(self.max_backoff, 2 ** (self.failures - 1))
+        self.retry_at = time.monotonic() + backoff
+        logger.warning(f"Media worker restart ({reason}); retry in {backoff:.0f}s",
+                       extra={"log_key": "media_worker.restart"})
+        if self.process:
+            self._reap(self.process)
+        self.process = None
+        self.restarts += 1
+
+    def request(self, cmd, **params):
+        """Send one request; returns the response dict or None on failure/timeout"""
+        with self.lock:
+            if not self.alive():
+                if time.monotonic() < self.retry_at:
+                    return None
+                try:
+                    self.start()
+                except OSError as e:
+                    self.restart(f"spawn failed: {e}")
+                    return None
+
+            # The first request after a spawn includes script startup
+            timeout = self.startup_timeout if self.needs_warmup else self.timeout
+            self.next_id += 1
+            req_id = self.next_id
+            start = time.perf_counter()
+            try:
+                self.process.stdin.write(json.dumps({"id": req_id, "cmd": cmd, **params}) + "\n")
+                self.process.stdin.flush()
+            except OSError as e:
+                self.restart(f"write failed: {e}")
+                return None
+
+            deadline = start + timeout
+            while True:
+                remaining = deadline - time.perf_counter()
+                try:
+                    response = self.responses.get(timeout=max(0.0, remaining))
+                except queue.Empty:
+                    self.timeouts += 1
+                    self.restart("timeout")
+                    return None
+                if response is None:
+                    self.restart("exited")
+                    return None
+                if response.get("id") == req_id:
+                    break
+                # Late answer to an earlier, timed-out request: drop it
+
+            self.requests += 1
+            self.total_latency += time.perf_counter() - start
+            self.failures = 0
+            self.needs_warmup = False
+            return response
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+            "mean_latency_ms": round(self.total_latency / self.requests * 1000, 3) if self.requests else 0,
+        }
+
+
+def serve_standin(once=False, delay=0.0):
+    """Python stand-in for get_media_worker.ps1 (same protocol, canned media info)"""
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        cmd = request.get("cmd")
+        if cmd == "exit":
+            break
+        if delay:
+            time.sleep(delay)
+        if cmd == "ping":
+            response = {"ok": True, "pong": True}
+        elif cmd == "get_media":
+            response = {"ok": True, "title": "Stand-in Song", "artist": "Stand-in Artist",
+                        "thumbnail": "", "playing": True}
+        else:
+            response = {"ok": False, "error": "unknown command"}
+        response["id"] = request.get("id")
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+        if once:
+            break
+
+
+if __name__ == "__main__":
+    if "--standin" in sys.argv:
+        serve_standin(once="--once" in sys.argv)
+    else:
+        print("Usage: python media_worker.py --standin [--once]")
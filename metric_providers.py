@@ -0,0 +1,259 @@
+"""
+Pluggable metric providers for the Taskbar Widget
+Each provider declares how often it wants to be sampled and what a sample is
+expected to cost. ProviderScheduler runs due providers from the stats tick
+under a per-tick time budget and demotes (samples less often) any provider
+that keeps overrunning its declared cost. Sections and context-menu toggles
+are generated from PROVIDERS, so a new metric is one class.
+"""
+
+import re
+import time
+import logging
+
+import psutil
+
+from rate_estimator import format_rate
+
+logger = logging.getLogger("widget.metrics")
+
+
+class MetricProvider:
+    """Base class: override sample() and format()"""
+
+    name = ""          # Section id; visibility is config "show_<name>"
+    label = ""         # Context menu label
+    interval = 1.0     # Seconds between samples
+    cost_ms = 1.0      # Expected cost of one sample on the Tk thread
+    colors = ("#ffffff", "#ffffff")
+    placeholder = ("", "")
+    width_text = "00000000000"  # Widest expected line, for fixed layouts
+    default_shown = False  # Shown until the user toggles it off (no "show_<name>" in config yet)
+
+    def available(self):
+        return True
+
+    def sample(self):
+        raise NotImplementedError
+
+    def format(self, value):
+        """Two display lines for a sample"""
+        raise NotImplementedError
+
+
+class DiskIOProvider(MetricProvider):
+    name = "diskio"
+    label = "Disk I/O"
+    interval = 1.0
+    cost_ms = 1.0
+    colors = ("#ffb74d", "#ba68c8")
+    placeholder = ("R 0.00 MB/s", "W 0.00 MB/s")
+    width_text = "W 000.00 MB/s"
+
+    # Linux partition names -> parent disk: sda1, xvdb2 (digits); nvme0n1p2, mmcblk0p1 ("p" + digits).
+    # Windows PhysicalDriveN names are always whole disks.
+    PARTITION_RE = re.compile(r"((?:[shv]d|xvd)[a-z]+)\d+|(nvme\d+n\d+|mmcblk\d+)p\d+")
+    SKIP_RE = re.compile(r"^(loop|ram|zram|dm-|md)")
+
+    def __init__(self):
+        self.last = None
+        self.disks = None
+
+    def available(self):
+        try:
+            return bool(psutil.disk_io_counters(perdisk=True))
+        except Exception:
+            return False
+
+    def whole_disks(self, names):
+        """Drop partitions (sda1, nvme0n1p2) and virtual devices to avoid double counting"""
+        names = set(names)
+        disks = set()
+        for name in names:
+            if self.SKIP_RE.match(name):
+                continue
+            partition = self.PARTITION_RE.fullmatch(name)
+            if partition and (partition.group(1) or partition.group(2)) in names:
+                continue
+            disks.add(name)
+        return disks
+
+    def sample(self):
+        counters = psutil.disk_io_counters(perdisk=True)
+        now = time.monotonic()
+        if self.disks is None or not self.disks <= counters.keys():
+            self.disks = self.whole_disks(counters)
+        read = sum(counters[d].read_bytes for d in self.disks)
+        write = sum(counters[d].write_bytes for d in self.disks)
+        last, self.last = self.last, (now, read, write)
+        if last is None or now <= last[0]:
+            return None
+        elapsed = now - last[0]
+        # Counters can go backwards when a disk disappears; show 0 rather than garbage
+        return max(0, read - last[1]) / elapsed, max(0, write - last[2]) / elapsed
+
+    def format(self, value):
+        if value is None:
+            return self.placeholder
+        return f"R {format_rate(value[0], 'MB')}", f"W {format_rate(value[1], 'MB')}"
+
+
+class SensorsProvider(MetricProvider):
+    name = "sensors"
+    label = "Temperatures"
+    interval = 5.0
+    cost_ms = 5.0  # Walks /sys/class/hwmon on Linux
+    colors = ("#ff8a65", "#90a4ae")
+    placeholder = ("TEMP --", "")
+    width_text = "FAN 00000 rpm"
+
+    def available(self):
+        try:
+            return bool(getattr(psutil, "sensors_temperatures", None) and psutil.sensors_temperatures())
+        except Exception:
+            return False
+
+    def sample(self):
+        hottest = None
+        for entries in psutil.sensors_temperatures().values():
+            for entry in entries:
+                if entry.current and (hottest is None or entry.current > hottest):
+                    hottest = entry.current
+        fan = None
+        if hasattr(psutil, "sensors_fans"):
+            for entries in psutil.sensors_fans().values():
+                for entry in entries:
+                    if entry.current:
+                        fan = max(fan or 0, entry.current)
+        return hottest, fan
+
+    def format(self, value):
+        if value is None:
+            return self.placeholder
+        hottest, fan = value
+        return (f"TEMP {hottest:.0f}°C" if hottest is not None else "TEMP --",
+                f"FAN {fan} rpm" if fan is not None else "")
+
+
+class BatteryProvider(MetricProvider):
+    name = "battery"
+    label = "Battery"
+    interval = 10.0
+    cost_ms = 2.0
+    colors = ("#aed581", "#aaaaaa")
+    placeholder = ("BAT --", "")
+    width_text = "00:00 left"
+
+    def available(self):
+        try:
+            return psutil.sensors_battery() is not None
+        except Exception:
+            return False
+
+    def sample(self):
+        return psutil.sensors_battery()
+
+    def format(self, value):
+        if value is None:
+            return self.placeholder
+        if value.power_plugged:
+            status = "charging" if value.percent < 100 else "plugged in"
+        elif value.secsleft not in (psutil.POWER_TIME_UNKNOWN, psutil.POWER_TIME_UNLIMITED):
+            status = f"{value.secsleft // 3600}:{value.secsleft % 3600 // 60:02d} left"
+        else:
+            status = ""
+        return f"BAT {value.percent:.0f}%", status
+
+
+PROVIDERS = (DiskIOProvider, SensorsProvider, BatteryProvider)
+
+
+class ScheduledProvider:
+    """Scheduling and watchdog state for one provider"""
+
+    __slots__ = ("provider", "interval", "next_due", "overruns", "good", "demotions", "value",
+                 "last_ms")
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.interval = provider.interval
+        self.next_due = 0.0
+        self.overruns = 0
+        self.good = 0
+        self.demotions = 0
+        self.value = None
+        self.last_ms = 0.0
+
+
+class ProviderScheduler:
+    """Runs due providers within a per-tick budget; demotes repeat overrunners"""
+
+    OVERRUN_FACTOR = 3.0  # A sample costing this many times its declared cost is an overrun
+    STRIKES = 3           # Consecutive overruns before the interval is doubled
+    RECOVER_AFTER = 20    # Consecutive good samples before it is halved again
+    MAX_INTERVAL = 120.0
+
+    def __init__(self, providers, budget_ms=15.0, record=None):
+        self.entries = {p.name: ScheduledProvider(p) for p in providers}
+        self.budget = budget_ms / 1000
+        self.record = record  # optional callback(name, seconds), e.g. instruments.record
+        self.deferred = 0
+
+    def tick(self, enabled, now=None):
+        """Sample due, enabled providers; returns {name: value} for those sampled"""
+        now = time.monotonic() if now is None else now
+        due = [e for name, e in self.entries.items() if name in enabled and e.next_due <= now]
+        due.sort(key=lambda e: e.next_due)
+        results = {}
+        start = time.perf_counter()
+        for entry in due:
+            if time.perf_counter() - start >= self.budget:
+                self.deferred += 1  # Out of budget: stays due, runs first next tick
+                continue
+            name = entry.provider.name
+            t0 = time.perf_counter()
+            try:
+                entry.value = entry.provider.sample()
+            except Exception as e:
+                logger.warning(f"Metric provider {name} failed: {e}", extra={"log_key": f"provider.{name}"})
+                entry.value = None
+            elapsed = time.perf_counter() - t0
+            entry.last_ms = elapsed * 1000
+            if self.record:
+                self.record(f"provider.{name}", elapsed)
+            self.watchdog(entry)
+            entry.next_due = now + entry.interval
+            results[name] = entry.value
+        return results
+
+    def watchdog(self, entry):
+        provider = entry.provider
+        if entry.last_ms > provider.cost_ms * self.OVERRUN_FACTOR:
+            entry.overruns += 1
+            entry.good = 0
+            if entry.overruns >= self.STRIKES and entry.interval < self.MAX_INTERVAL:
+                entry.interval = min(self.MAX_INTERVAL, entry.interval * 2)
+                entry.demotions += 1
+                entry.overruns = 0
+                logger.warning(f"Metric provider {provider.name} overran {provider.cost_ms:g} ms "
+                               f"(last {entry.last_ms:.1f} ms); sampling every {entry.interval:g}s")
+        else:
+            entry.overruns = 0
+            entry.good += 1
+            if entry.good >= self.RECOVER_AFTER and entry.interval > provider.interval:
+                entry.interval = max(provider.interval, entry.interval / 2)
+                entry.good = 0
+
+    def stats(self):
+        return {name: {"interval": e.interval, "last_ms": round(e.last_ms, 3), "demotions": e.demotions}
+                for name, e in self.entries.items()}
+
+
+def available_providers():
+    """Instances of the providers this machine supports"""
+    providers = []
+    for cls in PROVIDERS:
+        provider = cls()
+        if provider.available():
+            providers.append(provider)
+    return providers
@@ -0,0 +1,246 @@
+"""
+Local metrics export for the Taskbar Widget
+Opt-in ("exporter_enabled") HTTP/1.1 endpoint serving the widget's latest
+sample as Prometheus text (/metrics) and JSON (/metrics.json), on a localhost
+port or a Unix socket ("exporter_address": "127.0.0.1:9184" or
+"unix:/run/user/1000/taskbar.sock").
+
+The server runs on its own asyncio loop thread. The Tk thread only hands each
+new sample over; both full responses (status line, headers, body) are rendered
+once per sample on the exporter thread, so a scrape is a dict lookup and one
+socket write no matter how often it comes. Connections are kept alive.
+"""
+
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import threading
+
+logger = logging.getLogger("widget.exporter")
+
+DEFAULT_ADDRESS = "127.0.0.1:9184"
+MAX_HEADER_BYTES = 8192
+
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+JSON_TYPE = "application/json"
+
+GAUGES = (
+    ("cpu_percent", "taskbar_cpu_percent", "Total CPU utilisation in percent"),
+    ("mem_percent", "taskbar_memory_percent", "Physical memory in use in percent"),
+    ("up_bytes_per_second", "taskbar_network_transmit_bytes_per_second", "Upload rate shown in the bar"),
+    ("down_bytes_per_second", "taskbar_network_receive_bytes_per_second", "Download rate shown in the bar"),
+)
+COUNTERS = (
+    ("bytes_sent", "taskbar_network_transmit_bytes_total", "Bytes sent on all interfaces"),
+    ("bytes_recv", "taskbar_network_receive_bytes_total", "Bytes received on all interfaces"),
+)
+
+
+def response(status, content_type, body, head=False):
+    header = (f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+              f"Content-Length: {len(body)}\r\nCache-Control: no-cache\r\n\r\n").encode("ascii")
+    return header if head else header + body
+
+
+def label_value(text):
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(sample):
+    lines = []
+    for key, metric, help_text in GAUGES:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge", f"{metric} {sample[key]:g}"]
+    for key, metric, help_text in COUNTERS:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter", f"{metric} {sample[key]}"]
+    if sample["percpu"]:
+        lines += ["# HELP taskbar_cpu_core_percent Per-core CPU utilisation in percent",
+                  "# TYPE taskbar_cpu_core_percent gauge"]
+        lines += [f'taskbar_cpu_core_percent{{core="{i}"}} {pct:g}' for i, pct in enumerate(sample["percpu"])]
+    if sample["remote"]:
+        for metric, key in (("taskbar_remote_up", "online"), ("taskbar_remote_cpu_percent", "cpu_percent"),
+                            ("taskbar_remote_memory_percent", "mem_percent")):
+            lines.append(f"# TYPE {metric} gauge")
+            lines += [f'{metric}{{host="{label_value(host["name"])}"}} {float(host[key]):g}'
+                      for host in sample["remote"]]
+    lines += ["# HELP taskbar_sample_timestamp_seconds When the widget took this sample",
+              "# TYPE taskbar_sample_timestamp_seconds gauge",
+              f"taskbar_sample_timestamp_seconds {sample['timestamp']:.3f}"]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class MetricsExporter:
+    """Serves pre-rendered responses; publish() is the only call made from Tk"""
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self.address = address
+        self.loop = None
+        self.thread = None
+        self.server = None
+        self.responses = {}  # (method, path) -> bytes, replaced whole per sample
+        self.requests = 0
+        self.renders = 0
+        self.bound = None
+        self.ready = threading.Event()
+        self._set_responses(None)
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._thread_main, daemon=True, name="metrics-exporter")
+        self.thread.start()
+        self.ready.wait(5.0)
+        return self.bound is not None
+
+    def _thread_main(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._listen())
+        except Exception as e:
+            logger.error(f"Metrics exporter could not listen on {self.address}: {e}")
+            self.ready.set()
+            self.loop.close()
+            return
+        self.ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    async def _listen(self):
+        if self.address.startswith("unix:"):
+            path = self.address[len("unix:"):]
+            if not hasattr(socket, "AF_UNIX") or sys.platform == "win32":
+                raise OSError("Unix sockets are not supported by asyncio on this platform")
+            self.server = await asyncio.start_unix_server(self.handle, path)
+            self.bound = path
+        else:
+            host, _, port = self.address.rpartition(":")
+            self.server = await asyncio.start_server(self.handle, host or "127.0.0.1", int(port))
+            self.bound = self.server.sockets[0].getsockname()[:2]
+        logger.info(f"Metrics exporter listening on {self.address}")
+
+    def stop(self):
+        if self.loop is None or self.loop.is_closed():
+            return
+        def shutdown():
+            if self.server is not None:
+                self.server.close()
+            self.loop.stop()
+        try:
+            self.loop.call_soon_threadsafe(shutdown)
+        except RuntimeError:
+            pass  # Loop already closed
+
+    def publish(self, timestamp, cpu_percent, mem_percent, up, down, bytes_sent, bytes_recv,
+                percpu=(), remote=()):
+        """Called from the Tk thread once per sample; rendering happens on the exporter loop"""
+        if self.loop is None or self.loop.is_closed():
+            return
+        sample = {
+            "timestamp": timestamp,
+            "cpu_percent": cpu_percent,
+            "mem_percent": mem_percent,
+            "up_bytes_per_second": up,
+            "down_bytes_per_second": down,
+            "bytes_sent": bytes_sent,
+            "bytes_recv": bytes_recv,
+            "percpu": list(percpu),
+            "remote": [r._asdict() for r in remote],
+        }
+        try:
+            self.loop.call_soon_threadsafe(self._set_responses, sample)
+        except RuntimeError:
+            pass
+
+    def _set_responses(self, sample):
+        if sample is None:
+            text = b"# No sample yet\n"
+            data = b"{}"
+        else:
+            text = render_prometheus(sample)
+            data = json.dumps(sample, separators=(",", ":")).encode("utf-8")
+            self.renders += 1
+        index = b'<a href="/metrics">/metrics</a> <a href="/metrics.json">/metrics.json</a>\n'
+        responses = {}
+        for method in ("GET", "HEAD"):
+            head = method == "HEAD"
+            responses[method, "/metrics"] = response("200 OK", PROMETHEUS_TYPE, text, head)
+            responses[method, "/metrics.json"] = response("200 OK", JSON_TYPE, data, head)
+            responses[method, "/"] = response("200 OK", "text/html", index, head)
+        self.responses = responses
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.LimitOverrunError:
+                    writer.write(response("431 Request Header Fields Too Large", "text/plain", b""))
+                    break
+                if len(head) > MAX_HEADER_BYTES:
+                    writer.write(response("431 Request Header Fields Too Large", "text/plain", b""))
+                    break
+                request_line, _, headers = head.partition(b"\r\n")
+                parts = request_line.split(b" ")
+                if len(parts) != 3:
+                    writer.write(response("400 Bad Request", "text/plain", b""))
+                    break
+                method, target, version = (p.decode("latin-1") for p in parts)
+                lowered = headers.lower()
+                path = target.split("?", 1)[0]
+                if path == "/metrics" and b"accept: application/json" in lowered:
+                    path = "/metrics.json"
+                self.requests += 1
+                body = self.responses.get((method, path))
+                if body is None:
+                    status = "405 Method Not Allowed" if method not in ("GET", "HEAD") else "404 Not Found"
+                    body = response(status, "text/plain", b"")
+                writer.write(body)
+                if version == "HTTP/1.0" and b"connection: keep-alive" not in lowered:
+                    break
+                if b"connection: close" in lowered:
+                    break
+                await writer.drain()
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def main():
+    """Standalone exporter fed by psutil (for testing scrapers without the widget)"""
+    parser = argparse.ArgumentParser(description="Taskbar Widget metrics exporter")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help='"host:port" or "unix:/path"')
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from shared_metrics import MetricsSource
+    source = MetricsSource()
+    exporter = MetricsExporter(args.address)
+    if not exporter.start():
+        return 1
+    last = source.sample()
+    try:
+        while True:
+            time.sleep(args.interval)
+            snap = source.sample(percpu=True)
+            elapsed = max(1e-6, snap.timestamp - last.timestamp)
+            exporter.publish(snap.timestamp, snap.cpu_percent, snap.mem_percent,
+                             (snap.bytes_sent - last.bytes_sent) / elapsed,
+                             (snap.bytes_recv - last.bytes_recv) / elapsed,
+                             snap.bytes_sent, snap.bytes_recv, snap.percpu)
+            last = snap
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
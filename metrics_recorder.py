@@ -0,0 +1,232 @@
+"""
+Metrics recording and replay for the Taskbar Widget
+With "record_metrics" on, every sample the bar displays (CPU, memory, network
+rates, playback state) is appended to a fixed-record binary segment per day:
+record_dir/metrics-YYYYMMDD.tbr. Records are buffered and written in batches,
+so the Tk thread pays one struct pack per sample and one write per batch.
+
+Segment layout (little endian): a 16 byte header (magic, version, record
+size, day) followed by RECORD_SIZE byte records. A torn trailing record from
+a crash is ignored by the reader. Readers memory-map segments as numpy
+structured arrays, so range queries are a binary search and downsampling is a
+handful of vectorized reductions.
+
+`python taskbar_widget.py --replay <segment or directory>` drives the widget
+from a recording through ReplaySource instead of live psutil.
+"""
+
+import os
+import sys
+import time
+import glob
+import struct
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+from shared_metrics import Snapshot
+
+logger = logging.getLogger("widget.metrics")
+
+MAGIC = b"TBWR"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQ")       # magic, version, record size, day (YYYYMMDD)
+RECORD = struct.Struct("<dffffB3x")    # timestamp, cpu, mem, up B/s, down B/s, playing
+RECORD_SIZE = RECORD.size
+SEGMENT_PATTERN = "metrics-*.tbr"
+
+
+def record_dtype():
+    import numpy as np
+    return np.dtype([("timestamp", "<f8"), ("cpu", "<f4"), ("mem", "<f4"), ("up", "<f4"),
+                     ("down", "<f4"), ("playing", "u1"), ("pad", "V3")])
+
+
+def day_of(timestamp):
+    return int(datetime.fromtimestamp(timestamp).strftime("%Y%m%d"))
+
+
+def segment_path(directory, day):
+    return os.path.join(directory, f"metrics-{day}.tbr")
+
+
+class MetricsRecorder:
+    """Append-only writer: batches records and rotates to a new segment each day"""
+
+    def __init__(self, directory, batch=60, flush_seconds=60.0):
+        self.directory = directory
+        self.batch = batch
+        self.flush_seconds = flush_seconds
+        self.buffer = bytearray()
+        self.pending = 0
+        self.day = None
+        self.day_span = (0.0, 0.0)  # [start, end) of self.day, to skip date math per sample
+        self.last_flush = time.monotonic()
+        self.records = 0
+        self.writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, timestamp, cpu, mem, up, down, playing):
+        if not self.day_span[0] <= timestamp < self.day_span[1]:
+            self.flush()  # Finish the previous day's segment first
+            midnight = datetime.fromtimestamp(timestamp).replace(hour=0, minute=0, second=0, microsecond=0)
+            self.day = int(midnight.strftime("%Y%m%d"))
+            self.day_span = (midnight.timestamp(), (midnight + timedelta(days=1)).timestamp())
+        self.buffer += RECORD.pack(timestamp, cpu, mem, up, down, 1 if playing else 0)
+        self.pending += 1
+        self.records += 1
+        if self.pending >= self.batch or time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return
+        path = segment_path(self.directory, self.day)
+        try:
+            with open(path, "ab") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size < HEADER.size:
+                    f.truncate(0)
+                    f.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, self.day))
+                elif (size - HEADER.size) % RECORD_SIZE:
+                    # Torn record from a crash: drop it so ours stay aligned
+                    f.truncate(size - (size - HEADER.size) % RECORD_SIZE)
+                f.write(self.buffer)
+            self.writes += 1
+        except OSError as e:
+            logger.warning(f"Could not write metrics recording {path}: {e}",
+                           extra={"log_key": "metrics_recorder.write"})
+        self.buffer.clear()
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+
+
+def open_segment(path):
+    """Records of one segment as a read-only numpy memmap (empty array if none)"""
+    import numpy as np
+    dtype = record_dtype()
+    size = os.path.getsize(path)
+    if size < HEADER.size:
+        return np.empty(0, dtype=dtype)
+    with open(path, "rb") as f:
+        magic, version, record_size, _ = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION or record_size != dtype.itemsize:
+        raise ValueError(f"{path} is not a v{VERSION} metrics recording")
+    count = (size - HEADER.size) // record_size
+    if not count:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count,))
+
+
+def segments(source, start=None, end=None):
+    """Segment files for a file or directory, optionally limited to the days in [start, end]"""
+    if os.path.isfile(source):
+        return [source]
+    paths = sorted(glob.glob(os.path.join(source, SEGMENT_PATTERN)))
+    if start is None and end is None:
+        return paths
+    first = day_of(start) if start is not None else 0
+    last = day_of(end) if end is not None else 99999999
+    return [p for p in paths if first <= int(os.path.basename(p)[8:16]) <= last]
+
+
+def query(source, start=None, end=None):
+    """All records with start <= timestamp < end, as one structured array"""
+    import numpy as np
+    parts = []
+    for path in segments(source, start, end):
+        records = open_segment(path)
+        if not len(records):
+            continue
+        ts = records["timestamp"]
+        lo = 0 if start is None else np.searchsorted(ts, start, "left")
+        hi = len(records) if end is None else np.searchsorted(ts, end, "left")
+        if hi > lo:
+            parts.append(records[lo:hi])
+    if not parts:
+        return np.empty(0, dtype=record_dtype())
+    return np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+
+def downsample(records, step):
+    """Per-`step`-seconds buckets: start, mean cpu/mem/up/down, max cpu, fraction playing"""
+    import numpy as np
+    if not len(records):
+        return {}
+    ts = records["timestamp"]
+    buckets = np.floor(ts / step)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.diff(np.r_[starts, len(records)])
+    result = {"start": buckets[starts] * step, "count": counts,
+              "cpu_max": np.maximum.reduceat(records["cpu"], starts)}
+    for field in ("cpu", "mem", "up", "down", "playing"):
+        result[field] = np.add.reduceat(records[field].astype(np.float64), starts) / counts
+    return result
+
+
+class ReplaySource:
+    """MetricsSource stand-in that plays a recording back at `speed` x real time"""
+
+    def __init__(self, source, speed=1.0, start=None):
+        self.records = query(source, start)
+        if not len(self.records):
+            raise ValueError(f"No recorded samples in {source}")
+        self.speed = speed
+        self.index = 0
+        self.origin = time.monotonic()
+        self.first = float(self.records["timestamp"][0])
+        self.bytes_sent = 0.0
+        self.bytes_recv = 0.0
+        self.playing = False
+        self.finished = False
+        self.shared = False
+        logger.info(f"Replaying {len(self.records)} samples from "
+                    f"{datetime.fromtimestamp(self.first):%Y-%m-%d %H:%M:%S}")
+
+    def sample(self, percpu=False):
+        """Latest record at the replay clock, with counters rebuilt from the recorded rates"""
+        records = self.records
+        target = self.first + (time.monotonic() - self.origin) * self.speed
+        while self.index + 1 < len(records) and records["timestamp"][self.index + 1] <= target:
+            self.index += 1
+            elapsed = records["timestamp"][self.index] - records["timestamp"][self.index - 1]
+            self.bytes_sent += float(records["up"][self.index]) * elapsed
+            self.bytes_recv += float(records["down"][self.index]) * elapsed
+        if self.index + 1 == len(records) and not self.finished:
+            self.finished = True
+            logger.info("Replay finished")
+        record = records[self.index]
+        self.playing = bool(record["playing"])
+        return Snapshot(float(record["timestamp"]), round(float(record["cpu"]), 1),
+                        round(float(record["mem"]), 1), int(self.bytes_sent), int(self.bytes_recv), ())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a Taskbar Widget metrics recording")
+    parser.add_argument("source", help="segment file or recording directory")
+    parser.add_argument("--since", help="start time, YYYY-MM-DD[THH:MM]")
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--step", type=float, default=3600.0, help="bucket size in seconds")
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    end = None if start is None else (datetime.fromtimestamp(start) + timedelta(hours=args.hours)).timestamp()
+    buckets = downsample(query(args.source, start, end), args.step)
+    if not buckets:
+        print("No samples in range")
+        return 1
+    print(f"{'start':<17} {'samples':>7} {'cpu %':>6} {'max':>5} {'mem %':>6} {'up MB/s':>8} "
+          f"{'down MB/s':>9} {'playing':>7}")
+    mb = 1024 * 1024
+    for i in range(len(buckets["start"])):
+        print(f"{datetime.fromtimestamp(buckets['start'][i]):%Y-%m-%d %H:%M} {buckets['count'][i]:7d} "
+              f"{buckets['cpu'][i]:6.1f} {buckets['cpu_max'][i]:5.0f} {buckets['mem'][i]:6.1f} "
+              f"{buckets['up'][i] / mb:8.2f} {buckets['down'][i] / mb:9.2f} {buckets['playing'][i]:7.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
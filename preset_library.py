@@ -0,0 +1,224 @@
+"""
+Preset Library for the Equalizer Dialog
+Indexes thousands of headphone EQ profiles (AutoEQ-style GraphicEQ / ParametricEQ
+text files) from a directory or a single packed file, with prefix search over
+name tokens. Profiles are only parsed when selected.
+"""
+
+import os
+import re
+import json
+import bisect
+import struct
+import logging
+from array import array
+from collections import OrderedDict
+
+from equalizer_manager import EqProfile
+
+logger = logging.getLogger("equalizer.presets")
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens of a preset name or query"""
+    return TOKEN_RE.findall(text.lower())
+
+
+class PresetLibrary:
+    """Built-in presets plus lazily loaded profiles from a directory or packed index file"""
+
+    PACK_MAGIC = b"EQPRESETS1\n"
+    PROFILE_SUFFIXES = (".txt",)
+    CACHE_SIZE = 32
+
+    def __init__(self, builtin=None, builtin_bands=None, source=None):
+        self.builtin = dict(builtin or {})
+        self.builtin_bands = list(builtin_bands or [])
+        self.source = source or None
+
+        self.names = []       # preset id -> display name
+        self.locations = []   # preset id -> file path or (offset, length) in pack, None for built-ins
+        self.tokens = []      # sorted unique name tokens
+        self.postings = []    # token index -> array of preset ids
+        self.by_name = {}
+        self.pack_path = None
+        self.data_start = 0
+        self._indexed = False
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        self._ensure_index()
+        return len(self.names)
+
+    def _ensure_index(self):
+        if self._indexed:
+            return
+        self._indexed = True
+
+        for name in self.builtin:
+            self._add(name, None)
+
+        try:
+            if self.source and os.path.isdir(self.source):
+                self._scan_directory(self.source)
+                self._build_tokens()
+            elif self.source and os.path.isfile(self.source):
+                self._open_pack(self.source)
+            else:
+                self._build_tokens()
+                if self.source:
+                    logger.warning(f"Preset library not found: {self.source}")
+        except Exception as e:
+            logger.error(f"Preset library load error: {e}")
+            self._build_tokens()
+
+        logger.info(f"Preset library: {len(self.names)} presets, {len(self.tokens)} tokens")
+
+    def _add(self, name, location):
+        if name in self.by_name:
+            return
+        self.by_name[name] = len(self.names)
+        self.names.append(name)
+        self.locations.append(location)
+
+    def _scan_directory(self, root):
+        """Register profile files by name; contents are not read here"""
+        found = []
+        for dirpath, _dirs, files in os.walk(root):
+            for filename in files:
+                if filename.lower().endswith(self.PROFILE_SUFFIXES):
+                    found.append((os.path.splitext(filename)[0], os.path.join(dirpath, filename)))
+        found.sort(key=lambda item: item[0].lower())
+        for name, path in found:
+            if name in self.by_name:
+                name = f"{name} ({os.path.basename(os.path.dirname(path))})"
+            self._add(name, path)
+
+    def _build_tokens(self):
+        """Build the token -> preset ids index used for prefix search"""
+        index = {}
+        for pid, name in enumerate(self.names):
+            for token in set(tokenize(name)):
+                index.setdefault(token, []).append(pid)
+        self.tokens = sorted(index)
+        self.postings = [array('I', index[token]) for token in self.tokens]
+
+    def _open_pack(self, path):
+        """Read the header (names, offsets, prebuilt index) of a packed library"""
+        with open(path, 'rb') as f:
+            if f.read(len(self.PACK_MAGIC)) != self.PACK_MAGIC:
+                raise ValueError(f"Not a preset pack: {path}")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+            self.data_start = f.tell()
+        self.pack_path = path
+
+        # Pack-local ids are remapped after the built-ins; the prebuilt
+        # postings are reused, only the few built-in names are tokenized
+        pids = []
+        for name, offset, length in zip(header["names"], header["offsets"], header["lengths"]):
+            self._add(name, (offset, length))
+            pids.append(self.by_name[name])
+        index = {token: array('I', [pids[i] for i in ids])
+                 for token, ids in zip(header["tokens"], header["postings"])}
+        for pid, name in enumerate(self.names[:len(self.builtin)]):
+            for token in set(tokenize(name)):
+                index.setdefault(token, array('I')).append(pid)
+        self.tokens = sorted(index)
+        self.postings = [index[token] for token in self.tokens]
+
+    @classmethod
+    def pack(cls, directory, out_path):
+        """Pack every profile under `directory` into one file with a prebuilt index"""
+        library = cls(source=directory)
+        library._ensure_index()
+
+        offsets, lengths, blobs = [], [], []
+        position = 0
+        for path in library.locations:
+            with open(path, 'rb') as f:
+                blob = f.read()
+            offsets.append(position)
+            lengths.append(len(blob))
+            blobs.append(blob)
+            position += len(blob)
+
+        header = json.dumps({
+            "names": library.names,
+            "offsets": offsets,
+            "lengths": lengths,
+            "tokens": library.tokens,
+            "postings": [ids.tolist() for ids in library.postings],
+        }, separators=(",", ":")).encode("utf-8")
+
+        with open(out_path, 'wb') as f:
+            f.write(cls.PACK_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for blob in blobs:
+                f.write(blob)
+        return len(library.names)
+
+    def search(self, query, limit=200):
+        """Names matching every query token as a prefix, in library order"""
+        self._ensure_index()
+        terms = tokenize(query)
+        if not terms:
+            return self.names[:limit]
+
+        matches = None
+        # Most selective (longest) terms first keeps the candidate set small
+        for term in sorted(set(terms), key=len, reverse=True):
+            lo = bisect.bisect_left(self.tokens, term)
+            hi = bisect.bisect_left(self.tokens, term + "\uffff", lo)
+            ids = set()
+            for i in range(lo, hi):
+                ids.update(self.postings[i])
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return []
+        return [self.names[pid] for pid in sorted(matches)[:limit]]
+
+    def load(self, name):
+        """Parse and return the EqProfile for a preset name (cached), or None"""
+        self._ensure_index()
+        if name in self._cache:
+            self._cache.move_to_end(name)
+            return self._cache[name]
+
+        pid = self.by_name.get(name)
+        if pid is None:
+            return None
+
+        try:
+            location = self.locations[pid]
+            if location is None:
+                profile = EqProfile(self.builtin_bands, self.builtin[name])
+            elif isinstance(location, tuple):
+                offset, length = location
+                with open(self.pack_path, 'rb') as f:
+                    f.seek(self.data_start + offset)
+                    profile = EqProfile.from_config_text(f.read(length).decode("utf-8", "replace"))
+            else:
+                with open(location, 'r', encoding="utf-8", errors="replace") as f:
+                    profile = EqProfile.from_config_text(f.read())
+        except Exception as e:
+            logger.error(f"Error loading preset {name}: {e}")
+            return None
+
+        self._cache[name] = profile
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return profile
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Usage: python preset_library.py <profiles_dir> <output.pack>")
+        sys.exit(1)
+    count = PresetLibrary.pack(sys.argv[1], sys.argv[2])
+    print(f"Packed {count} presets into {sys.argv[2]}")
@@ -0,0 +1,140 @@
+"""
+Network rate estimation for the Taskbar Widget
+Turns per-interface byte counters into upload/download rates:
+
+  * a monotonic clock, so wall-clock jumps (NTP, DST, manual changes) never
+    produce negative or huge rates: time.monotonic() by default, or the
+    metrics daemon's snapshot stamp, which reads the same system-wide clock;
+    gaps over MAX_GAP (suspend, a stalled Tk loop) are skipped rather than
+    averaged
+  * per-interface deltas: an interface that appears contributes from its
+    second sample, one that disappears simply drops out, and a counter that
+    goes backwards (driver reset, adapter re-enabled) counts as no traffic
+    for that interval instead of a negative rate
+  * smoothing: "ewma" (time-aware, so irregular sample spacing is fine),
+    "window" (mean over the last N seconds, running totals) or "none"
+  * peak-hold: the highest smoothed rate of the last `peak_hold` seconds
+
+"net_sample_ms" below 1000 samples the counters between update_stats ticks
+(e.g. 250 for 4 Hz); format_rate picks B/s, KB/s, MB/s or GB/s.
+"""
+
+import math
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger("widget")
+
+SMOOTHING = ("ewma", "window", "none")
+MAX_GAP = 10.0        # Seconds between samples beyond which an interval is skipped
+UNITS = ("B/s", "KB/s", "MB/s", "GB/s")
+
+
+class RateEstimator:
+    """Smoothed (up, down) bytes per second from {interface: (bytes_sent, bytes_recv)} samples"""
+
+    def __init__(self, smoothing="ewma", smoothing_s=1.0, peak_hold=0.0):
+        if smoothing not in SMOOTHING:
+            raise ValueError(f"smoothing must be one of {', '.join(SMOOTHING)}")
+        self.smoothing = smoothing
+        self.smoothing_s = max(float(smoothing_s), 1e-3)
+        self.peak_hold = peak_hold
+        self.last = {}
+        self.last_time = None
+        self.raw = (0.0, 0.0)
+        self.rate = (0.0, 0.0)
+        self.peak = [0.0, 0.0]
+        self.peak_time = [0.0, 0.0]
+        self.window = deque()   # (time, dt, sent, recv) for "window" smoothing
+        self.window_totals = [0.0, 0.0, 0.0]  # dt, sent, recv
+        self.resets = 0         # Counters that went backwards
+        self.churn = 0          # Samples whose interface set changed
+        self.gaps = 0           # Intervals skipped as too long
+
+    def update(self, counters, now=None):
+        """Add one counter sample; returns the smoothed (up, down) bytes per second"""
+        if now is None:
+            now = time.monotonic()
+        last = self.last
+        sent = recv = 0
+        for nic, (nic_sent, nic_recv) in counters.items():
+            prev = last.get(nic)
+            if prev is None:
+                continue  # New interface: baseline only
+            d_sent = nic_sent - prev[0]
+            d_recv = nic_recv - prev[1]
+            if d_sent < 0 or d_recv < 0:
+                self.resets += 1
+                logger.debug(f"Network counters of {nic} went backwards; treating as a reset")
+                continue
+            sent += d_sent
+            recv += d_recv
+        if len(counters) != len(last) or counters.keys() != last.keys():
+            if last:
+                self.churn += 1
+        self.last = counters
+
+        previous, self.last_time = self.last_time, now
+        if previous is None:
+            return self.rate
+        dt = now - previous
+        if dt <= 0:
+            return self.rate
+        if dt > MAX_GAP:
+            self.gaps += 1
+            return self.rate
+        self.raw = (sent / dt, recv / dt)
+        self.rate = self._smooth(now, dt, sent, recv)
+        if self.peak_hold:
+            self._hold_peaks(now)
+        return self.rate
+
+    def _smooth(self, now, dt, sent, recv):
+        if self.smoothing == "ewma":
+            alpha = 1.0 - math.exp(-dt / self.smoothing_s)
+            up, down = self.rate
+            return up + alpha * (self.raw[0] - up), down + alpha * (self.raw[1] - down)
+        if self.smoothing == "window":
+            window, totals = self.window, self.window_totals
+            window.append((now, dt, sent, recv))
+            totals[0] += dt
+            totals[1] += sent
+            totals[2] += recv
+            while len(window) > 1 and window[0][0] <= now - self.smoothing_s:
+                _, old_dt, old_sent, old_recv = window.popleft()
+                totals[0] -= old_dt
+                totals[1] -= old_sent
+                totals[2] -= old_recv
+            return totals[1] / totals[0], totals[2] / totals[0]
+        return self.raw
+
+    def _hold_peaks(self, now):
+        for i in (0, 1):
+            if self.rate[i] >= self.peak[i] or now - self.peak_time[i] > self.peak_hold:
+                self.peak[i] = self.rate[i]
+                self.peak_time[i] = now
+
+    def display(self):
+        """Rates to show: the held peaks with peak-hold on, else the smoothed rates"""
+        if self.peak_hold:
+            return self.peak[0], self.peak[1]
+        return self.rate
+
+
+def format_rate(bytes_per_s, units="auto"):
+    """'512 B/s', '1.25 MB/s', '12.3 KB/s'; units="MB" keeps the fixed two-decimal MB/s"""
+    if units == "MB":
+        return f"{bytes_per_s / (1024 * 1024):.2f} MB/s"
+    value = max(bytes_per_s, 0.0)
+    unit = 0
+    while value >= 1000 and unit < len(UNITS) - 1:
+        value /= 1024
+        unit += 1
+    if unit == 0:
+        return f"{value:.0f} {UNITS[0]}"
+    if value < 10:
+        return f"{value:.2f} {UNITS[unit]}"
+    if value < 100:
+        return f"{value:.1f} {UNITS[unit]}"
+    return f"{value:.0f} {UNITS[unit]}"
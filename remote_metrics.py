@@ -0,0 +1,376 @@
+"""
+Remote host metrics for the Taskbar Widget
+`python remote_metrics.py --agent` serves this machine's metric snapshot over
+a small binary protocol; the widget polls every host listed in "remote_hosts"
+and shows each one as a bar section (a metric provider).
+
+Protocol (little endian, one TCP connection per host, kept open):
+  agent -> client on connect  HELLO     magic "TBRA", version
+  client -> agent             REQUEST   op (u8), request id (u32)
+  agent -> client             RESPONSE  request id (u32), status (u8), length (u16), payload
+The snapshot payload is the shared_metrics layout (PAYLOAD + per-core floats).
+Requests may be pipelined; responses carry the id of the request they answer.
+
+The client polls all hosts concurrently on one asyncio loop in a background
+thread. Each request has a timeout; a host that fails is retried with
+exponential backoff while its section shows it offline.
+"""
+
+import re
+import sys
+import time
+import struct
+import asyncio
+import logging
+import argparse
+import threading
+from collections import namedtuple
+
+from metric_providers import MetricProvider
+from shared_metrics import PAYLOAD, MAX_CORES, MetricsSource, Snapshot
+
+logger = logging.getLogger("widget.remote")
+
+DEFAULT_PORT = 7781
+MAGIC = b"TBRA"
+VERSION = 1
+
+HELLO = struct.Struct("<4sI")
+REQUEST = struct.Struct("<BI")
+RESPONSE = struct.Struct("<IBH")
+
+OP_PING = 1
+OP_SNAPSHOT = 2
+OP_SNAPSHOT_PERCPU = 3
+
+STATUS_OK = 0
+STATUS_BAD_OP = 1
+
+RemoteSample = namedtuple("RemoteSample", "name online cpu_percent mem_percent up down latency_ms")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_snapshot(snap):
+    cores = min(len(snap.percpu), MAX_CORES)
+    body = PAYLOAD.pack(snap.timestamp, snap.cpu_percent, snap.mem_percent,
+                        snap.bytes_sent, snap.bytes_recv, cores)
+    if cores:
+        body += struct.pack(f"<{cores}f", *snap.percpu[:cores])
+    return body
+
+
+def decode_snapshot(body):
+    if len(body) < PAYLOAD.size:
+        raise ProtocolError(f"Short snapshot ({len(body)} bytes)")
+    timestamp, cpu, mem, sent, recv, cores = PAYLOAD.unpack_from(body, 0)
+    if len(body) != PAYLOAD.size + cores * 4:
+        raise ProtocolError(f"Snapshot length {len(body)} does not match {cores} cores")
+    percpu = struct.unpack_from(f"<{cores}f", body, PAYLOAD.size) if cores else ()
+    return Snapshot(timestamp, cpu, mem, sent, recv, percpu)
+
+
+class MetricsAgent:
+    """Serves snapshots to any number of widgets; samples at most every min_interval"""
+
+    def __init__(self, source=None, min_interval=0.5):
+        self.source = source or MetricsSource()
+        self.min_interval = min_interval
+        self.cache = {}  # op -> (monotonic time, encoded payload)
+        self.requests = 0
+
+    def payload(self, op):
+        now = time.monotonic()
+        cached = self.cache.get(op)
+        if cached is None or now - cached[0] >= self.min_interval:
+            snap = self.source.sample(percpu=op == OP_SNAPSHOT_PERCPU)
+            cached = self.cache[op] = (now, encode_snapshot(snap))
+        return cached[1]
+
+    async def handle(self, reader, writer):
+        writer.write(HELLO.pack(MAGIC, VERSION))
+        try:
+            while True:
+                op, request_id = REQUEST.unpack(await reader.readexactly(REQUEST.size))
+                self.requests += 1
+                if op == OP_PING:
+                    status, body = STATUS_OK, b""
+                elif op in (OP_SNAPSHOT, OP_SNAPSHOT_PERCPU):
+                    status, body = STATUS_OK, self.payload(op)
+                else:
+                    status, body = STATUS_BAD_OP, b""
+                writer.write(RESPONSE.pack(request_id, status, len(body)) + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="0.0.0.0", port=DEFAULT_PORT):
+        return await asyncio.start_server(self.handle, host, port)
+
+
+class RemoteHost:
+    """Persistent, pipelined connection to one agent"""
+
+    def __init__(self, name, host, port=DEFAULT_PORT, timeout=1.0, max_backoff=30.0):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.reader = None
+        self.writer = None
+        self.read_task = None
+        self.pending = {}  # request id -> future
+        self.next_id = 0
+        self.failures = 0
+        self.retry_at = 0.0
+        self.last = None   # previous snapshot, for network rates
+        self.value = RemoteSample(name, False, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+        try:
+            magic, version = HELLO.unpack(await asyncio.wait_for(
+                self.reader.readexactly(HELLO.size), self.timeout))
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+            self.close()
+            raise ProtocolError(f"{self.host}:{self.port} sent no greeting") from e
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ProtocolError(f"{self.host}:{self.port} is not a metrics agent (v{VERSION})")
+        self.read_task = asyncio.ensure_future(self._read_loop(self.reader))
+
+    async def _read_loop(self, reader):
+        try:
+            while True:
+                request_id, status, length = RESPONSE.unpack(await reader.readexactly(RESPONSE.size))
+                body = await reader.readexactly(length) if length else b""
+                future = self.pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue  # Answer to a request that already timed out
+                if status == STATUS_OK:
+                    future.set_result(body)
+                else:
+                    future.set_exception(ProtocolError(f"Agent rejected request (status {status})"))
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            self._fail_pending(ConnectionError(f"Connection to {self.name} lost: {e}"))
+            if self.reader is reader:  # Reconnect on the next request
+                self.read_task = None
+                self.close()
+        except asyncio.CancelledError:
+            self._fail_pending(ConnectionError(f"Connection to {self.name} closed"))
+            raise
+
+    def _fail_pending(self, error):
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def request(self, op):
+        """Send one request (pipelined behind any in flight) and wait for its answer"""
+        if self.writer is None:
+            await self.connect()
+        self.next_id = (self.next_id + 1) & 0xFFFFFFFF
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write(REQUEST.pack(op, request_id))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def poll(self, now=None):
+        """Fetch one snapshot; returns the host's RemoteSample (offline while backing off)"""
+        now = time.monotonic() if now is None else now
+        if now < self.retry_at:
+            return self.value
+        start = time.perf_counter()
+        try:
+            snap = decode_snapshot(await self.request(OP_SNAPSHOT))
+        except (OSError, asyncio.TimeoutError, ProtocolError) as e:
+            self.failures += 1
+            backoff = min(self.max_backoff, 2 ** (self.failures - 1))
+            self.retry_at = now + backoff
+            if self.value.online or self.failures == 1:
+                logger.warning(f"Remote host {self.name} ({self.host}:{self.port}) unavailable: "
+                               f"{str(e) or e.__class__.__name__}; retrying in {backoff}s",
+                               extra={"log_key": f"remote.{self.name}"})
+            self.close()
+            self.last = None
+            self.value = self.value._replace(online=False)
+            return self.value
+        latency = (time.perf_counter() - start) * 1000
+        if self.failures:
+            logger.info(f"Remote host {self.name} back online")
+        self.failures = 0
+        up = down = 0.0
+        last, self.last = self.last, snap
+        if last is not None and snap.timestamp > last.timestamp:
+            elapsed = snap.timestamp - last.timestamp
+            up = max(0, snap.bytes_sent - last.bytes_sent) / elapsed
+            down = max(0, snap.bytes_recv - last.bytes_recv) / elapsed
+        elif last is not None:
+            up, down = self.value.up, self.value.down  # Agent served its cached snapshot again
+        self.value = RemoteSample(self.name, True, snap.cpu_percent, snap.mem_percent, up, down, latency)
+        return self.value
+
+    def close(self):
+        if self.read_task is not None:
+            self.read_task.cancel()
+            self.read_task = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.reader = None
+
+
+def section_name(name):
+    """Config/canvas-safe section id for a host name"""
+    return "remote_" + re.sub(r"[^a-z0-9_]", "_", name.lower())
+
+
+class RemoteHostProvider(MetricProvider):
+    """Bar section for one remote host; reads the poller's latest result"""
+
+    interval = 1.0
+    cost_ms = 0.1
+    default_shown = True
+    colors = ("#4dd0e1", "#aaaaaa")
+
+    def __init__(self, poller, host):
+        self.poller = poller
+        self.host = host
+        self.name = section_name(host.name)
+        self.label = f"Host {host.name}"
+        self.placeholder = (f"{host.name} --", "")
+        self.width_text = f"{host.name} C100% M100%"
+
+    def sample(self):
+        return self.poller.latest.get(self.host.name)
+
+    def format(self, value):
+        if value is None:
+            return self.placeholder
+        if not value.online:
+            return f"{value.name} --", "offline"
+        mb = 1024 * 1024
+        return (f"{value.name} C{value.cpu_percent:.0f}% M{value.mem_percent:.0f}%",
+                f"▲{value.up / mb:.1f} ▼{value.down / mb:.1f} MB/s")
+
+
+class RemotePoller:
+    """Polls every host once per interval on a background asyncio loop"""
+
+    def __init__(self, hosts, interval=1.0):
+        self.hosts = hosts
+        self.interval = interval
+        self.latest = {}  # host name -> RemoteSample, replaced whole from the loop thread
+        self.loop = None
+        self.thread = None
+        self.running = False
+
+    @classmethod
+    def from_config(cls, entries, timeout=1.0, interval=1.0):
+        """entries: [{"name": "build1", "host": "10.0.0.5", "port": 7781}, ...]"""
+        hosts = []
+        for entry in entries or ():
+            host = entry.get("host")
+            if not host:
+                logger.warning(f"Ignoring remote host without an address: {entry}")
+                continue
+            hosts.append(RemoteHost(entry.get("name") or host, host, int(entry.get("port", DEFAULT_PORT)),
+                                    timeout=timeout))
+        return cls(hosts, interval)
+
+    def providers(self):
+        return [RemoteHostProvider(self, host) for host in self.hosts]
+
+    async def poll_once(self):
+        results = await asyncio.gather(*(host.poll() for host in self.hosts))
+        self.latest = {sample.name: sample for sample in results}
+        return results
+
+    async def _run(self):
+        next_tick = time.monotonic()
+        while self.running:
+            await self.poll_once()
+            next_tick += self.interval
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+        for host in self.hosts:
+            host.close()
+
+    def start(self):
+        if not self.hosts or self.running:
+            return
+        self.running = True
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._thread_main, daemon=True, name="remote-metrics")
+        self.thread.start()
+
+    def _thread_main(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._run())
+        except Exception as e:
+            logger.error(f"Remote metrics loop stopped: {e}")
+        finally:
+            self.loop.close()
+
+    def stop(self):
+        self.running = False
+
+
+def run_agent(host="0.0.0.0", port=DEFAULT_PORT, min_interval=0.5, use_daemon=True):
+    agent = MetricsAgent(MetricsSource(use_daemon=use_daemon), min_interval)
+
+    async def main():
+        server = await agent.serve(host, port)
+        logger.info(f"Serving metrics on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remote metrics agent for the Taskbar Widget")
+    parser.add_argument("--agent", action="store_true", help="serve this machine's metrics")
+    parser.add_argument("--bind", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--min-interval", type=float, default=0.5, help="seconds between samples")
+    parser.add_argument("--query", metavar="HOST", help="print one snapshot from an agent")
+    args = parser.parse_args()
+
+    if args.agent:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        run_agent(args.bind, args.port, args.min_interval)
+        return 0
+    if args.query:
+        async def query():
+            host = RemoteHost(args.query, args.query, args.port, timeout=2.0)
+            try:
+                return decode_snapshot(await host.request(OP_SNAPSHOT_PERCPU))
+            finally:
+                host.close()
+        try:
+            print(asyncio.run(query()))
+        except (OSError, asyncio.TimeoutError, ProtocolError) as e:
+            print(f"No agent at {args.query}:{args.port}: {e}")
+            return 1
+        return 0
+    parser.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""
+Shared-memory metrics for many widget instances
+On multi-user machines every widget samples the same CPU/memory/network
+counters. `python shared_metrics.py --daemon` runs one sampler that publishes
+snapshots into a shared memory segment; widgets attach read-only and fall
+back to sampling locally while no (fresh) daemon is there.
+
+Layout (little endian): magic, version, seq, then the payload, which carries
+the sampler's time.monotonic() next to the wall-clock timestamp so readers
+can age and time snapshots without trusting the wall clock. The writer
+makes seq odd before writing the payload and even again after, so a reader
+that sees the same even seq before and after copying has a consistent
+snapshot (seqlock) without any lock shared between processes.
+
+Readers map the segment themselves (read-only) rather than through
+multiprocessing.shared_memory.SharedMemory, which would register it with the
+reader's resource_tracker and unlink it when that widget exits.
+
+Sharing across users: on Linux /dev/shm/<name> is made world-readable. On
+Windows the daemon creates the mapping itself (Win32Mapping) with a security
+descriptor that lets every signed-in user read it, as Global\\<name> when it
+may (a service or scheduled task running as SYSTEM, or an elevated admin) so
+all terminal server sessions see it, else in its own session only. Readers
+open Global\\<name> first, then the session-local name.
+"""
+
+import os
+import sys
+import mmap
+import time
+import struct
+import logging
+import argparse
+from collections import namedtuple
+
+import psutil
+
+logger = logging.getLogger("widget.metrics")
+
+DEFAULT_NAME = "taskbar_widget_metrics"
+MAGIC = b"TBWM"
+VERSION = 2
+MAX_CORES = 512
+
+HEADER = struct.Struct("<4sIQ")           # magic, version, seq
+PAYLOAD = struct.Struct("<dddQQI")        # timestamp, cpu, mem, sent, recv, cores
+MONOTONIC = struct.Struct("<d")           # Sampler's time.monotonic(), a system-wide clock
+PERCPU = struct.Struct(f"<{MAX_CORES}f")
+SEQ_OFFSET = 8
+PAYLOAD_OFFSET = HEADER.size
+MONOTONIC_OFFSET = PAYLOAD_OFFSET + PAYLOAD.size
+PERCPU_OFFSET = MONOTONIC_OFFSET + MONOTONIC.size
+SIZE = PERCPU_OFFSET + PERCPU.size
+
+GLOBAL_PREFIX = "Global\\"
+
+# monotonic: when sampled on this machine (None for replayed or remote snapshots)
+Snapshot = namedtuple("Snapshot", "timestamp cpu_percent mem_percent bytes_sent bytes_recv percpu monotonic",
+                      defaults=(None,))
+
+
+class LocalSampler:
+    """Samples this machine with psutil (what every widget did on its own)"""
+
+    def sample(self, percpu=False):
+        if percpu:
+            cores = psutil.cpu_percent(percpu=True)
+            cpu = round(sum(cores) / len(cores), 1)
+        else:
+            cores = ()
+            cpu = psutil.cpu_percent()
+        net = psutil.net_io_counters()
+        return Snapshot(time.time(), cpu, psutil.virtual_memory().percent,
+                        net.bytes_sent, net.bytes_recv, tuple(cores), time.monotonic())
+
+
+class Win32Mapping:
+    """Named Windows file mapping through ctypes, so the creator controls its security
+
+    SharedMemory and mmap's tagname use the default descriptor (creator, SYSTEM and
+    Administrators only), and open existing mappings asking for rights that a
+    read-only user is not granted.
+    """
+
+    # Full control for SYSTEM, Administrators and the owner; read for every signed-in user
+    SDDL = "D:(A;;GA;;;SY)(A;;GA;;;BA)(A;;GA;;;OW)(A;;GR;;;AU)"
+    PAGE_READWRITE = 0x04
+    FILE_MAP_WRITE = 0x0002
+    FILE_MAP_READ = 0x0004
+    ERROR_ALREADY_EXISTS = 183
+    INVALID_HANDLE_VALUE = -1
+
+    def __init__(self, name, size, create=False):
+        import ctypes
+        from ctypes import wintypes
+        self.ctypes = ctypes
+        kernel32 = self.kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.CreateFileMappingW.restype = wintypes.HANDLE
+        kernel32.CreateFileMappingW.argtypes = [wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD,
+                                                wintypes.DWORD, wintypes.DWORD, wintypes.LPCWSTR]
+        kernel32.OpenFileMappingW.restype = wintypes.HANDLE
+        kernel32.OpenFileMappingW.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.LPCWSTR]
+        kernel32.MapViewOfFile.restype = ctypes.c_void_p
+        kernel32.MapViewOfFile.argtypes = [wintypes.HANDLE, wintypes.DWORD, wintypes.DWORD,
+                                           wintypes.DWORD, ctypes.c_size_t]
+        kernel32.UnmapViewOfFile.argtypes = [ctypes.c_void_p]
+        kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        kernel32.LocalFree.argtypes = [ctypes.c_void_p]
+
+        names = [name] if "\\" in name else [GLOBAL_PREFIX + name, name]
+        handle = None
+        for self.name in names:
+            handle = self._create(size) if create else kernel32.OpenFileMappingW(
+                self.FILE_MAP_READ, False, self.name)
+            if handle:
+                break
+            error = ctypes.get_last_error()  # Global\ needs SeCreateGlobalPrivilege to create
+        if not handle:
+            raise ctypes.WinError(error)
+        address = kernel32.MapViewOfFile(handle, self.FILE_MAP_WRITE if create else self.FILE_MAP_READ,
+                                         0, 0, size)
+        if not address:
+            error = ctypes.get_last_error()
+            kernel32.CloseHandle(handle)
+            raise ctypes.WinError(error)
+        self.handle = handle
+        self.address = address
+        self.buf = (ctypes.c_char * size).from_address(address)
+
+    def _create(self, size):
+        ctypes = self.ctypes
+        from ctypes import wintypes
+
+        class SecurityAttributes(ctypes.Structure):
+            _fields_ = [("nLength", wintypes.DWORD), ("lpSecurityDescriptor", ctypes.c_void_p),
+                        ("bInheritHandle", wintypes.BOOL)]
+
+        descriptor = ctypes.c_void_p()
+        advapi32 = ctypes.WinDLL("advapi32", use_last_error=True)
+        if not advapi32.ConvertStringSecurityDescriptorToSecurityDescriptorW(
+                self.SDDL, 1, ctypes.byref(descriptor), None):
+            raise ctypes.WinError(ctypes.get_last_error())
+        try:
+            attributes = SecurityAttributes(ctypes.sizeof(SecurityAttributes), descriptor, False)
+            handle = self.kernel32.CreateFileMappingW(self.INVALID_HANDLE_VALUE, ctypes.byref(attributes),
+                                                      self.PAGE_READWRITE, 0, size, self.name)
+            error = ctypes.get_last_error()
+        finally:
+            self.kernel32.LocalFree(descriptor)
+        if handle and error == self.ERROR_ALREADY_EXISTS:
+            # Windows drops a mapping with its last handle, so this is a live daemon
+            self.kernel32.CloseHandle(handle)
+            raise FileExistsError(f"A metrics daemon already publishes '{self.name}'")
+        ctypes.set_last_error(error)
+        return handle
+
+    def close(self):
+        self.buf = None
+        if self.address:
+            self.kernel32.UnmapViewOfFile(self.address)
+            self.address = None
+        if self.handle:
+            self.kernel32.CloseHandle(self.handle)
+            self.handle = None
+
+    def unlink(self):
+        pass  # The mapping goes away with its last handle
+
+
+class MetricsPublisher:
+    """Owner of the segment: creates it and writes snapshots under the seqlock"""
+
+    def __init__(self, name=DEFAULT_NAME):
+        if sys.platform == "win32":
+            self.shm = Win32Mapping(name, SIZE, create=True)
+            if not self.shm.name.startswith(GLOBAL_PREFIX):
+                logger.warning(f"No rights to create {GLOBAL_PREFIX}{name}: only this session's widgets "
+                               f"can read the metrics (run the daemon as a service to share)")
+            self.buf = self.shm.buf
+            self.seq = 0
+            HEADER.pack_into(self.buf, 0, MAGIC, VERSION, self.seq)
+            return
+        from multiprocessing import shared_memory
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True, size=SIZE)
+        except FileExistsError:
+            # Left over from a daemon that died without unlinking: take it over
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name, create=True, size=SIZE)
+        try:
+            os.chmod(f"/dev/shm/{name}", 0o644)  # Other users' widgets read it
+        except OSError:
+            pass
+        self.buf = self.shm.buf
+        self.seq = 0
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, self.seq)
+
+    def publish(self, snap):
+        self.seq += 1                      # odd: write in progress
+        struct.pack_into("<Q", self.buf, SEQ_OFFSET, self.seq)
+        cores = min(len(snap.percpu), MAX_CORES)
+        PAYLOAD.pack_into(self.buf, PAYLOAD_OFFSET, snap.timestamp, snap.cpu_percent,
+                          snap.mem_percent, snap.bytes_sent, snap.bytes_recv, cores)
+        MONOTONIC.pack_into(self.buf, MONOTONIC_OFFSET,
+                            time.monotonic() if snap.monotonic is None else snap.monotonic)
+        if cores:
+            struct.pack_into(f"<{cores}f", self.buf, PERCPU_OFFSET, *snap.percpu[:cores])
+        self.seq += 1                      # even: consistent
+        struct.pack_into("<Q", self.buf, SEQ_OFFSET, self.seq)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class MetricsReader:
+    """Read-only view of a publisher's segment"""
+
+    RETRIES = 100
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.name = name
+        self.map = None
+        self.mapping = None  # Owner of self.map (mmap or Win32Mapping)
+
+    def attach(self):
+        """Map the segment if a daemon has created it; returns True when attached"""
+        if self.map is not None:
+            return True
+        try:
+            if sys.platform == "win32":
+                # Read-only open of Global\<name>, then this session's <name>
+                mapping = Win32Mapping(self.name, SIZE)
+                view = mapping.buf
+            else:
+                fd = os.open(f"/dev/shm/{self.name}", os.O_RDONLY)
+                try:
+                    view = mapping = mmap.mmap(fd, SIZE, prot=mmap.PROT_READ)
+                finally:
+                    os.close(fd)
+        except (OSError, ValueError):
+            return False
+        magic, version, _ = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            mapping.close()
+            return False
+        self.map = view
+        self.mapping = mapping
+        return True
+
+    def read(self):
+        """Consistent snapshot, or None if the writer kept it busy"""
+        view = self.map
+        for _ in range(self.RETRIES):
+            seq = struct.unpack_from("<Q", view, SEQ_OFFSET)[0]
+            if seq & 1 or seq == 0:
+                time.sleep(0)
+                continue
+            timestamp, cpu, mem, sent, recv, cores = PAYLOAD.unpack_from(view, PAYLOAD_OFFSET)
+            monotonic = MONOTONIC.unpack_from(view, MONOTONIC_OFFSET)[0]
+            percpu = struct.unpack_from(f"<{cores}f", view, PERCPU_OFFSET) if cores else ()
+            if struct.unpack_from("<Q", view, SEQ_OFFSET)[0] == seq:
+                return Snapshot(timestamp, cpu, mem, sent, recv, percpu, monotonic)
+        return None
+
+    def detach(self):
+        if self.map is not None:
+            self.map = None
+            self.mapping.close()
+            self.mapping = None
+
+
+class MetricsSource:
+    """What the widget samples from: the daemon when fresh, else psutil locally"""
+
+    RETRY_ATTACH = 10.0  # Seconds between attach attempts while sampling locally
+
+    def __init__(self, name=DEFAULT_NAME, use_daemon=True, max_age=3.0):
+        self.reader = MetricsReader(name) if use_daemon else None
+        self.local = LocalSampler()
+        self.max_age = max_age
+        self.next_attach = 0.0
+        self.shared = False
+
+    def sample(self, percpu=False):
+        snap = self._shared()
+        shared = snap is not None
+        if shared != self.shared:
+            self.shared = shared
+            logger.info("Using shared metrics daemon" if shared else "Sampling metrics locally")
+        if shared:
+            return snap
+        return self.local.sample(percpu)
+
+    def net_counters(self):
+        """{interface: (bytes_sent, bytes_recv)}, read locally; only needed for sub-second sampling
+        or while no daemon is fresh, as the daemon only publishes 1 Hz totals"""
+        return {nic: (c.bytes_sent, c.bytes_recv) for nic, c in psutil.net_io_counters(pernic=True).items()}
+
+    def _shared(self):
+        reader = self.reader
+        if reader is None:
+            return None
+        now = time.monotonic()
+        if reader.map is None:
+            if now < self.next_attach:
+                return None
+            self.next_attach = now + self.RETRY_ATTACH
+            if not reader.attach():
+                return None
+        snap = reader.read()
+        # Monotonic age, so a wall-clock step neither hides a hung daemon nor drops a live one
+        if snap is None or time.monotonic() - snap.monotonic > self.max_age:
+            # Daemon gone or hung: drop the mapping, a restarted daemon makes a new one
+            reader.detach()
+            self.next_attach = now + self.RETRY_ATTACH
+            return None
+        return snap
+
+
+def run_daemon(name=DEFAULT_NAME, interval=1.0, duration=None):
+    publisher = MetricsPublisher(name)
+    sampler = LocalSampler()
+    logger.info(f"Publishing metrics to shared memory '{name}' every {interval}s")
+    end = None if duration is None else time.monotonic() + duration
+    next_tick = time.monotonic()
+    try:
+        while end is None or time.monotonic() < end:
+            publisher.publish(sampler.sample(percpu=True))
+            next_tick += interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared-memory metrics daemon for the Taskbar Widget")
+    parser.add_argument("--daemon", action="store_true", help="run the sampler/publisher")
+    parser.add_argument("--name", default=DEFAULT_NAME, help="shared memory segment name")
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--read", action="store_true", help="print the current snapshot")
+    args = parser.parse_args()
+
+    if args.daemon:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        run_daemon(args.name, args.interval)
+        return 0
+    if args.read:
+        reader = MetricsReader(args.name)
+        if not reader.attach():
+            print("No metrics daemon running")
+            return 1
+        print(reader.read())
+        return 0
+    parser.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Single-instance enforcement for the Taskbar Widget
+The first widget holds an OS lock on a per-user lock file (released by the OS
+if the process dies, so there are no stale locks) and listens for control
+commands on a localhost socket; the lock file tells later launches the port
+and a random token. A second launch (Startup folder plus a manual start, or
+setup run twice) forwards its command-line actions to the running widget and
+exits instead of starting another media poller, sampler and topmost loop.
+
+The check runs before taskbar_widget imports Tk, PIL and the media stack, so
+handing off costs an interpreter start plus one local round trip.
+"""
+
+import os
+import sys
+import json
+import time
+import hmac
+import socket
+import logging
+import argparse
+import tempfile
+import threading
+
+logger = logging.getLogger("widget")
+
+LOCK_NAME = "taskbar_widget"
+LOCK_OFFSET = 4096     # Locked byte; the instance info before it stays readable on Windows
+INFO_BYTES = 512       # Info is padded to a fixed size: no truncation under a Windows lock
+MAX_MESSAGE = 4096
+CONNECT_WAIT = 10.0    # A starting instance may take this long to open its control socket
+
+
+def lock_directory():
+    """Per-user directory for the lock file (TASKBAR_INSTANCE_DIR overrides it)"""
+    return os.environ.get("TASKBAR_INSTANCE_DIR") or tempfile.gettempdir()
+
+
+def lock_path(directory=None):
+    try:
+        user = os.getlogin()
+    except OSError:
+        user = os.environ.get("USERNAME") or os.environ.get("USER") or "user"
+    return os.path.join(directory or lock_directory(), f"{LOCK_NAME}_{user}.lock")
+
+
+class InstanceLock:
+    """OS file lock marking the running instance, plus its control port and token"""
+
+    def __init__(self, path=None):
+        self.path = path or lock_path()
+        self.fd = None
+
+    def acquire(self):
+        """True if this process is now the instance; False if another one holds the lock"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+                os.lseek(fd, LOCK_OFFSET, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
+
+    def publish(self, port, token):
+        """Tell later launches where to send their actions"""
+        data = json.dumps({"pid": os.getpid(), "port": port, "token": token}).encode("ascii")
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        os.write(self.fd, data.ljust(INFO_BYTES))
+
+    def info(self):
+        """Instance info written by the holder, or None if it has not published yet"""
+        try:
+            with open(self.path, "rb") as f:
+                return json.loads(f.read(INFO_BYTES).decode("ascii"))
+        except (OSError, ValueError):
+            return None
+
+    def release(self):
+        if self.fd is None:
+            return
+        try:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            os.write(self.fd, b" " * INFO_BYTES)
+            if sys.platform == "win32":
+                import msvcrt
+                os.lseek(self.fd, LOCK_OFFSET, os.SEEK_SET)
+                msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+        os.close(self.fd)
+        self.fd = None
+
+
+class ControlServer:
+    """Accepts action lists from later launches; handler(actions) runs on the server thread"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.token = os.urandom(16).hex()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(4)
+        self.port = self.sock.getsockname()[1]
+        self.thread = threading.Thread(target=self._serve, daemon=True, name="instance-control")
+        self.thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return  # Closed by stop()
+            with conn:
+                try:
+                    conn.settimeout(2.0)
+                    message = json.loads(_read_line(conn))
+                    if not hmac.compare_digest(str(message.get("token", "")), self.token):
+                        conn.sendall(b'{"ok": false, "error": "bad token"}\n')
+                        continue
+                    actions = [list(action) for action in message.get("actions", [])]
+                    conn.sendall(b'{"ok": true}\n')
+                except (OSError, ValueError, TypeError, AttributeError) as e:
+                    logger.warning(f"Ignoring bad control message: {e}")
+                    continue
+            logger.info(f"Actions from another launch: {actions}")
+            try:
+                self.handler(actions)
+            except Exception as e:
+                logger.error(f"Control action failed: {e}")
+
+    def stop(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def _read_line(conn):
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(MAX_MESSAGE)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > MAX_MESSAGE:
+            raise ValueError("control message too long")
+    return data.decode("utf-8")
+
+
+def forward(lock, actions, wait=CONNECT_WAIT):
+    """Send actions to the instance holding `lock`; True once it acknowledged them"""
+    deadline = time.monotonic() + wait
+    while True:
+        info = lock.info()
+        if info:
+            try:
+                with socket.create_connection(("127.0.0.1", info["port"]), timeout=2.0) as conn:
+                    conn.sendall(json.dumps({"token": info["token"], "actions": actions}).encode("utf-8") + b"\n")
+                    return bool(json.loads(_read_line(conn)).get("ok"))
+            except (OSError, ValueError, KeyError):
+                pass
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)  # Instance still starting up
+
+
+def add_arguments(parser):
+    """Command-line actions that are forwarded to a running widget"""
+    parser.add_argument("--show", action="store_true", help="bring the running widget to the front")
+    parser.add_argument("--reset-position", action="store_true", help="move the widget back to its default corner")
+    parser.add_argument("--eq-preset", metavar="NAME", help="apply an equalizer preset")
+    parser.add_argument("--exit", action="store_true", help="close the running widget")
+
+
+def actions_from(args):
+    actions = []
+    if args.show:
+        actions.append(["show"])
+    if args.reset_position:
+        actions.append(["reset_position"])
+    if args.eq_preset:
+        actions.append(["eq_preset", args.eq_preset])
+    if args.exit:
+        actions.append(["exit"])
+    return actions
+
+
+def early_handoff(argv):
+    """Become the instance (returns the held lock) or forward argv's actions and exit"""
+    parser = argparse.ArgumentParser(add_help=False)
+    add_arguments(parser)
+    parser.add_argument("--replay")
+    args, _ = parser.parse_known_args(argv)
+    if args.replay or "-h" in argv or "--help" in argv:
+        return None  # Replays run next to the live widget
+    lock = InstanceLock()
+    try:
+        if lock.acquire():
+            if args.exit:
+                lock.release()
+                print("No Taskbar Widget is running", file=sys.stderr)
+                sys.exit(0)
+            return lock
+    except OSError as e:
+        logger.warning(f"Single-instance lock unavailable ({e}); starting anyway")
+        return None
+    actions = actions_from(args) or [["show"]]
+    if forward(lock, actions):
+        sys.exit(0)
+    print("Another Taskbar Widget is running but did not answer", file=sys.stderr)
+    sys.exit(1)
@@ -0,0 +1,142 @@
+"""
+Widget soak test
+Runs the real SystemMonitorWidget (built like bench_suite.py, against
+synthetic metrics and a scripted media manager) through days of simulated
+use as fast as it will go: per simulated second one update_stats and one
+visualizer frame, a media callback every 2 s with a track change every few
+minutes, play/pause flips, and the context menu opened and closed every ten
+minutes. Every simulated hour it records the process RSS, Python object
+count and, with real Tk, the Tcl image, global variable and command counts.
+
+After the warm-up hours every count must stay flat: Tcl counts may not grow
+at all, RSS and Python objects only within --rss-mb / --objects. Exits 1 on
+growth beyond that.
+
+Usage: python soak_test.py [--days 1] [--renderer auto] [--warmup-hours 2]
+                           [--rss-mb 4] [--objects 500] [--low-footprint]
+"""
+
+import gc
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import types
+
+import psutil
+
+import bench_suite
+from bench_suite import tw
+
+HOUR = 3600
+MEDIA_EVERY = 2        # Seconds between media callbacks, as MediaManager polls
+TRACK_EVERY = 180      # A new track (new album art) every 3 minutes
+MENU_EVERY = 600       # Context menu opened and closed every 10 minutes
+
+
+def tracks():
+    from PIL import Image
+    arts = [Image.new("RGB", tw.ART_SIZE, (i * 37 % 256, i * 91 % 256, i * 53 % 256)) for i in range(8)]
+    return [(f"Song {i}", f"Artist {i % 3}", art) for i, art in enumerate(arts)] + [("", "", None)]
+
+
+def counts(widget, real_tk):
+    """Footprint figures compared between checkpoints"""
+    gc.collect()
+    result = {"rss_mb": psutil.Process().memory_info().rss / 2 ** 20,
+              "py_objects": len(gc.get_objects()) + gc.get_freeze_count()}
+    if real_tk:
+        call = widget.root.tk.call
+        result.update(tcl_images=len(call("image", "names")), tcl_globals=len(call("info", "globals")),
+                      tcl_commands=len(call("info", "commands")))
+    return result
+
+
+def simulate_hour(widget, hour, playlist, real_tk):
+    event = types.SimpleNamespace(x_root=10, y_root=10)
+    for second in range(hour * HOUR, (hour + 1) * HOUR):
+        widget.update_stats()
+        widget.visualizer.animate(widget.is_playing)
+        if second % MEDIA_EVERY == 0:
+            track = second // TRACK_EVERY % len(playlist)
+            title, artist, art = playlist[track]
+            first_poll = second % TRACK_EVERY < MEDIA_EVERY
+            widget.update_media_ui(title, artist, art if first_poll or art is None else tw.THUMB_UNCHANGED)
+            widget.update_playback_state(bool(title) and (second // 900) % 4 != 3)
+        if second % MENU_EVERY == 0:
+            widget.show_context_menu(event)
+            widget.context_menu.unpost()
+        if real_tk and second % 60 == 0:
+            widget.root.update()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=float, default=1.0, help="simulated days")
+    parser.add_argument("--renderer", choices=("auto", "xvfb", "null"), default="auto")
+    parser.add_argument("--mode", choices=("widgets", "canvas"), default="widgets")
+    parser.add_argument("--warmup-hours", type=int, default=2, help="hours before the baseline checkpoint")
+    parser.add_argument("--rss-mb", type=float, default=4.0, help="allowed RSS growth after warm-up")
+    parser.add_argument("--objects", type=int, default=500, help="allowed Python object growth after warm-up")
+    parser.add_argument("--low-footprint", action="store_true", help="run with low_footprint.apply()")
+    args = parser.parse_args()
+
+    renderer = args.renderer
+    if renderer == "auto":
+        renderer = "xvfb" if os.environ.get("DISPLAY") or shutil.which("Xvfb") or sys.platform == "win32" else "null"
+    if renderer == "null" and args.mode == "canvas":
+        raise SystemExit("The canvas bar needs real Tk (--renderer xvfb)")
+    hours = int(args.days * 24)
+    if hours <= args.warmup_hours:
+        raise SystemExit("--days must cover more than the warm-up")
+
+    xvfb = None
+    if renderer == "xvfb":
+        from bench_canvas_bar import ensure_display
+        xvfb = ensure_display()
+    workdir = tempfile.mkdtemp(prefix="widget_soak_")
+    try:
+        widget = bench_suite.make_widget(renderer, workdir, args.mode)
+        widget.is_playing = False
+        real_tk = renderer == "xvfb"
+        if args.low_footprint:
+            import low_footprint
+            low_footprint.apply()
+        playlist = tracks()
+
+        print(f"Renderer: {renderer}, mode: {args.mode}, {hours} simulated hours\n")
+        history = []
+        start = time.perf_counter()
+        for hour in range(hours):
+            simulate_hour(widget, hour, playlist, real_tk)
+            history.append(counts(widget, real_tk))
+            figures = "  ".join(f"{k} {v:.1f}" if isinstance(v, float) else f"{k} {v}"
+                                for k, v in history[-1].items())
+            print(f"hour {hour + 1:4d}  {figures}  ({time.perf_counter() - start:.0f}s)")
+
+        base, last = history[args.warmup_hours - 1], history[-1]
+        limits = {"rss_mb": args.rss_mb, "py_objects": args.objects,
+                  "tcl_images": 0, "tcl_globals": 0, "tcl_commands": 0}
+        failures = [f"{key} grew {base[key]:.1f} -> {last[key]:.1f} (allowed +{limits[key]})"
+                    for key in base if last[key] - base[key] > limits[key]]
+        widget.media_manager.stop()
+        if real_tk:
+            widget.root.destroy()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if xvfb:
+            xvfb.terminate()
+
+    print()
+    for failure in failures:
+        print(f"GROWTH: {failure}")
+    if failures:
+        return 1
+    print(f"Flat after warm-up: hour {args.warmup_hours} -> hour {hours}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,54 +10,110 @@ Author: Antigravity (Generated)
 License: MIT
 """
 
+import sys
+
+# A second launch hands its actions to the running widget before Tk, PIL and
+# the media stack are even imported
+if __name__ == "__main__":
+    from single_instance import early_handoff
+    _instance_lock = early_handoff(sys.argv[1:])
+
 import tkinter as tk
 from tkinter import ttk
 import psutil
 import time
-import sys
 import os
 import threading
 import logging
 import traceback
 import subprocess
-from PIL import Image, ImageTk
+import atexit
+import argparse
+from PIL import ImageTk
 import pyautogui
-import io
 
 import json
 
+from widget_logging import setup_logging
+from instrumentation import instruments
+from tracing import tracer
+from diagnostics_dialog import DiagnosticsDialog
+from thumbnail_transfer import THUMB_UNCHANGED, decode_thumbnail
+from art_cache import ArtCache, ART_SIZE, art_digest
+from canvas_bar import CanvasBar
+from metric_providers import ProviderScheduler, available_providers
+from shared_metrics import MetricsSource
+from remote_metrics import RemotePoller
+from zorder import ZOrderManager
+from rate_estimator import RateEstimator, format_rate
+from single_instance import ControlServer, add_arguments, actions_from
+
+logger = logging.getLogger("widget")
+media_logger = logging.getLogger("widget.media")
+
 # Import equalizer modules
 try:
     from equalizer_manager import EqualizerManager
     from equalizer_dialog import EqualizerDialog
     EQUALIZER_AVAILABLE = True
 except ImportError as e:
-    logging.warning(f"Equalizer modules not available: {e}")
+    logger.warning(f"Equalizer modules not available: {e}")
     EQUALIZER_AVAILABLE = False
 
 VERSION = "1.2.0"
 
-# Setup logging
-logging.basicConfig(filename='widget_debug.log', level=logging.INFO, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
-# Suppress PIL/Pillow debug logs
-for logger_name in ['PIL', 'PIL.Image', 'PIL.PngImagePlugin']:
-    logging.getLogger(logger_name).setLevel(logging.WARNING)
-
 class ConfigManager:
     DEFAULT_CONFIG = {
         "show_traffic": True,
         "show_system": True,
         "music_mode": "always", # "always" or "auto"
+        "render_mode": "widgets", # "widgets" (Frame/Label tree) or "canvas" (single canvas)
+        "show_percore": False, # Per-core CPU heatmap next to the CPU/MEM labels
+        "use_metrics_daemon": True, # Read CPU/MEM/NET from shared_metrics.py --daemon when it runs
+        "metrics_shm_name": "taskbar_widget_metrics",
+        "provider_budget_ms": 15, # Per-tick time budget for metric providers (show_diskio, show_sensors, show_battery)
+        "remote_hosts": [], # [{"name": "build1", "host": "10.0.0.5", "port": 7781}] served by remote_metrics.py --agent
+        "remote_timeout": 1.0, # Seconds per remote request before the host is marked offline
+        "exporter_enabled": False, # Serve the latest sample as Prometheus text / JSON (metrics_exporter.py)
+        "exporter_address": "127.0.0.1:9184", # "host:port" or "unix:/path/to/socket"
+        "record_metrics": False, # Append every displayed sample to record_dir/metrics-YYYYMMDD.tbr
+        "record_dir": "metrics_recordings",
+        "record_batch": 60, # Samples buffered per write
+        "alert_rules": [], # [{"metric": "cpu", "op": ">", "value": 90, "for": 30}] recolors labels (alerts.py)
+        "zorder_mode": "events", # "events" (restack only when covered) or "poll" (old 2 s keep-on-top loop)
+        "zorder_backend": "auto", # "auto", "win32" or "tk" (zorder.py)
+        "zorder_fallback_s": 60, # Safety-net check interval for missed events (0 = off)
+        "net_sample_ms": 1000, # Network counter sampling interval (250 = 4 Hz between stats ticks)
+        "net_smoothing": "ewma", # "ewma", "window" or "none" (rate_estimator.py)
+        "net_smoothing_s": 1.0, # EWMA time constant / window length in seconds
+        "net_units": "auto", # "auto" (B/s .. GB/s) or "MB" (always MB/s)
+        "net_peak_hold_s": 0, # Show the highest rate of the last N seconds (0 = off)
+        "low_footprint": False, # Below-normal CPU/I/O priority and fewer GC passes (low_footprint.py)
+        "media_source_app": "", # Pinned media session app id ("" = automatic)
+        "art_cache_dir": "album_art_cache", # Pre-resized album art kept across restarts
+        "art_cache_entries": 256, # ~1.2 MB at 40x40 RGB
         "viz_preset": "Default", # Default, Bass, Treble, Rock, Pop
         "eq_preset": "Flat", # Equalizer preset
+        "eq_preset_library": "", # Directory or packed file of extra EQ profiles
+        "eq_transition_ms": 300, # Preset crossfade duration (0 = jump)
+        "eq_max_write_hz": 20, # Cap on APO config writes per second during crossfades
+        "apo_discovery": None, # Cached Equalizer APO install/config paths and devices
         "position": {"x": 0, "y": -1},
-        "theme": "dark"
+        "theme": "dark",
+        "log_levels": {"PIL": "WARNING"}, # Per-subsystem levels: widget, widget.media, equalizer, ...
+        "log_max_kb": 1024, # Rotate widget_debug.log at this size
+        "log_backups": 3,
+        "log_dedup_seconds": 60, # Identical messages are logged at most once per window
+        "instrumentation": False, # Record callback timings for the Diagnostics popup
+        "trace_enabled": False, # Record a callback timeline (also TASKBAR_TRACE=1)
+        "trace_file": "widget_trace.json" # Chrome trace-event dump, written on demand and at exit
     }
     
     def __init__(self, filename="widget_config.json"):
         self.filename = filename
         self.config = self.load_config()
+        # Background workers (e.g. APO discovery) may save too
+        self.lock = threading.RLock()
         
     def load_config(self):
         if os.path.exists(self.filename):
@@ -70,27 +126,33 @@ class ConfigManager:
         
     def save_config(self):
         try:
-            with open(self.filename, 'w') as f:
+            with self.lock, open(self.filename, 'w') as f:
                 json.dump(self.config, f, indent=4)
         except Exception as e:
-            logging.error(f"Config save error: {e}")
+            logger.error(f"Config save error: {e}")
 
     def get(self, key):
         return self.config.get(key, self.DEFAULT_CONFIG.get(key))
 
     def set(self, key, value):
-        self.config[key] = value
-        self.save_config()
+        with self.lock:
+            self.config[key] = value
+            self.save_config()
 
 class Visualizer:
-    def __init__(self, parent, config_manager, bg_color, accent_color):
+    def __init__(self, parent, config_manager, bg_color, accent_color, canvas=None, origin=(0, 0), tags=()):
         self.parent = parent
         self.config = config_manager
         self.bg_color = bg_color
         self.accent_color = accent_color
         
-        self.canvas = tk.Canvas(parent, width=40, height=15, bg=bg_color, highlightthickness=0)
-        self.canvas.pack(side="left", padx=5)
+        # Own 40x15 canvas, or bars drawn onto a shared canvas (canvas render mode)
+        if canvas is None:
+            self.canvas = tk.Canvas(parent, width=40, height=15, bg=bg_color, highlightthickness=0)
+            self.canvas.pack(side="left", padx=5)
+        else:
+            self.canvas = canvas
+        x0, self.y0 = origin
         
         self.bars = []
         self.num_bars = 5
@@ -98,8 +160,9 @@ class Visualizer:
         self.gap = 2
         
         for i in range(self.num_bars):
-            x = i * (self.bar_width + self.gap)
-            bar = self.canvas.create_rectangle(x, 15, x + self.bar_width, 15, fill=accent_color, outline="")
+            x = x0 + i * (self.bar_width + self.gap)
+            bar = self.canvas.create_rectangle(x, self.y0 + 15, x + self.bar_width, self.y0 + 15,
+                                               fill=accent_color, outline="", tags=tags)
             self.bars.append(bar)
             
     def animate(self, is_playing):
@@ -134,32 +197,39 @@ class Visualizer:
                 
                 self.canvas.coords(bar, 
                                  self.canvas.coords(bar)[0], 
-                                 15-val, 
+                                 self.y0 + 15 - val, 
                                  self.canvas.coords(bar)[2], 
-                                 15)
+                                 self.y0 + 15)
         else:
             # Flat line
             for bar in self.bars:
                 self.canvas.coords(bar, 
                                  self.canvas.coords(bar)[0], 
-                                 14, 
+                                 self.y0 + 14, 
                                  self.canvas.coords(bar)[2], 
-                                 15)
+                                 self.y0 + 15)
 
 class SystemMonitorWidget:
-    def __init__(self):
+    def __init__(self, config=None, replay=None):
         try:
-            self.config = ConfigManager()
+            self.config = config or ConfigManager()
+            self.replay = replay  # ReplaySource driving the bar instead of live metrics
+            instruments.enabled = bool(self.config.get("instrumentation"))
+            tracer.enabled = bool(self.config.get("trace_enabled") or os.environ.get("TASKBAR_TRACE"))
+            if tracer.enabled:
+                atexit.register(self.dump_trace)
             
             # Initialize Equalizer Manager
             if EQUALIZER_AVAILABLE:
-                self.eq_manager = EqualizerManager()
+                self.eq_manager = EqualizerManager(self.config.get("eq_preset_library"), self.config)
             else:
                 self.eq_manager = None
             
             
             self.root = tk.Tk()
             self.root.title("System Monitor")
+            if tracer.enabled:
+                tracer.trace_after(self.root)
             
             # Remove window decorations (frameless)
             self.root.overrideredirect(True)
@@ -176,87 +246,24 @@ class SystemMonitorWidget:
             # Transparency
             self.root.wm_attributes("-alpha", 0.95)
 
-            # Main container
-            self.main_frame = tk.Frame(self.root, bg=self.bg_color)
-            self.main_frame.pack(fill="both", expand=True, padx=5, pady=5)
-
             # Font settings
             self.font_style = ("Segoe UI", 8)
             self.font_bold = ("Segoe UI", 8, "bold")
             
-            # --- Layout ---
-            
-            # 1. Music Section
-            self.music_frame = tk.Frame(self.main_frame, bg=self.bg_color)
-            self.music_frame.pack(side="left", padx=5)
-            
-            # Album Art
-            self.album_art_label = tk.Label(self.music_frame, text="♫", font=("Segoe UI", 14), 
-                                          bg="#333333", fg=self.fg_color)
-            self.album_art_label.pack(side="left", padx=2)
-            
-            # Controls & Info
-            self.music_info_frame = tk.Frame(self.music_frame, bg=self.bg_color)
-            self.music_info_frame.pack(side="left", padx=5)
-            
-            # Song Title
-            self.song_title = tk.Label(self.music_info_frame, text="No Music", font=self.font_bold, 
-                                     bg=self.bg_color, fg=self.fg_color, width=20, anchor="w")
-            self.song_title.pack(side="top", fill="x", pady=0)
-            
-            # Controls Frame
-            self.controls_frame = tk.Frame(self.music_info_frame, bg=self.bg_color)
-            self.controls_frame.pack(side="bottom", fill="x", anchor="w", pady=0)
-            
-            # Buttons
-            button_font = ("Segoe UI", 12)
-            self.btn_prev = tk.Label(self.controls_frame, text="⏮", font=button_font, bg=self.bg_color, fg=self.fg_color, cursor="hand2", bd=0, highlightthickness=0)
-            self.btn_prev.pack(side="left", padx=3)
-            self.btn_prev.bind("<Button-1>", lambda e: self.media_control("prev"))
+            # Pluggable metrics (disk I/O, sensors, battery, remote hosts) sampled under a time budget
+            self.remote_poller = RemotePoller.from_config(self.config.get("remote_hosts"),
+                                                          self.config.get("remote_timeout"))
+            self.providers = available_providers() + self.remote_poller.providers()
+            self.provider_scheduler = ProviderScheduler(self.providers, self.config.get("provider_budget_ms"),
+                                                        record=instruments.record)
             
-            self.btn_play = tk.Label(self.controls_frame, text="⏯", font=button_font, bg=self.bg_color, fg=self.fg_color, cursor="hand2", bd=0, highlightthickness=0)
-            self.btn_play.pack(side="left", padx=3)
-            self.btn_play.bind("<Button-1>", lambda e: self.media_control("playpause"))
-            
-            self.btn_next = tk.Label(self.controls_frame, text="⏭", font=button_font, bg=self.bg_color, fg=self.fg_color, cursor="hand2", bd=0, highlightthickness=0)
-            self.btn_next.pack(side="left", padx=3)
-            self.btn_next.bind("<Button-1>", lambda e: self.media_control("next"))
-            
-            # Visualizer
-            self.visualizer = Visualizer(self.controls_frame, self.config, self.bg_color, self.accent_color)
-
-            # Separator 1
-            self.sep1 = tk.Frame(self.main_frame, width=1, bg="#444444")
-            self.sep1.pack(side="left", fill="y", padx=5, pady=2)
-
-            # 2. Network Section
-            self.net_frame = tk.Frame(self.main_frame, bg=self.bg_color)
-            self.net_frame.pack(side="left", padx=5)
-            
-            self.net_up_label = tk.Label(self.net_frame, text="▲ 0.0 MB/s", font=self.font_style, bg=self.bg_color, fg="#4caf50", anchor="w")
-            self.net_up_label.pack(side="top", fill="x", pady=0)
-            
-            self.net_down_label = tk.Label(self.net_frame, text="▼ 0.0 MB/s", font=self.font_style, bg=self.bg_color, fg="#2196f3", anchor="w")
-            self.net_down_label.pack(side="bottom", fill="x", pady=0)
-
-            # Separator 2
-            self.sep2 = tk.Frame(self.main_frame, width=1, bg="#444444")
-            self.sep2.pack(side="left", fill="y", padx=5, pady=2)
-
-            # 3. CPU & Memory Section
-            self.sys_frame = tk.Frame(self.main_frame, bg=self.bg_color)
-            self.sys_frame.pack(side="left", padx=5)
-            
-            self.cpu_label = tk.Label(self.sys_frame, text="CPU: 0%", font=self.font_style, bg=self.bg_color, fg=self.fg_color, anchor="w")
-            self.cpu_label.pack(side="top", fill="x", pady=0)
-            
-            self.mem_label = tk.Label(self.sys_frame, text="MEM: 0%", font=self.font_style, bg=self.bg_color, fg=self.fg_color, anchor="w")
-            self.mem_label.pack(side="bottom", fill="x", pady=0)
-
-            # 4. Close Button
-            self.close_btn = tk.Label(self.main_frame, text="×", font=("Segoe UI", 10, "bold"), bg=self.bg_color, fg="#ff5555", cursor="hand2", bd=0, highlightthickness=0)
-            self.close_btn.pack(side="right", padx=5, anchor="center")
-            self.close_btn.bind("<Button-1>", lambda e: self.exit_app())
+            # Bar: Frame/Label tree (default) or a single canvas
+            self.heatmap = None
+            self.album_photo = None  # One PhotoImage for the album art, pasted into per track
+            if self.config.get("render_mode") == "canvas":
+                self.build_canvas_bar()
+            else:
+                self.build_widget_bar()
 
             # Draggable logic
             self.root.bind("<Button-1>", self.start_drag)
@@ -265,18 +272,64 @@ class SystemMonitorWidget:
             # Context Menu
             self.create_context_menu()
             self.root.bind("<Button-3>", self.show_context_menu)
-            for widget in [self.main_frame, self.music_frame, self.net_frame, self.sys_frame, 
-                         self.song_title, self.album_art_label, self.net_up_label, self.net_down_label,
-                         self.cpu_label, self.mem_label]:
-                widget.bind("<Button-3>", self.show_context_menu)
+            
+            # Timing hooks for the Diagnostics popup (near-free while disabled);
+            # must wrap before the bound methods are handed to MediaManager
+            instruments.instrument(self, "update_stats")
+            instruments.instrument(self, "update_media_ui")
+            instruments.instrument(self.visualizer, "animate")
+            if self.eq_manager:
+                instruments.instrument(self.eq_manager, "apply_settings")
+                instruments.instrument(self.eq_manager, "apply_profile")
             
             # Initial stats
-            self.last_net_io = psutil.net_io_counters()
-            self.last_time = time.time()
+            if self.replay:
+                self.metrics = self.replay
+                self.root.title("System Monitor (replay)")
+            else:
+                self.metrics = MetricsSource(self.config.get("metrics_shm_name"),
+                                             use_daemon=self.config.get("use_metrics_daemon"))
+            self.net_rates = (0.0, 0.0)
+            self.net_estimator = RateEstimator(self.config.get("net_smoothing"), self.config.get("net_smoothing_s"),
+                                               self.config.get("net_peak_hold_s"))
+            self.net_sample_ms = int(self.config.get("net_sample_ms"))
+            # Sub-second sampling needs per-interface counters (not available from a replay)
+            self.net_fast = self.net_sample_ms < 1000 and hasattr(self.metrics, "net_counters")
+            self.sample_network(self.metrics.sample())
+            
+            # Optional recording of every displayed sample (never of a replay)
+            self.recorder = None
+            if self.config.get("record_metrics") and not self.replay:
+                from metrics_recorder import MetricsRecorder
+                self.recorder = MetricsRecorder(self.config.get("record_dir"), self.config.get("record_batch"))
+                atexit.register(self.recorder.close)
+            
+            # Threshold alerts (label colors, optional notifications)
+            self.alerts = None
+            if self.config.get("alert_rules"):
+                from alerts import AlertEngine
+                self.alerts = AlertEngine(self.config.get("alert_rules"))
+                # Colors to restore when a label's alerts clear (the network labels are not fg_color)
+                self.alert_base_colors = {rule.label: getattr(self, rule.label).cget("fg")
+                                          for rule in self.alerts.rules}
+            
+            # Optional Prometheus/JSON endpoint, served from its own thread
+            self.exporter = None
+            if self.config.get("exporter_enabled"):
+                from metrics_exporter import MetricsExporter
+                self.exporter = MetricsExporter(self.config.get("exporter_address"))
+                if not self.exporter.start():
+                    self.exporter = None
             
             # Attempt to initialize Media Manager (Async)
-            self.media_manager = MediaManager(self.update_media_ui, self.update_playback_state)
-            self.media_manager.start()
+            # (not while replaying: playback state comes from the recording)
+            self.media_manager = None
+            if not self.replay:
+                self.media_manager = MediaManager(self.update_media_ui, self.update_playback_state,
+                                                  self.config.get("media_source_app"),
+                                                  self.open_art_cache())
+                self.media_manager.start()
+            self.remote_poller.start()
             
             # Initial Position
             self.set_initial_position()
@@ -286,14 +339,165 @@ class SystemMonitorWidget:
             
             # Start updating
             self.update_stats()
-            self.check_keep_on_top()
+            if self.net_fast:
+                self.root.after(self.net_sample_ms, self.network_tick)
+            self.zorder = ZOrderManager(self.root, self.config.get("zorder_backend"),
+                                        self.config.get("zorder_fallback_s"), self.config.get("zorder_mode"))
+            instruments.add_counters("zorder", self.zorder.stats)
             self.animate_visualizer()
             
+            # Last, so the GC freeze covers everything built above
+            if self.config.get("low_footprint"):
+                import low_footprint
+                low_footprint.apply()
+            
         except Exception as e:
-            logging.error(f"Initialization error: {traceback.format_exc()}")
+            logger.error(f"Initialization error: {traceback.format_exc()}")
             
         except Exception as e:
-            logging.error(f"Initialization error: {traceback.format_exc()}")
+            logger.error(f"Initialization error: {traceback.format_exc()}")
+
+    def build_widget_bar(self):
+        """Nested Frame/Label layout"""
+        # Main container
+        self.main_frame = tk.Frame(self.root, bg=self.bg_color)
+        self.main_frame.pack(fill="both", expand=True, padx=5, pady=5)
+
+        # --- Layout ---
+        
+        # 1. Music Section
+        self.music_frame = tk.Frame(self.main_frame, bg=self.bg_color)
+        self.music_frame.pack(side="left", padx=5)
+        
+        # Album Art
+        self.album_art_label = tk.Label(self.music_frame, text="♫", font=("Segoe UI", 14), 
+                                      bg="#333333", fg=self.fg_color)
+        self.album_art_label.pack(side="left", padx=2)
+        
+        # Controls & Info
+        self.music_info_frame = tk.Frame(self.music_frame, bg=self.bg_color)
+        self.music_info_frame.pack(side="left", padx=5)
+        
+        # Song Title
+        self.song_title = tk.Label(self.music_info_frame, text="No Music", font=self.font_bold, 
+                                 bg=self.bg_color, fg=self.fg_color, width=20, anchor="w")
+        self.song_title.pack(side="top", fill="x", pady=0)
+        
+        # Controls Frame
+        self.controls_frame = tk.Frame(self.music_info_frame, bg=self.bg_color)
+        self.controls_frame.pack(side="bottom", fill="x", anchor="w", pady=0)
+        
+        # Buttons
+        button_font = ("Segoe UI", 12)
+        self.btn_prev = tk.Label(self.controls_frame, text="⏮", font=button_font, bg=self.bg_color, fg=self.fg_color, cursor="hand2", bd=0, highlightthickness=0)
+        self.btn_prev.pack(side="left", padx=3)
+        self.btn_prev.bind("<Button-1>", lambda e: self.media_control("prev"))
+        
+        self.btn_play = tk.Label(self.controls_frame, text="⏯", font=button_font, bg=self.bg_color, fg=self.fg_color, cursor="hand2", bd=0, highlightthickness=0)
+        self.btn_play.pack(side="left", padx=3)
+        self.btn_play.bind("<Button-1>", lambda e: self.media_control("playpause"))
+        
+        self.btn_next = tk.Label(self.controls_frame, text="⏭", font=button_font, bg=self.bg_color, fg=self.fg_color, cursor="hand2", bd=0, highlightthickness=0)
+        self.btn_next.pack(side="left", padx=3)
+        self.btn_next.bind("<Button-1>", lambda e: self.media_control("next"))
+        
+        # Visualizer
+        self.visualizer = Visualizer(self.controls_frame, self.config, self.bg_color, self.accent_color)
+
+        # Separator 1
+        self.sep1 = tk.Frame(self.main_frame, width=1, bg="#444444")
+        self.sep1.pack(side="left", fill="y", padx=5, pady=2)
+
+        # 2. Network Section
+        self.net_frame = tk.Frame(self.main_frame, bg=self.bg_color)
+        self.net_frame.pack(side="left", padx=5)
+        
+        self.net_up_label = tk.Label(self.net_frame, text="▲ 0.0 MB/s", font=self.font_style, bg=self.bg_color, fg="#4caf50", anchor="w")
+        self.net_up_label.pack(side="top", fill="x", pady=0)
+        
+        self.net_down_label = tk.Label(self.net_frame, text="▼ 0.0 MB/s", font=self.font_style, bg=self.bg_color, fg="#2196f3", anchor="w")
+        self.net_down_label.pack(side="bottom", fill="x", pady=0)
+
+        # Separator 2
+        self.sep2 = tk.Frame(self.main_frame, width=1, bg="#444444")
+        self.sep2.pack(side="left", fill="y", padx=5, pady=2)
+
+        # 3. CPU & Memory Section
+        self.sys_frame = tk.Frame(self.main_frame, bg=self.bg_color)
+        self.sys_frame.pack(side="left", padx=5)
+        
+        self.cpu_label = tk.Label(self.sys_frame, text="CPU: 0%", font=self.font_style, bg=self.bg_color, fg=self.fg_color, anchor="w")
+        self.cpu_label.pack(side="top", fill="x", pady=0)
+        
+        self.mem_label = tk.Label(self.sys_frame, text="MEM: 0%", font=self.font_style, bg=self.bg_color, fg=self.fg_color, anchor="w")
+        self.mem_label.pack(side="bottom", fill="x", pady=0)
+
+        # Per-core CPU heatmap (packed by apply_visibility when enabled)
+        self.cores_label = tk.Label(self.main_frame, bg=self.bg_color, bd=0)
+        
+        # Metric provider sections (packed by apply_visibility when enabled)
+        self.provider_widgets = {}
+        for provider in self.providers:
+            sep = tk.Frame(self.main_frame, width=1, bg="#444444")
+            frame = tk.Frame(self.main_frame, bg=self.bg_color)
+            top = tk.Label(frame, text=provider.placeholder[0], font=self.font_style, bg=self.bg_color, fg=provider.colors[0], anchor="w")
+            top.pack(side="top", fill="x", pady=0)
+            bottom = tk.Label(frame, text=provider.placeholder[1], font=self.font_style, bg=self.bg_color, fg=provider.colors[1], anchor="w")
+            bottom.pack(side="bottom", fill="x", pady=0)
+            for widget in (frame, top, bottom):
+                widget.bind("<Button-3>", self.show_context_menu)
+            self.provider_widgets[provider.name] = (sep, frame, top, bottom)
+        
+        # 4. Close Button
+        self.close_btn = tk.Label(self.main_frame, text="×", font=("Segoe UI", 10, "bold"), bg=self.bg_color, fg="#ff5555", cursor="hand2", bd=0, highlightthickness=0)
+        self.close_btn.pack(side="right", padx=5, anchor="center")
+        self.close_btn.bind("<Button-1>", lambda e: self.exit_app())
+        
+        for widget in [self.main_frame, self.music_frame, self.net_frame, self.sys_frame, 
+                     self.song_title, self.album_art_label, self.net_up_label, self.net_down_label,
+                     self.cpu_label, self.mem_label]:
+            widget.bind("<Button-3>", self.show_context_menu)
+        self.bar = None
+
+    def build_canvas_bar(self):
+        """Whole bar on one canvas; attributes are proxies with the Label/Frame calls used here"""
+        self.main_frame = tk.Frame(self.root, bg=self.bg_color)
+        self.main_frame.pack(fill="both", expand=True)
+        self.bar = CanvasBar(self.main_frame, self.bg_color, self.fg_color,
+                             self.font_style, self.font_bold)
+        bar = self.bar
+        self.music_frame = bar.sections["music"]
+        self.net_frame = bar.sections["net"]
+        self.sys_frame = bar.sections["sys"]
+        self.sep1 = bar.sections["sep1"]
+        self.sep2 = bar.sections["sep2"]
+        self.album_art_label = bar.art
+        self.song_title = bar.title
+        self.btn_prev, self.btn_play, self.btn_next = bar.prev, bar.play, bar.next
+        self.net_up_label, self.net_down_label = bar.net_up, bar.net_down
+        self.cpu_label, self.mem_label = bar.cpu, bar.mem
+        self.cores_label = bar.cores
+        self.provider_widgets = {}
+        for provider in self.providers:
+            top, bottom = bar.add_text_section(provider.name, provider.width_text,
+                                               provider.colors, provider.placeholder)
+            self.provider_widgets[provider.name] = (None, bar.sections[provider.name], top, bottom)
+        self.close_btn = bar.close
+        
+        self.btn_prev.bind("<Button-1>", lambda e: self.media_control("prev"))
+        self.btn_play.bind("<Button-1>", lambda e: self.media_control("playpause"))
+        self.btn_next.bind("<Button-1>", lambda e: self.media_control("next"))
+        self.close_btn.bind("<Button-1>", lambda e: self.exit_app())
+        
+        self.visualizer = Visualizer(self.main_frame, self.config, self.bg_color, self.accent_color,
+                                     canvas=bar.canvas, origin=bar.viz_origin, tags=("music",))
+
+    def open_art_cache(self):
+        try:
+            return ArtCache(self.config.get("art_cache_dir"), self.config.get("art_cache_entries"))
+        except Exception as e:
+            logger.warning(f"Album art cache unavailable, using memory only: {e}")
+            return None
 
     def update_media_ui(self, title, artist, image_data):
         self.last_title = title
@@ -316,18 +520,25 @@ class SystemMonitorWidget:
         self.song_title.config(text=display_text)
         
         # Update Image
-        if image_data:
+        if image_data is THUMB_UNCHANGED:
+            pass  # same art as the last callback: keep the current image
+        elif image_data:
             try:
-                image = Image.open(io.BytesIO(image_data))
-                # Increased size to 40x40
-                image = image.resize((40, 40), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(image)
-                self.album_art_label.config(image=photo, text="", width=0) # Reset width
-                self.album_art_label.image = photo # Keep reference
+                # 40x40 art, decoded (or read from the art cache) on the media thread;
+                # pasted into the existing PhotoImage rather than creating a Tk image per track
+                photo = self.album_photo
+                if photo is not None and (photo.width(), photo.height()) == image_data.size:
+                    photo.paste(image_data)
+                else:
+                    photo = self.album_photo = ImageTk.PhotoImage(image_data)
+                if getattr(self.album_art_label, "image", None) is not photo:
+                    self.album_art_label.config(image=photo, text="", width=0) # Reset width
+                    self.album_art_label.image = photo # Keep reference
             except Exception as e:
-                logging.error(f"Image update error: {e}")
+                logger.error(f"Image update error: {e}")
         else:
             self.album_art_label.config(image="", text="♫", width=4) # Restore width for text
+            self.album_art_label.image = None
     
     def update_playback_state(self, is_playing):
         """Update play/pause button based on playback state"""
@@ -346,11 +557,17 @@ class SystemMonitorWidget:
             elif action == "prev":
                 pyautogui.press("prevtrack")
         except Exception as e:
-            logging.error(f"Media control error: {e}")
+            logger.error(f"Media control error: {e}")
 
     def exit_app(self):
         if self.media_manager:
             self.media_manager.stop()
+        self.remote_poller.stop()
+        if self.exporter:
+            self.exporter.stop()
+        if self.recorder:
+            self.recorder.close()
+        self.zorder.stop()
         self.root.quit()
         sys.exit()
         
@@ -368,6 +585,23 @@ class SystemMonitorWidget:
         
         self.root.geometry(f'+{x_pos}+{y_pos}')
 
+    def run_actions(self, actions):
+        """Command-line actions, from this launch or forwarded by a later one"""
+        for action in actions:
+            name, args = action[0], action[1:]
+            if name == "show":
+                self.root.deiconify()
+                self.zorder.restack()
+            elif name == "reset_position":
+                self.set_initial_position()
+            elif name == "eq_preset":
+                if self.eq_manager and args and self.eq_manager.apply_preset(args[0]):
+                    self.config.set("eq_preset", args[0])
+            elif name == "exit":
+                self.exit_app()
+            else:
+                logger.warning(f"Unknown action: {name}")
+
     def start_drag(self, event):
         self.x = event.x
         self.y = event.y
@@ -379,20 +613,27 @@ class SystemMonitorWidget:
         y = self.root.winfo_y() + deltay
         self.root.geometry(f"+{x}+{y}")
 
-    def check_keep_on_top(self):
-        # Periodically ensure window is on top
-        self.root.lift()
-        self.root.wm_attributes("-topmost", True)
-        self.root.after(2000, self.check_keep_on_top)
-
     def create_context_menu(self):
         self.context_menu = tk.Menu(self.root, tearoff=0)
         
-        # Visibility
+        # Visibility (one variable each, refreshed by show_context_menu)
+        self.traffic_var = tk.BooleanVar(value=self.config.get("show_traffic"))
+        self.system_var = tk.BooleanVar(value=self.config.get("show_system"))
+        self.percore_var = tk.BooleanVar(value=self.config.get("show_percore"))
         self.context_menu.add_checkbutton(label="Show Traffic", command=self.toggle_traffic, 
-                                        variable=tk.BooleanVar(value=self.config.get("show_traffic")))
+                                        variable=self.traffic_var)
         self.context_menu.add_checkbutton(label="Show System Stats", command=self.toggle_system, 
-                                        variable=tk.BooleanVar(value=self.config.get("show_system")))
+                                        variable=self.system_var)
+        self.context_menu.add_checkbutton(label="Per-Core CPU", command=self.toggle_percore, 
+                                        variable=self.percore_var)
+        
+        # One toggle per available metric provider
+        self.provider_vars = {}
+        for provider in self.providers:
+            var = tk.BooleanVar(value=self.provider_shown(provider))
+            self.provider_vars[provider.name] = var
+            self.context_menu.add_checkbutton(label=f"Show {provider.label}", variable=var,
+                                            command=lambda name=provider.name: self.toggle_provider(name))
         self.context_menu.add_separator()
         
         # Music Mode
@@ -402,6 +643,11 @@ class SystemMonitorWidget:
         self.context_menu.add_radiobutton(label="Auto-Hide Music", variable=self.music_mode_var, 
                                         value="auto", command=self.toggle_music_mode)
         
+        # Media source: filled with the sessions seen by MediaManager on open
+        self.media_source_var = tk.StringVar(value=self.config.get("media_source_app"))
+        self.media_source_menu = tk.Menu(self.context_menu, tearoff=0)
+        self.context_menu.add_cascade(label="Media Source", menu=self.media_source_menu)
+        
         self.context_menu.add_separator()
         
         # Audio Equalizer
@@ -409,15 +655,40 @@ class SystemMonitorWidget:
             self.context_menu.add_command(label="🎚️ Audio Equalizer...", command=self.open_equalizer)
             self.context_menu.add_separator()
             
+        self.context_menu.add_command(label="📊 Diagnostics...", command=self.open_diagnostics)
+        if tracer.enabled:
+            self.context_menu.add_command(label="⏺ Dump Trace", command=self.dump_trace)
         self.context_menu.add_command(label="Reset Position", command=self.set_initial_position)
         self.context_menu.add_command(label="Exit", command=self.exit_app)
 
     def show_context_menu(self, event):
-        # Update checkmarks dynamically
-        self.context_menu.entryconfigure(0, variable=tk.BooleanVar(value=self.config.get("show_traffic")))
-        self.context_menu.entryconfigure(1, variable=tk.BooleanVar(value=self.config.get("show_system")))
+        # Update checkmarks dynamically (reusing the menu's variables)
+        self.traffic_var.set(bool(self.config.get("show_traffic")))
+        self.system_var.set(bool(self.config.get("show_system")))
+        self.percore_var.set(bool(self.config.get("show_percore")))
+        for provider in self.providers:
+            self.provider_vars[provider.name].set(self.provider_shown(provider))
+        self.build_media_source_menu()
         self.context_menu.tk_popup(event.x_root, event.y_root)
 
+    def build_media_source_menu(self):
+        pinned = self.config.get("media_source_app")
+        apps = list(self.media_manager.app_ids) if self.media_manager else []
+        if pinned and pinned not in apps:
+            apps.append(pinned)
+        self.media_source_menu.delete(0, "end")
+        self.media_source_menu.add_radiobutton(label="Automatic", variable=self.media_source_var,
+                                               value="", command=self.select_media_source)
+        for app_id in apps:
+            self.media_source_menu.add_radiobutton(label=app_id, variable=self.media_source_var,
+                                                   value=app_id, command=self.select_media_source)
+
+    def select_media_source(self):
+        app_id = self.media_source_var.get()
+        self.config.set("media_source_app", app_id)
+        if self.media_manager:
+            self.media_manager.pinned_app = app_id
+
     def toggle_traffic(self):
         new_val = not self.config.get("show_traffic")
         self.config.set("show_traffic", new_val)
@@ -428,10 +699,23 @@ class SystemMonitorWidget:
         self.config.set("show_system", new_val)
         self.apply_visibility()
 
+    def toggle_provider(self, name):
+        self.config.set(f"show_{name}", bool(self.provider_vars[name].get()))
+        self.apply_visibility()
+
+    def provider_shown(self, provider):
+        shown = self.config.get(f"show_{provider.name}")
+        return provider.default_shown if shown is None else bool(shown)
+
+    def toggle_percore(self):
+        new_val = not self.config.get("show_percore")
+        self.config.set("show_percore", new_val)
+        self.apply_visibility()
+
     def toggle_music_mode(self):
         self.config.set("music_mode", self.music_mode_var.get())
         if hasattr(self, 'last_title'):
-             self.update_media_ui(self.last_title, self.last_artist, None)
+             self.update_media_ui(self.last_title, self.last_artist, THUMB_UNCHANGED)
              
     def change_viz_preset(self):
         self.config.set("viz_preset", self.viz_preset_var.get())
@@ -441,12 +725,38 @@ class SystemMonitorWidget:
         if EQUALIZER_AVAILABLE and self.eq_manager:
             EqualizerDialog(self.root, self.eq_manager, self.config)
 
+    def dump_trace(self):
+        """Write the trace ring buffer as Chrome trace-event JSON"""
+        path = self.config.get("trace_file")
+        try:
+            count = tracer.dump(path)
+            logger.info(f"Trace dumped: {count} spans -> {path}")
+        except Exception as e:
+            logger.error(f"Trace dump error: {e}")
+
+    def open_diagnostics(self):
+        """Open the per-callback latency / resource usage popup"""
+        DiagnosticsDialog(self.root, instruments, self.config)
+
     def apply_visibility(self):
+        if self.bar:
+            # Canvas mode: one layout pass that only moves/hides items
+            auto_hidden = self.config.get("music_mode") == "auto" and not getattr(self, "last_title", None)
+            self.bar.set_visible(music=not auto_hidden, net=self.config.get("show_traffic"),
+                                 sys=self.config.get("show_system"),
+                                 cores=self.config.get("show_percore"),
+                                 **{p.name: self.provider_shown(p) for p in self.providers})
+            return
+        
         # Unpack all optional frames first to avoid order issues
         self.net_frame.pack_forget()
         self.sys_frame.pack_forget()
         self.sep1.pack_forget()
         self.sep2.pack_forget()
+        self.cores_label.pack_forget()
+        for sep, frame, _, _ in self.provider_widgets.values():
+            sep.pack_forget()
+            frame.pack_forget()
         self.close_btn.pack_forget()
         
         # Music is handled by update_media_ui mostly, but we ensure it's first if visible
@@ -469,6 +779,19 @@ class SystemMonitorWidget:
                 
         if show_system:
             self.sys_frame.pack(side="left", padx=5)
+        
+        if self.config.get("show_percore"):
+            self.cores_label.pack(side="left", padx=5)
+        
+        # Provider sections, each after a separator when something precedes it
+        shown = music_visible or show_traffic or show_system or self.config.get("show_percore")
+        for provider in self.providers:
+            if self.provider_shown(provider):
+                sep, frame, _, _ = self.provider_widgets[provider.name]
+                if shown:
+                    sep.pack(side="left", fill="y", padx=5, pady=2)
+                frame.pack(side="left", padx=5)
+                shown = True
             
         self.close_btn.pack(side="right", padx=5, anchor="center")
 
@@ -478,134 +801,277 @@ class SystemMonitorWidget:
             self.visualizer.animate(is_playing)
         self.root.after(100, self.animate_visualizer)
 
+    def update_heatmap(self, percpu):
+        if self.heatmap is None:
+            from cpu_heatmap import CpuHeatmap
+            self.heatmap = CpuHeatmap(self.root, len(percpu), bg=self.bg_color)
+            self.cores_label.config(image=self.heatmap.photo)
+        self.heatmap.update(percpu)
+
+    def update_providers(self, enabled):
+        for name, value in self.provider_scheduler.tick(enabled).items():
+            _, _, top, bottom = self.provider_widgets[name]
+            line1, line2 = self.provider_scheduler.entries[name].provider.format(value)
+            top.config(text=line1)
+            bottom.config(text=line2)
+
+    def apply_alert_colors(self, changed):
+        """Recolor only the labels whose rules switched on or off"""
+        for name in {rule.label for rule in changed}:
+            getattr(self, name).config(fg=self.alerts.color_for(name, self.alert_base_colors[name]))
+
+    def sample_network(self, snap=None):
+        """Feed the rate estimator and show its rates; snap=None reads per-interface counters"""
+        if hasattr(self.metrics, "net_counters") and (self.net_fast or not self.metrics.shared):
+            self.net_rates = self.net_estimator.update(self.metrics.net_counters())
+        else:
+            # Replay (its recording's clock), or a fresh metrics daemon at 1 Hz: its totals, timed
+            # by its monotonic stamp (the same system-wide clock the local path uses)
+            clock = snap.timestamp if snap.monotonic is None else snap.monotonic
+            self.net_rates = self.net_estimator.update({"total": (snap.bytes_sent, snap.bytes_recv)}, clock)
+        up, down = self.net_estimator.display()
+        units = self.config.get("net_units")
+        self.net_up_label.config(text=f"▲ {format_rate(up, units)}")
+        self.net_down_label.config(text=f"▼ {format_rate(down, units)}")
+
+    def network_tick(self):
+        try:
+            self.sample_network()
+        except Exception as e:
+            logger.error(f"Network sample error: {e}")
+        self.root.after(self.net_sample_ms, self.network_tick)
+
     def update_stats(self):
         try:
+            # One snapshot: from the shared metrics daemon if running, else psutil
+            show_percore = self.config.get("show_percore")
+            snap = self.metrics.sample(percpu=show_percore)
+            
             # CPU
-            cpu_percent = psutil.cpu_percent()
-            self.cpu_label.config(text=f"CPU: {cpu_percent}%")
+            if show_percore and snap.percpu:
+                self.update_heatmap(snap.percpu)
+            self.cpu_label.config(text=f"CPU: {snap.cpu_percent}%")
             
             # Memory
-            mem = psutil.virtual_memory()
-            self.mem_label.config(text=f"MEM: {mem.percent}%")
+            self.mem_label.config(text=f"MEM: {snap.mem_percent}%")
             
-            # Network
-            current_net_io = psutil.net_io_counters()
-            current_time = time.time()
+            # Network (sampled by network_tick instead when sub-second)
+            if not self.net_fast:
+                self.sample_network(snap)
             
-            time_delta = current_time - self.last_time
-            if time_delta > 0.5:
-                bytes_sent = current_net_io.bytes_sent - self.last_net_io.bytes_sent
-                bytes_recv = current_net_io.bytes_recv - self.last_net_io.bytes_recv
-                
-                # Speed in Bytes per second
-                sent_speed = bytes_sent / time_delta
-                recv_speed = bytes_recv / time_delta
-                
-                # Convert to MB/s
-                sent_mb = sent_speed / (1024 * 1024)
-                recv_mb = recv_speed / (1024 * 1024)
-                
-                self.net_up_label.config(text=f"▲ {sent_mb:.2f} MB/s")
-                self.net_down_label.config(text=f"▼ {recv_mb:.2f} MB/s")
-                
-                self.last_net_io = current_net_io
-                self.last_time = current_time
+            # Alerts: recolor labels only when a rule switches on or off
+            if self.alerts:
+                # Live windows run on the monotonic clock; a replay on its recording's
+                now = snap.timestamp if self.replay else time.monotonic()
+                changed = self.alerts.update(now, {
+                    "cpu": snap.cpu_percent, "mem": snap.mem_percent,
+                    "up": self.net_rates[0] / (1024 * 1024), "down": self.net_rates[1] / (1024 * 1024)})
+                if changed:
+                    self.apply_alert_colors(changed)
+            
+            # Playback state
+            if self.replay:
+                if self.replay.playing != getattr(self, "is_playing", False):
+                    self.update_playback_state(self.replay.playing)
+            elif self.recorder:
+                self.recorder.record(snap.timestamp, snap.cpu_percent, snap.mem_percent, *self.net_rates,
+                                     getattr(self, "is_playing", False))
+            
+            # Hand the sample to the exporter thread (it renders the responses)
+            if self.exporter:
+                self.exporter.publish(snap.timestamp, snap.cpu_percent, snap.mem_percent, *self.net_rates,
+                                      snap.bytes_sent, snap.bytes_recv, snap.percpu,
+                                      list(self.remote_poller.latest.values()))
+            
+            # Metric providers that are shown and due
+            enabled = {p.name for p in self.providers if self.provider_shown(p)}
+            if enabled:
+                self.update_providers(enabled)
                 
         except Exception as e:
-            logging.error(f"Update stats error: {e}")
+            logger.error(f"Update stats error: {e}")
         
         # Schedule next update
         self.root.after(1000, self.update_stats)
 
 class MediaManager:
     """Fetches media info using winrt (official)"""
-    def __init__(self, callback, playback_callback):
+    def __init__(self, callback, playback_callback, pinned_app="", art_cache=None):
         self.callback = callback
         self.playback_callback = playback_callback
+        self.pinned_app = pinned_app  # Preferred source app id ("" = automatic)
+        self.app_ids = []  # Source apps seen in the last poll
+        self.art_cache = art_cache or ArtCache(None)
+        self.last_thumb = None  # Source buffer behind the art on screen
+        self.shown_art = None  # Digest of the art on screen
         self.thread = None
         self.running = False
 
     def start(self):
         self.running = True
-        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread = threading.Thread(target=self._run_loop, daemon=True, name="MediaManager")
         self.thread.start()
 
     def stop(self):
         self.running = False
+        self.art_cache.save()
 
     def _run_loop(self):
-        """Poll media info using winrt"""
+        """Poll all media sessions using winrt"""
         try:
             import asyncio
-            from winrt.windows.media.control import GlobalSystemMediaTransportControlsSessionManager
-            from winrt.windows.storage.streams import DataReader, Buffer, InputStreamOptions
+            from media_sessions import SessionTracker, WinrtSessionProvider
+            
+            tracker = SessionTracker(WinrtSessionProvider())
             
             async def get_media_info():
                 try:
-                    # Request session manager
-                    manager = await GlobalSystemMediaTransportControlsSessionManager.request_async()
-                    session = manager.get_current_session()
-                    
-                    if session:
-                        # Get media properties
-                        info = await session.try_get_media_properties_async()
-                        title = info.title
-                        artist = info.artist
-                        
-                        # Get playback info
-                        playback_info = session.get_playback_info()
-                        playback_status = playback_info.playback_status if playback_info else None
-                        # PlaybackStatus: 4 is Playing, 5 is Paused
-                        is_playing = (playback_status == 4)
-                        
-                        # Get thumbnail
-                        thumbnail_data = None
-                        if info.thumbnail:
-                            try:
-                                stream = await info.thumbnail.open_read_async()
-                                size = stream.size
-                                if size > 0:
-                                    buffer = Buffer(size)
-                                    await stream.read_async(buffer, size, InputStreamOptions.NONE)
-                                    reader = DataReader.from_buffer(buffer)
-                                    byte_arr = bytearray(size)
-                                    reader.read_bytes(byte_arr)
-                                    thumbnail_data = bytes(byte_arr)
-                            except Exception as e:
-                                logging.error(f"Thumbnail error: {e}")
-                                
-                        return title, artist, thumbnail_data, is_playing
-                    
-                    return None, None, None, None
+                    state = await tracker.poll(self.pinned_app, load_thumbnail=False)
+                    self.app_ids = tracker.app_ids()
+                    if not state:
+                        return None, None, None, None
+                    if state.thumbnail_ref is not None:
+                        # New art on the way: show the cached copy before reading the stream
+                        self._show_cached_art(state.title, state.artist, state.is_playing)
+                        await tracker.load_thumbnail(state)
+                    return state.title, state.artist, state.thumbnail, state.is_playing
                 except Exception as e:
-                    logging.error(f"Async media error: {e}")
+                    media_logger.error(f"Async media error: {e}")
                     return None, None, None, None
 
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             
+            poll = instruments.wrap("MediaManager.poll",
+                                    lambda: loop.run_until_complete(get_media_info()))
+            
             while self.running:
                 try:
-                    title, artist, thumb, is_playing = loop.run_until_complete(get_media_info())
-                    self.callback(title, artist, thumb)
+                    with tracer.span("MediaManager.fetch", "media"):
+                        title, artist, thumb, is_playing = poll()
+                    self.callback(title, artist, self._art_arg(thumb, title, artist))
                     if is_playing is not None:
                         self.playback_callback(is_playing)
                 except Exception as e:
-                    logging.error(f"Loop error: {e}")
+                    media_logger.error(f"Loop error: {e}")
                 
                 time.sleep(2)  # Poll every 2 seconds
                 
         except ImportError as e:
-            logging.warning(f"winrt not installed: {e}. Media features disabled.")
+            if sys.platform == "win32":
+                media_logger.warning(f"winrt not installed: {e}. Using PowerShell worker.")
+                self._run_worker_loop()
+            else:
+                media_logger.warning(f"winrt not installed: {e}. Media features disabled.")
         except Exception as e:
-            logging.error(f"Media Manager fatal error: {e}")
+            media_logger.error(f"Media Manager fatal error: {e}")
+
+    def _show_cached_art(self, title, artist, is_playing):
+        digest = self.art_cache.lookup(title, artist)
+        if digest is None or digest == self.shown_art:
+            return
+        image = self.art_cache.get(digest)
+        if image is not None:
+            self.shown_art = digest
+            self.callback(title, artist, image)
+            self.playback_callback(is_playing)
+
+    def _art_arg(self, thumb, title, artist):
+        """40x40 art for a thumbnail buffer, or THUMB_UNCHANGED if it is already on screen"""
+        if thumb is None:
+            self.last_thumb = self.shown_art = None
+            return None
+        if thumb is self.last_thumb:
+            return THUMB_UNCHANGED
+        self.last_thumb = thumb
+        digest = art_digest(thumb)
+        if digest == self.shown_art:
+            self.art_cache.link(title, artist, digest)
+            return THUMB_UNCHANGED
+        image = self.art_cache.get(digest)
+        if image is None:
+            try:
+                with tracer.span("thumbnail.decode", "image"):
+                    image = decode_thumbnail(thumb, ART_SIZE)
+            except Exception as e:
+                media_logger.error(f"Image decode error: {e}")
+                return None
+            self.art_cache.put(digest, image, title, artist)
+        else:
+            self.art_cache.link(title, artist, digest)
+        self.shown_art = digest
+        return image
+
+    def _run_worker_loop(self):
+        """Poll media info through one long-lived get_media_worker.ps1 process"""
+        from media_worker import ScriptWorker, powershell_command
+
+        worker = ScriptWorker(powershell_command())
+        poll = instruments.wrap("MediaManager.worker_poll", lambda: worker.request("get_media"))
+        last_thumb = (None, None)
+        try:
+            # A hung worker is detected by request() timing out, then killed and respawned
+            while self.running:
+                try:
+                    with tracer.span("MediaManager.fetch", "media"):
+                        info = poll()
+                    if info and info.get("ok"):
+                        thumb = None
+                        path = info.get("thumbnail")
+                        if path:
+                            try:
+                                # The worker rewrites the file only on track change
+                                mtime = os.path.getmtime(path)
+                                if last_thumb[0] == mtime:
+                                    thumb = last_thumb[1]
+                                else:
+                                    with open(path, 'rb') as f:
+                                        thumb = f.read()
+                                    last_thumb = (mtime, thumb)
+                            except OSError:
+                                pass
+                        title, artist = info.get("title") or None, info.get("artist") or None
+                        self.callback(title, artist, self._art_arg(thumb, title, artist))
+                        self.playback_callback(bool(info.get("playing")))
+                except Exception as e:
+                    media_logger.error(f"Worker loop error: {e}")
+                
+                time.sleep(2)
+        finally:
+            worker.stop()
 
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Windows 11 style taskbar widget")
+    parser.add_argument("--replay", metavar="FILE", help="drive the bar from a metrics recording (segment or directory)")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="replay speed (x real time)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    
+    config = ConfigManager()
+    setup_logging('widget_debug.log', levels=config.get("log_levels"),
+                  max_bytes=config.get("log_max_kb") * 1024,
+                  backup_count=config.get("log_backups"),
+                  dedup_seconds=config.get("log_dedup_seconds"))
     try:
-        app = SystemMonitorWidget()
+        replay = None
+        if args.replay:
+            from metrics_recorder import ReplaySource
+            replay = ReplaySource(args.replay, args.replay_speed)
+        app = SystemMonitorWidget(config, replay)
+        
+        # Later launches forward --show/--reset-position/--eq-preset/--exit here
+        if _instance_lock:
+            control = ControlServer(lambda actions: app.root.after(0, app.run_actions, actions))
+            _instance_lock.publish(control.port, control.token)
+        actions = actions_from(args)
+        if actions:
+            app.root.after(0, app.run_actions, actions)
         app.root.mainloop()
     except Exception as e:
-        logging.critical(f"Fatal error: {traceback.format_exc()}")
+        logger.critical(f"Fatal error: {traceback.format_exc()}")
+    finally:
+        if _instance_lock:
+            _instance_lock.release()
 
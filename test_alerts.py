@@ -0,0 +1,39 @@
+"""
+AlertEngine tests: long-run agreement with an exact rescan, and clock handling
+Run with pytest or directly: python test_alerts.py
+"""
+
+import math
+
+from alerts import AlertEngine, SlidingWindow
+from bench_alerts import RescanEngine, agree, make_rules, samples
+
+
+def test_long_run_matches_exact_rescan():
+    engine = AlertEngine(make_rules(60), notifier=lambda title, message: None)
+    rescan = RescanEngine(engine)
+    for t, values in samples(6 * 3600):  # Six hours at 1 Hz
+        engine.update(t, values)
+        expected = rescan.update(t, values, evaluate=t % 10 == 0)
+        if t % 10 == 0:
+            assert agree(engine, expected), f"engines disagree at t={t}"
+    for _, window in engine.window_list:
+        exact = math.fsum(v for _, v in window.samples)
+        scale = max(1.0, math.fsum(abs(v) for _, v in window.samples))
+        assert abs(window.total - exact) / scale < 1e-14
+
+
+def test_clock_going_backwards_restarts_window():
+    window = SlidingWindow(30)
+    for t in range(100, 120):
+        window.push(float(t), 50.0)
+    window.push(60.0, 1.0)  # Stale "future" samples must not linger
+    assert list(window.samples) == [(60.0, 1.0)]
+    assert window.total == 1.0 and not window.full(60.0)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"ok  {name}")
@@ -0,0 +1,51 @@
+"""
+EqualizerManager tests against a temporary Equalizer APO config folder
+Run with pytest or directly: python test_equalizer_manager.py
+"""
+
+import tempfile
+from pathlib import Path
+
+from equalizer_manager import EqualizerManager, EqProfile
+
+
+def make_manager(folder):
+    manager = EqualizerManager()
+    manager.apply_discovery({"install_path": str(folder), "config_path": str(folder / "config" / "config.txt")})
+    manager.config_path.parent.mkdir(parents=True)
+    return manager
+
+
+def test_builtin_preset_clears_parametric_lines():
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = make_manager(Path(tmp))
+        parametric = EqProfile(preamp=-6.0)
+        parametric.add_filter("PK", 1000, 4.0, 1.41)
+        parametric.add_filter("LSC", 105, 6.0, 0.71)
+        assert manager.apply_profile(parametric)
+        assert "Filter" in manager.config_path.read_text()
+
+        assert manager.apply_preset("Flat")
+        text = manager.config_path.read_text()
+        assert "Filter" not in text
+        assert "Preamp" not in text
+        profile = manager.get_current_profile()
+        assert list(profile.gains) == [0] * len(EqualizerManager.BANDS)
+        assert profile.filter_count == 0 and profile.preamp is None
+
+
+def test_builtin_preset_keeps_unmanaged_lines():
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = make_manager(Path(tmp))
+        manager.config_path.write_text("Device: Speakers\nFilter: ON PK Fc 1000 Hz Gain 3 dB Q 1\n")
+        assert manager.apply_preset("Rock")
+        lines = manager.config_path.read_text().splitlines()
+        assert lines[0] == "Device: Speakers"
+        assert lines[1].startswith("GraphicEQ:") and len(lines) == 2
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"ok  {name}")
@@ -0,0 +1,181 @@
+"""
+SessionTracker tests with a fake multi-session provider
+Run with pytest or directly: python test_media_sessions.py
+"""
+
+import asyncio
+
+from media_sessions import SessionTracker
+
+
+class FakeSession:
+    def __init__(self, app_id, title, artist="", playing=False, delay=0.0, thumbnail=b""):
+        self.app_id = app_id
+        self.title = title
+        self.artist = artist
+        self.playing = playing
+        self.delay = delay
+        self.thumbnail = thumbnail
+        self.updated = 0
+
+
+class FakeProvider:
+    """Same surface as WinrtSessionProvider, backed by FakeSession objects"""
+
+    def __init__(self, sessions, current=None):
+        self.list = sessions
+        self.current = current
+        self.fetched = []
+        self.thumbnail_reads = []
+
+    async def sessions(self):
+        return list(self.list)
+
+    def current_app_id(self):
+        return self.current
+
+    @staticmethod
+    def app_id(session):
+        return session.app_id
+
+    @staticmethod
+    def signature(session):
+        return (session.playing, session.updated)
+
+    async def fetch(self, session):
+        self.fetched.append(session.app_id)
+        if session.delay:
+            await asyncio.sleep(session.delay)
+        return session.title, session.artist, session.playing, session if session.thumbnail else None
+
+    async def read_thumbnail(self, ref):
+        self.thumbnail_reads.append(ref.app_id)
+        return ref.thumbnail
+
+
+def poll(tracker, pinned=None):
+    return asyncio.run(tracker.poll(pinned))
+
+
+def test_prefers_playing_session_over_current():
+    browser = FakeSession("chrome.exe", "Video", playing=False)
+    music = FakeSession("Spotify.exe", "Song", playing=True)
+    tracker = SessionTracker(FakeProvider([browser, music], current="chrome.exe"))
+    assert poll(tracker).app_id == "Spotify.exe"
+    assert tracker.app_ids() == ["Spotify.exe", "chrome.exe"]
+
+
+def test_current_wins_among_playing_and_when_idle():
+    a = FakeSession("a.exe", "A", playing=True)
+    b = FakeSession("b.exe", "B", playing=True)
+    provider = FakeProvider([a, b], current="b.exe")
+    tracker = SessionTracker(provider)
+    assert poll(tracker).app_id == "b.exe"
+    a.playing = b.playing = False
+    provider.current = "a.exe"
+    assert poll(tracker).app_id == "a.exe"
+
+
+def test_pinned_app_overrides_selection():
+    browser = FakeSession("chrome.exe", "Video", playing=True)
+    music = FakeSession("Spotify.exe", "Song", playing=False)
+    tracker = SessionTracker(FakeProvider([browser, music], current="chrome.exe"))
+    assert poll(tracker, pinned="Spotify.exe").title == "Song"
+    # Pinned app not running: fall back to automatic selection
+    assert poll(tracker, pinned="foobar.exe").app_id == "chrome.exe"
+
+
+def test_only_changed_sessions_are_refetched():
+    a = FakeSession("a.exe", "A", playing=True)
+    b = FakeSession("b.exe", "B")
+    provider = FakeProvider([a, b])
+    tracker = SessionTracker(provider, ttl=60)
+    poll(tracker)
+    assert sorted(provider.fetched) == ["a.exe", "b.exe"]
+    provider.fetched.clear()
+    poll(tracker)
+    assert provider.fetched == []
+    b.updated += 1
+    b.title = "B2"
+    poll(tracker)
+    assert provider.fetched == ["b.exe"]
+    assert tracker.states["b.exe"].title == "B2"
+
+
+def test_expired_entries_are_refetched():
+    a = FakeSession("a.exe", "A")
+    provider = FakeProvider([a])
+    tracker = SessionTracker(provider, ttl=0)
+    poll(tracker)
+    poll(tracker)
+    assert provider.fetched == ["a.exe", "a.exe"]
+
+
+def test_fetches_run_concurrently_with_per_session_timeout():
+    slow = [FakeSession(f"app{i}.exe", f"T{i}", delay=0.2) for i in range(5)]
+    hung = FakeSession("hung.exe", "never", delay=10)
+    tracker = SessionTracker(FakeProvider(slow + [hung]), timeout=0.5)
+    loop = asyncio.new_event_loop()
+    try:
+        start = loop.time()
+        loop.run_until_complete(tracker.poll())
+        elapsed = loop.time() - start
+    finally:
+        loop.close()
+    # Serial would take 1 s + the hang; concurrent is bounded by the timeout
+    assert elapsed < 0.9, elapsed
+    assert tracker.timeouts == 1
+    assert "hung.exe" not in tracker.states
+    assert len(tracker.states) == 5
+
+
+def test_timeout_keeps_previous_state():
+    a = FakeSession("a.exe", "A", playing=True)
+    tracker = SessionTracker(FakeProvider([a]), timeout=0.1)
+    poll(tracker)
+    a.updated += 1
+    a.delay = 1
+    assert poll(tracker).title == "A"
+
+
+def test_closed_sessions_are_dropped():
+    a = FakeSession("a.exe", "A")
+    b = FakeSession("b.exe", "B")
+    provider = FakeProvider([a, b])
+    tracker = SessionTracker(provider)
+    poll(tracker)
+    provider.list = [a]
+    poll(tracker)
+    assert tracker.app_ids() == ["a.exe"]
+
+
+def test_thumbnail_read_only_for_selected_session_once():
+    a = FakeSession("a.exe", "A", playing=True, thumbnail=b"jpeg-a")
+    b = FakeSession("b.exe", "B", thumbnail=b"jpeg-b")
+    provider = FakeProvider([a, b])
+    tracker = SessionTracker(provider, ttl=60)
+    assert poll(tracker).thumbnail == b"jpeg-a"
+    assert poll(tracker).thumbnail == b"jpeg-a"
+    assert provider.thumbnail_reads == ["a.exe"]
+
+
+def test_same_track_refetch_skips_thumbnail_stream():
+    a = FakeSession("a.exe", "A", playing=True, thumbnail=b"jpeg-a")
+    provider = FakeProvider([a])
+    tracker = SessionTracker(provider, ttl=60)
+    first = poll(tracker).thumbnail
+    a.playing = False  # play/pause changes the signature, not the track
+    assert poll(tracker).thumbnail is first
+    assert provider.fetched == ["a.exe", "a.exe"]
+    assert provider.thumbnail_reads == ["a.exe"]
+    a.title = "A2"
+    a.updated += 1
+    poll(tracker)
+    assert provider.thumbnail_reads == ["a.exe", "a.exe"]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"ok  {name}")
@@ -0,0 +1,91 @@
+"""
+Zero-copy thumbnail transfer
+The WinRT Buffer a thumbnail stream is read into supports the buffer protocol,
+so the decoder can read it through a memoryview instead of copying it into a
+bytearray, then bytes, then a BytesIO.
+"""
+
+import io
+
+# Passed instead of image data when the track's art has not changed since the
+# last callback: keep the current image, skip the decode
+THUMB_UNCHANGED = object()
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable, read-only file object over any buffer-protocol object (no copy)"""
+
+    def __init__(self, data):
+        self.view = memoryview(data).cast("B")
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self.pos + offset
+        else:
+            pos = len(self.view) + offset
+        if pos < 0:
+            raise ValueError("negative seek position")
+        self.pos = pos
+        return pos
+
+    def readinto(self, b):
+        chunk = self.view[self.pos:self.pos + len(b)]
+        n = len(chunk)
+        memoryview(b).cast("B")[:n] = chunk
+        self.pos += n
+        return n
+
+    def read(self, size=-1):
+        # PIL's parsers read small headers/chunks; slicing a memoryview is free,
+        # only the returned piece is materialised
+        end = len(self.view) if size is None or size < 0 else self.pos + size
+        chunk = self.view[self.pos:end]
+        self.pos += len(chunk)
+        return chunk.tobytes()
+
+    def readall(self):
+        return self.read()
+
+    def close(self):
+        if not self.closed:
+            try:
+                self.view.release()
+            except BufferError:
+                pass  # a caller still holds a slice; it is freed with it
+        super().close()
+
+
+def open_image(data):
+    """PIL Image over bytes, bytearray, memoryview or a WinRT Buffer"""
+    from PIL import Image
+    if isinstance(data, bytes):
+        return Image.open(io.BytesIO(data))  # BytesIO shares an immutable bytes object
+    return Image.open(BufferReader(data))
+
+
+def decode_thumbnail(data, size=(40, 40)):
+    """Decode and resize album art; JPEGs are decoded at reduced scale (draft mode)"""
+    from PIL import Image
+    image = open_image(data)
+    # Keep 2x the target so LANCZOS still has detail to filter from
+    image.draft("RGB", (size[0] * 2, size[1] * 2))
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+
+def buffer_view(buffer):
+    """memoryview of the filled part of a WinRT Buffer (or any buffer-protocol object)"""
+    view = memoryview(buffer)
+    length = getattr(buffer, "length", None)
+    return view if length is None or length == len(view) else view[:length]
@@ -0,0 +1,123 @@
+"""
+Timeline tracing for the Taskbar Widget
+Opt-in recorder of begin/end spans for Tk `after` callbacks, media fetches,
+thumbnail decodes and Equalizer APO writes, across threads. Spans go into a
+preallocated ring buffer (oldest overwritten) and are dumped as Chrome
+trace-event JSON, loadable in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import os
+import json
+import time
+import itertools
+import threading
+import contextlib
+from array import array
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "start")
+
+    def __init__(self, tracer, name, cat):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.add(self.name, self.cat, self.start, time.perf_counter())
+        return False
+
+
+class Tracer:
+    """Ring buffer of complete spans (name, category, start, duration, thread)"""
+
+    def __init__(self, capacity=65536):
+        self.enabled = False
+        self.capacity = capacity
+        self.names = [None] * capacity
+        self.cats = [None] * capacity
+        self.starts = array('d', bytes(8 * capacity))
+        self.durations = array('d', bytes(8 * capacity))
+        self.tids = array('q', bytes(8 * capacity))
+        self.thread_names = {}
+        self.counter = itertools.count()
+        self.written = 0
+        self.epoch = time.perf_counter()
+
+    def add(self, name, cat, start, end):
+        """Record one span; safe from any thread (slot claimed via an atomic counter)"""
+        n = next(self.counter)
+        slot = n % self.capacity
+        tid = threading.get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        self.names[slot] = name
+        self.cats[slot] = cat
+        self.starts[slot] = start
+        self.durations[slot] = end - start
+        self.tids[slot] = tid
+        self.written = n + 1
+
+    def span(self, name, cat):
+        """Context manager timing a block; a shared no-op while disabled"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat)
+
+    def trace_after(self, widget):
+        """Patch widget.after so every scheduled callback is recorded as a span"""
+        original = widget.after
+
+        def after(ms, func=None, *args):
+            if func is not None and self.enabled:
+                name = getattr(func, "__qualname__", None) or repr(func)
+                inner = func
+
+                def func(*call_args):
+                    start = time.perf_counter()
+                    try:
+                        return inner(*call_args)
+                    finally:
+                        self.add(name, "tk.after", start, time.perf_counter())
+            return original(ms, func, *args)
+
+        widget.after = after
+
+    def events(self):
+        """Buffered spans, oldest first, as Chrome trace events"""
+        total = self.written
+        count = min(total, self.capacity)
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in self.thread_names.items()]
+        for n in range(total - count, total):
+            slot = n % self.capacity
+            if self.names[slot] is None:
+                continue
+            events.append({
+                "name": self.names[slot],
+                "cat": self.cats[slot],
+                "ph": "X",
+                "ts": round((self.starts[slot] - self.epoch) * 1e6, 3),
+                "dur": round(self.durations[slot] * 1e6, 3),
+                "pid": pid,
+                "tid": self.tids[slot],
+            })
+        return events
+
+    def dump(self, path):
+        """Write the buffer as Chrome trace-event JSON; returns the span count"""
+        events = self.events()
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return sum(1 for e in events if e["ph"] == "X")
+
+
+# Shared by the widget, media thread and equalizer
+tracer = Tracer()
@@ -0,0 +1,140 @@
+"""
+Logging pipeline for the Taskbar Widget
+Records are handed to a queue on the calling thread (Tk or media thread) and
+written by a background listener to a size-rotated log file. Repeats of the
+same message key are suppressed for a window and summarized as
+"(repeated N times)" on the next emitted record.
+"""
+
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+_listener = None
+_rate_filter = None
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets one record per message key through per `window` seconds
+
+    Filters run on the logging thread before any handler lock, so the state is
+    guarded by its own lock (Tk, media and exporter threads all log).
+    """
+
+    MAX_KEYS = 1000
+
+    def __init__(self, window=60.0):
+        super().__init__()
+        self.window = window
+        self.state = {}  # key -> [window start, suppressed count]
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(record):
+        # Callers with variable text can group messages with extra={"log_key": ...}
+        return getattr(record, "log_key", None) or (record.name, record.levelno, record.msg)
+
+    def filter(self, record):
+        key = self.key(record)
+        with self.lock:
+            entry = self.state.get(key)
+            if entry is not None and record.created - entry[0] < self.window:
+                entry[1] += 1
+                return False
+            repeated = entry[1] if entry is not None else 0
+            if len(self.state) >= self.MAX_KEYS:
+                self._prune(record.created)
+            self.state[key] = [record.created, 0]
+
+        if repeated:
+            # Outside the lock: getMessage may run arbitrary __str__ code
+            record.msg = f"{record.getMessage()} (repeated {repeated} times)"
+            record.args = None
+        return True
+
+    def prune(self, now):
+        with self.lock:
+            self._prune(now)
+
+    def _prune(self, now):
+        """Forget expired keys; if all are live, drop the older half (bounds memory for unique messages)"""
+        live = [(k, v) for k, v in self.state.items() if now - v[0] < self.window]
+        if len(live) >= self.MAX_KEYS // 2:
+            live = live[len(live) // 2:]
+        self.state = dict(live)
+
+    def pending(self):
+        """(key, count) for messages suppressed since they were last emitted"""
+        with self.lock:
+            return [(k, v[1]) for k, v in self.state.items() if v[1]]
+
+    def forget(self, key):
+        with self.lock:
+            self.state.pop(key, None)
+
+
+class DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that only merges args on the caller; formatting happens in the listener"""
+
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # Traceback objects can't outlive the frame safely; render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(filename='widget_debug.log', level=logging.INFO, levels=None,
+                  max_bytes=1024 * 1024, backup_count=3, dedup_seconds=60.0):
+    """Install the queue handler on the root logger and start the background writer"""
+    global _listener, _rate_filter
+    stop_logging()
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredFormatQueueHandler(log_queue)
+    _rate_filter = RateLimitFilter(dedup_seconds)
+    queue_handler.addFilter(_rate_filter)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    for name, name_level in (levels or {}).items():
+        try:
+            logging.getLogger(name).setLevel(str(name_level).upper())
+        except ValueError:
+            logging.getLogger("widget").warning(f"Ignoring log level {name_level!r} for '{name}'")
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Summarize suppressed repeats, drain the queue and stop the writer"""
+    global _listener
+    if _listener is None:
+        return
+    if _rate_filter is not None:
+        for key, count in _rate_filter.pending():
+            text = key if isinstance(key, str) else key[2]
+            logging.getLogger("widget").info(f"{text} (suppressed {count} more times before exit)")
+            _rate_filter.forget(key)
+    _listener.stop()
+    _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,244 @@
+"""
+Z-order management for the Taskbar Widget
+Keeps the frameless bar above the taskbar without a keep-on-top timer. The
+manager listens for window-manager events (visibility, focus, map and
+configure changes on the root window, plus foreground-window changes on
+Windows), coalesces bursts into one check, and restacks only when the
+platform backend reports the bar is actually covered or lost topmost.
+
+Backends:
+  win32  ctypes: a WinEvent hook on foreground changes, a walk of the windows
+         above ours to detect overlap, SetWindowPos(HWND_TOPMOST) to restack
+  tk     portable: Tk <Visibility> states, lift() and -topmost to restack
+
+A slow fallback check ("zorder_fallback_s") covers events a backend cannot
+see. Counters (wakeups, checks, restacks, per hour) show in Diagnostics;
+"zorder_mode": "poll" restores the old unconditional 2 s loop for comparison;
+it is also the fallback on Windows when the win32 backend cannot start, since
+Windows Tk never reports <Visibility>.
+"""
+
+import os
+import sys
+import time
+import logging
+
+logger = logging.getLogger("widget")
+
+DEBOUNCE_MS = 50       # Bursts of events (dragging, restacks) collapse into one check
+POLL_MS = 2000         # Legacy keep-on-top interval ("zorder_mode": "poll")
+TK_EVENTS = ("<Visibility>", "<FocusOut>", "<Map>", "<Configure>")
+
+
+class TkBackend:
+    """Portable backend: obscured per the last Tk <Visibility> state"""
+
+    name = "tk"
+
+    def __init__(self, root, notify):
+        self.root = root
+        self.visibility = "VisibilityUnobscured"
+
+    def visibility_changed(self, state):
+        self.visibility = str(state)
+
+    def obscured(self):
+        return self.visibility != "VisibilityUnobscured"
+
+    def raise_window(self):
+        self.root.lift()
+        self.root.wm_attributes("-topmost", True)
+        self.visibility = "VisibilityUnobscured"  # Until Tk reports otherwise
+
+    def stop(self):
+        pass
+
+
+class Win32Backend:
+    """Windows backend: WinEvent hook for foreground changes, z-order walk for overlap"""
+
+    name = "win32"
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    GW_HWNDPREV = 3
+    GWL_EXSTYLE = -20
+    WS_EX_TOPMOST = 0x0008
+    DWMWA_CLOAKED = 14
+    HWND_TOPMOST = -1
+    SWP_FLAGS = 0x0001 | 0x0002 | 0x0010  # NOSIZE | NOMOVE | NOACTIVATE
+
+    def __init__(self, root, notify):
+        import ctypes
+        from ctypes import wintypes
+        self.ctypes = ctypes
+        self.wintypes = wintypes
+        self.notify = notify
+        user32 = self.user32 = ctypes.windll.user32
+        user32.GetParent.restype = wintypes.HWND
+        user32.GetParent.argtypes = [wintypes.HWND]
+        user32.GetWindow.restype = wintypes.HWND
+        user32.GetWindow.argtypes = [wintypes.HWND, wintypes.UINT]
+        user32.GetWindowLongW.argtypes = [wintypes.HWND, ctypes.c_int]
+        user32.IsWindowVisible.argtypes = [wintypes.HWND]
+        user32.GetWindowRect.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.RECT)]
+        user32.GetWindowThreadProcessId.restype = wintypes.DWORD
+        user32.GetWindowThreadProcessId.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.DWORD)]
+        user32.SetWindowPos.argtypes = [wintypes.HWND, wintypes.HWND, ctypes.c_int, ctypes.c_int,
+                                        ctypes.c_int, ctypes.c_int, wintypes.UINT]
+        self.pid = os.getpid()
+        try:
+            self.dwmapi = ctypes.windll.dwmapi
+        except OSError:
+            self.dwmapi = None
+
+        # Tk's toplevel wrapper (the frameless root's HWND is its child)
+        self.hwnd = user32.GetParent(root.winfo_id()) or root.winfo_id()
+
+        # Called from Tk's message loop on this thread (out-of-context hook)
+        proc_type = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                       wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        self.proc = proc_type(self._on_win_event)  # Must stay referenced while hooked
+        self.hook = user32.SetWinEventHook(self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND,
+                                           0, self.proc, 0, 0, self.WINEVENT_OUTOFCONTEXT)
+        if not self.hook:
+            raise OSError("SetWinEventHook failed")
+
+    def _on_win_event(self, hook, event, hwnd, id_object, id_child, thread, timestamp):
+        if hwnd != self.hwnd:
+            self.notify("foreground")
+
+    def visibility_changed(self, state):
+        pass  # Windows Tk does not report visibility; the z-order walk decides
+
+    def _rect(self, hwnd):
+        rect = self.wintypes.RECT()
+        self.user32.GetWindowRect(hwnd, self.ctypes.byref(rect))
+        return rect
+
+    def _cloaked(self, hwnd):
+        if self.dwmapi is None:
+            return False
+        cloaked = self.wintypes.DWORD()
+        self.dwmapi.DwmGetWindowAttribute(hwnd, self.DWMWA_CLOAKED, self.ctypes.byref(cloaked),
+                                          self.ctypes.sizeof(cloaked))
+        return bool(cloaked.value)
+
+    def _ours(self, hwnd):
+        pid = self.wintypes.DWORD()
+        self.user32.GetWindowThreadProcessId(hwnd, self.ctypes.byref(pid))
+        return pid.value == self.pid
+
+    def obscured(self):
+        """True if we lost topmost or another process's visible window above ours overlaps it"""
+        user32 = self.user32
+        if not user32.GetWindowLongW(self.hwnd, self.GWL_EXSTYLE) & self.WS_EX_TOPMOST:
+            return True
+        ours = self._rect(self.hwnd)
+        hwnd = user32.GetWindow(self.hwnd, self.GW_HWNDPREV)
+        while hwnd:
+            # Our own menus and dialogs sit above the bar by design
+            if user32.IsWindowVisible(hwnd) and not self._ours(hwnd) and not self._cloaked(hwnd):
+                other = self._rect(hwnd)
+                if (other.left < ours.right and ours.left < other.right and
+                        other.top < ours.bottom and ours.top < other.bottom):
+                    return True
+            hwnd = user32.GetWindow(hwnd, self.GW_HWNDPREV)
+        return False
+
+    def raise_window(self):
+        self.user32.SetWindowPos(self.hwnd, self.HWND_TOPMOST, 0, 0, 0, 0, self.SWP_FLAGS)
+
+    def stop(self):
+        if self.hook:
+            self.user32.UnhookWinEvent(self.hook)
+            self.hook = None
+
+
+def make_backend(name, root, notify):
+    """Backend by name ("auto" picks win32 on Windows); falls back to tk"""
+    if name == "auto":
+        name = "win32" if sys.platform == "win32" else "tk"
+    if name == "win32":
+        try:
+            return Win32Backend(root, notify)
+        except (OSError, AttributeError, ImportError) as e:
+            logger.warning(f"Win32 z-order backend unavailable ({e}); using the Tk backend")
+    return TkBackend(root, notify)
+
+
+class ZOrderManager:
+    """Re-asserts topmost only when a window-manager event shows the bar was covered"""
+
+    def __init__(self, root, backend="auto", fallback_s=60, mode="events"):
+        self.root = root
+        self.backend = make_backend(backend, root, self.notify)
+        if mode == "events" and sys.platform == "win32" and self.backend.name == "tk":
+            # Windows Tk sends no <Visibility>, so events alone would only catch covers at the fallback
+            logger.warning(f"Z-order: no Win32 backend; keeping the bar on top with the {POLL_MS // 1000} s poll")
+            mode = "poll"
+        self.mode = mode
+        self.fallback_ms = int(fallback_s * 1000)
+        self.pending = None
+        self.counters = {"wakeups": 0, "events": 0, "checks": 0, "restacks": 0}
+        self.started = time.monotonic()
+        if mode == "poll":
+            self.root.after(POLL_MS, self._poll)
+        else:
+            for sequence in TK_EVENTS:
+                root.bind(sequence, self._on_tk_event, add="+")
+            if self.fallback_ms > 0:
+                self.root.after(self.fallback_ms, self._fallback)
+        logger.info(f"Z-order: {mode} mode, {self.backend.name} backend")
+
+    def _on_tk_event(self, event):
+        if event.widget is not self.root:
+            return  # Children share the root's bindtag
+        if str(event.type) == "Visibility":
+            self.backend.visibility_changed(event.state)
+        self.notify(str(event.type))
+
+    def notify(self, reason):
+        """A window-manager change worth a check; bursts share one"""
+        self.counters["wakeups"] += 1
+        self.counters["events"] += 1
+        if self.pending is None:
+            self.pending = self.root.after(DEBOUNCE_MS, self.check)
+
+    def check(self):
+        self.pending = None
+        self.counters["checks"] += 1
+        try:
+            if self.backend.obscured():
+                self.restack()
+        except Exception as e:
+            logger.warning(f"Z-order check failed: {e}", extra={"log_key": "zorder.check"})
+
+    def restack(self):
+        self.backend.raise_window()
+        self.counters["restacks"] += 1
+
+    def _fallback(self):
+        self.counters["wakeups"] += 1
+        self.check()
+        self.root.after(self.fallback_ms, self._fallback)
+
+    def _poll(self):
+        # Legacy behaviour: restack every POLL_MS whether or not anything changed
+        self.counters["wakeups"] += 1
+        self.counters["checks"] += 1
+        self.restack()
+        self.root.after(POLL_MS, self._poll)
+
+    def stats(self):
+        """Counters plus their rates per hour since start"""
+        hours = max(time.monotonic() - self.started, 1.0) / 3600
+        stats = {"mode": self.mode, "backend": self.backend.name}
+        for name, count in self.counters.items():
+            stats[name] = count
+            stats[f"{name}_per_hour"] = round(count / hours, 1)
+        return stats
+
+    def stop(self):
+        self.backend.stop()
+        logger.info(f"Z-order: {self.stats()}")